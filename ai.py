@@ -0,0 +1,157 @@
+from typing import Dict, List, Tuple
+import time
+from beyblade import Beyblade, SpecialMove
+from simulation import get_available_moves
+from solver import BattleSolver, BattleState
+
+class _OutOfTime(Exception):
+    pass
+
+def pack_state(state: BattleState) -> int:
+    """Pack a battle state into a compact integer key for the transposition table"""
+    key = 0
+    for health, stamina, spin_speed, defense_count, critical_used in (state[:5], state[5:]):
+        key = (key << 7) | max(0, health)
+        key = (key << 7) | stamina
+        key = (key << 7) | spin_speed
+        key = (key << 2) | defense_count
+        key = (key << 1) | int(critical_used)
+    return key
+
+def evaluate(state: BattleState, side: int) -> float:
+    """Heuristic chance that `side` wins from a non-terminal state"""
+    if side == 0:
+        own, other = state[:5], state[5:]
+    else:
+        own, other = state[5:], state[:5]
+    score = 0.5 + (own[0] - other[0]) / 200
+    score += (own[2] - other[2]) / 1000
+    score += (own[3] - other[3]) * 0.02
+    score += (int(other[4]) - int(own[4])) * 0.05
+    return min(1.0, max(0.0, score))
+
+class ComputerAI:
+    """Expectimax Computer opponent with a bounded transposition table and a time budget
+
+    Search deepens one ply at a time until the budget runs out; the depth in
+    progress is then abandoned, and the clock is checked before every
+    expansion so it is abandoned promptly. The table drops its least
+    recently used entry when full, and so do the per-matchup rules.
+    """
+
+    def __init__(self, time_budget: float = 0.005, max_depth: int = 12, table_size: int = 200_000,
+                 opponent_policy: str = "random", rules_size: int = 256):
+        self.time_budget = time_budget
+        self.max_depth = max_depth
+        self.table_size = table_size
+        self.rules_size = rules_size
+        self.opponent_policy = opponent_policy
+        # Matchup id and packed state -> (searched depth, value), shared by all matchups
+        self.table: Dict[int, Tuple[int, float]] = {}
+        # Matchup and side -> (matchup id, solver), least recently used first
+        self.rules: Dict[tuple, Tuple[int, BattleSolver]] = {}
+        self._matchups = 0
+        self.last_depth = 0
+
+    @staticmethod
+    def _matchup_key(beyblade1: Beyblade, beyblade2: Beyblade) -> tuple:
+        return tuple(
+            (b.name, b.type, b.power, tuple((m.name, m.power, m.move_type) for m in b.special_moves))
+            for b in (beyblade1, beyblade2)
+        )
+
+    def _rules_for(self, beyblade1: Beyblade, beyblade2: Beyblade, side: int) -> Tuple[int, BattleSolver]:
+        key = self._matchup_key(beyblade1, beyblade2) + (side,)
+        rules = self.rules
+        entry = rules.pop(key, None)
+        if entry is None:
+            # Only the opponent's policy is used; the Computer's moves are searched
+            policies = ["random", "random"]
+            policies[1 - side] = self.opponent_policy
+            if len(rules) >= self.rules_size:
+                del rules[next(iter(rules))]
+            # Ids are never reused, so table entries of an evicted matchup just age out
+            self._matchups += 1
+            entry = (self._matchups, BattleSolver(beyblade1, beyblade2, *policies))
+        rules[key] = entry
+        return entry
+
+    def choose_move(self, beyblade: Beyblade, opponent: Beyblade, moves_first: bool = False) -> SpecialMove:
+        """Pick a move for `beyblade`; by default it moves second like the Computer in main.py"""
+        candidates = get_available_moves(beyblade)
+        if len(candidates) == 1:
+            return candidates[0]
+
+        deadline = time.perf_counter() + self.time_budget
+        side = 0 if moves_first else 1
+        beyblade1, beyblade2 = (beyblade, opponent) if moves_first else (opponent, beyblade)
+        matchup, rules = self._rules_for(beyblade1, beyblade2, side)
+        # The battle loop calls start_turn before asking for moves, so the root turn skips it
+        state = BattleState.from_beyblades(beyblade1, beyblade2)
+
+        best_move = candidates[0]
+        self.last_depth = 0
+        for depth in range(1, self.max_depth + 1):
+            try:
+                best_move = self._search_root(rules, matchup, state, side, candidates, depth, deadline)
+                self.last_depth = depth
+            except _OutOfTime:
+                break
+        return best_move
+
+    def _search_root(self, rules: BattleSolver, matchup: int, state: BattleState, side: int,
+                     candidates: List[SpecialMove], depth: int, deadline: float) -> SpecialMove:
+        best_move, best_value = candidates[0], -1.0
+        for move in candidates:
+            if time.perf_counter() > deadline:
+                raise _OutOfTime()
+            value = self._expected(rules, matchup, state, side, move, depth, deadline, start_turn=False)
+            if value > best_value:
+                best_move, best_value = move, value
+        return best_move
+
+    def _expected(self, rules: BattleSolver, matchup: int, state: BattleState, side: int, move: SpecialMove,
+                  depth: int, deadline: float, start_turn: bool = True) -> float:
+        """Expected value of playing `move` against the opponent's move distribution"""
+        if time.perf_counter() > deadline:
+            raise _OutOfTime()
+        opponent = 1 - side
+        opponent_moves = rules.move_distribution(opponent, state[opponent * 5], state[opponent * 5 + 3],
+                                                 state[opponent * 5 + 4])
+        value = 0.0
+        for opponent_move, p in opponent_moves:
+            move1, move2 = (move, opponent_move) if side == 0 else (opponent_move, move)
+            for next_state, q in rules.transitions(state, move1, move2, start_turn):
+                value += p * q * self._value(rules, matchup, next_state, side, depth - 1, deadline)
+        return value
+
+    def _value(self, rules: BattleSolver, matchup: int, state: BattleState, side: int,
+               depth: int, deadline: float) -> float:
+        if state.is_terminal():
+            side1_lost = state.health1 <= 0 or state.spin_speed1 <= 0
+            return float(side1_lost) if side == 1 else float(not side1_lost)
+        if depth <= 0:
+            return evaluate(state, side)
+
+        key = (matchup << 48) | pack_state(state)
+        table = self.table
+        entry = table.pop(key, None)
+        if entry is not None:
+            # Reinserting keeps the dict in least to most recently used order
+            table[key] = entry
+            if entry[0] >= depth:
+                return entry[1]
+
+        own = state[side * 5:side * 5 + 5]
+        candidates = rules.move_distribution(side, own[0], own[3], own[4])
+        value = max(self._expected(rules, matchup, state, side, move, depth, deadline) for move, _ in candidates)
+
+        if key not in table and len(table) >= self.table_size:
+            # Evict the least recently used entry to keep the table bounded
+            del table[next(iter(table))]
+        table[key] = (depth, value)
+        return value
+
+    def __call__(self, beyblade: Beyblade, opponent: Beyblade, rng=None) -> SpecialMove:
+        """Move policy signature used by simulation.BattleSimulator (as the second side)"""
+        return self.choose_move(beyblade, opponent)
@@ -0,0 +1,265 @@
+from dataclasses import dataclass
+from typing import Optional
+import time
+import numpy as np
+from beyblade import Beyblade
+from environment import DEFAULT_SAMPLER, EventSampler, STATS
+from metrics import BATTLES_FINISHED, BATTLES_STARTED, CRITICALS, TURNS
+from simulation import SimulationSummary
+
+MOVE_KINDS = {"attack": 0, "defense": 1, "critical": 2}
+ATTACK, DEFENSE, CRITICAL = 0, 1, 2
+
+VECTOR_POLICIES = ("random", "computer", "aggressive")
+
+def has_type_advantage(attacker_type: str, defender_type: str) -> bool:
+    """Same type advantage check as Beyblade.use_special_move"""
+    return (attacker_type == "attack" and defender_type == "defense") or \
+           (attacker_type == "defense" and defender_type == "stamina") or \
+           (attacker_type == "stamina" and defender_type == "attack")
+
+class MoveTable:
+    """Move powers and kinds of one Beyblade, ordered like the battle menu"""
+
+    def __init__(self, beyblade: Beyblade):
+        moves = [m for kind in ("attack", "defense", "critical")
+                 for m in beyblade.special_moves if m.move_type == kind]
+        if not any(m.move_type == "attack" for m in moves):
+            raise ValueError(f"{beyblade.name} needs at least one attack move for batch battles")
+        self.names = [m.name for m in moves]
+        self.powers = np.array([m.power for m in moves], dtype=np.int64)
+        self.kinds = np.array([MOVE_KINDS[m.move_type] for m in moves], dtype=np.int8)
+        self.attacks = int((self.kinds == ATTACK).sum())
+        self.defenses = int((self.kinds == DEFENSE).sum())
+        self.criticals = int((self.kinds == CRITICAL).sum())
+        self.has_defense = self.defenses > 0
+        self.has_critical = self.criticals > 0
+        # Python's max() keeps the first of equally strong moves, so argmax does too
+        attack_powers = np.where(self.kinds == ATTACK, self.powers, -1)
+        self.strongest_attack = int(np.argmax(attack_powers))
+        self.first_critical = int(np.argmax(self.kinds == CRITICAL)) if self.has_critical else -1
+        # Base damage only depends on the move, so it is computed once per table
+        divisors = np.where(self.kinds == CRITICAL, 150, 200)
+        self.base_damage = (beyblade.power * self.powers) // divisors
+        self.spin_factors = np.where(self.kinds == CRITICAL, 0.9, 0.7)
+
+@dataclass
+class SideState:
+    """Struct-of-arrays battle state for one side of N battles"""
+    health: np.ndarray
+    stamina: np.ndarray
+    spin_speed: np.ndarray
+    defense_count: np.ndarray
+    critical_used: np.ndarray
+
+    @classmethod
+    def fresh(cls, battles: int) -> 'SideState':
+        return cls(
+            health=np.full(battles, 100, dtype=np.int32),
+            stamina=np.full(battles, 100, dtype=np.int32),
+            spin_speed=np.full(battles, 100, dtype=np.int32),
+            defense_count=np.full(battles, 2, dtype=np.int32),
+            critical_used=np.zeros(battles, dtype=bool)
+        )
+
+    def compact(self, keep: np.ndarray) -> 'SideState':
+        return SideState(self.health[keep], self.stamina[keep], self.spin_speed[keep],
+                         self.defense_count[keep], self.critical_used[keep])
+
+    def start_turn(self) -> None:
+        """Vectorized Beyblade.start_turn"""
+        np.maximum(self.stamina - 5, 0, out=self.stamina)
+        np.maximum(self.spin_speed - 3, 0, out=self.spin_speed)
+        low = self.stamina < 30
+        self.spin_speed[low] = np.maximum(self.spin_speed[low] - 5, 0)
+
+    def is_defeated(self) -> np.ndarray:
+        return (self.health <= 0) | (self.spin_speed <= 0)
+
+def choose_moves(policy: str, table: MoveTable, side: SideState, rng: np.random.Generator) -> np.ndarray:
+    """Vectorized counterpart of the move policies in simulation.py"""
+    n = side.health.shape[0]
+    if policy == "aggressive":
+        use_critical = ~side.critical_used if table.has_critical else np.zeros(n, dtype=bool)
+        return np.where(use_critical, table.first_critical, table.strongest_attack)
+
+    # The table is grouped as attacks | defenses | criticals, so a uniform pick over the
+    # available moves is an offset into the groups that are still usable
+    attacks, defenses, criticals = table.attacks, table.defenses, table.criticals
+    defense_available = side.defense_count > 0
+    available = attacks + defenses * defense_available + criticals * ~side.critical_used
+    draws = rng.random((2, n)) if policy == "computer" else rng.random((1, n))
+    choice = (draws[0] * available).astype(np.int32)
+    choice += np.where(~defense_available & (choice >= attacks), defenses, 0)
+    if policy == "random":
+        return choice
+
+    # Computer opponent: defend when health is low, 20% chance to go for the critical move
+    defend = (side.health < 30) & defense_available
+    if defenses and defend.any():
+        # The same draw is reused; conditioned on the branch it is still uniform
+        choice = np.where(defend, attacks + (draws[0] * defenses).astype(np.int32), choice)
+    if criticals:
+        go_critical = ~defend & ~side.critical_used & (draws[1] < 0.2)
+        critical_choice = attacks + defenses + (draws[1] / 0.2 * criticals).astype(np.int32)
+        choice = np.where(go_critical, np.minimum(critical_choice, attacks + defenses + criticals - 1), choice)
+    return choice
+
+def resolve_moves(attacker: SideState, defender: SideState, table: MoveTable, choice: np.ndarray,
+                  advantage: bool, defender_defending: np.ndarray, acting: np.ndarray,
+                  rng: np.random.Generator) -> int:
+    """Vectorized simulation.resolve_move for the battles where `acting` is set; returns the critical hits"""
+    move_kind = table.kinds[choice]
+    defending = acting & (move_kind == DEFENSE)
+    attack = acting & ~defending
+    critical_move = attack & (move_kind == CRITICAL)
+
+    attacker.defense_count -= defending
+    attacker.critical_used |= critical_move
+
+    # Same operation order as use_special_move so the truncations match exactly
+    spin_multiplier = (attacker.spin_speed / 100) * table.spin_factors[choice]
+    damage = (table.base_damage[choice] * spin_multiplier).astype(np.int32)
+    if advantage:
+        damage = (damage * 1.1).astype(np.int32)
+
+    rolled = ~critical_move & (attacker.spin_speed > 70) & (rng.random(damage.shape[0]) < 0.3)
+    damage = np.where(rolled, (damage * 1.2).astype(np.int32), damage)
+    np.maximum(damage, 1, out=damage)
+    np.minimum(damage, 30, out=damage, where=~(critical_move | rolled))
+
+    # Defense reduces the incoming damage by 30%
+    reduced = np.maximum(damage - (damage * 0.3).astype(np.int32), 1)
+    damage = np.where(defender_defending, reduced, damage)
+    defender.health -= np.where(attack, damage, 0)
+    return int(np.count_nonzero(attack & (critical_move | rolled)))
+
+@dataclass
+class EventTimeline:
+    """Environmental events of N battles over T turns, as check_for_event would report them each turn"""
+    events: np.ndarray  # (battles, turns) index into sampler.events, -1 for no event
+    sampler: EventSampler
+
+    def multipliers(self, stat: str) -> np.ndarray:
+        """(battles, turns) multiplier of one stat, 1.0 where no event affects it"""
+        events = self.sampler.events
+        # The extra last row is the no-event row that index -1 picks up
+        table = np.ones(len(events) + 1)
+        for i, event in enumerate(events):
+            if event.effect_type == stat:
+                table[i] = event.effect_value
+        return table[self.events]
+
+    def stat_multipliers(self) -> np.ndarray:
+        """(battles, turns, len(STATS)) multipliers of every stat"""
+        return np.stack([self.multipliers(stat) for stat in STATS], axis=-1)
+
+def event_timelines(battles: int, turns: int, rng: np.random.Generator,
+                    sampler: EventSampler = DEFAULT_SAMPLER) -> EventTimeline:
+    """Pre-generate event timelines for many battles, stepping EnvironmentManager's rules for all of them at once
+
+    BatchBattleEngine does not apply them: the turn rules it mirrors never
+    use event effects, so applying them would part it from BattleSimulator.
+    """
+    cumulative = np.array(sampler.cumulative)
+    durations = np.array([event.duration for event in sampler.events], dtype=np.int16)
+    no_event = len(sampler.events)
+    events = np.empty((battles, turns), dtype=np.int8)
+    active = np.full(battles, -1, dtype=np.int8)
+    remaining = np.zeros(battles, dtype=np.int16)
+    for turn in range(turns):
+        # A running event counts down and the turn it runs out has no event
+        running = active >= 0
+        remaining -= running
+        expired = running & (remaining <= 0)
+        active[expired] = -1
+        picked = np.searchsorted(cumulative, rng.random(battles), side="right")
+        new = (active < 0) & ~expired & (picked < no_event)
+        active[new] = picked[new]
+        remaining[new] = durations[picked[new]]
+        events[:, turn] = active
+    return EventTimeline(events=events, sampler=sampler)
+
+@dataclass
+class BatchResult:
+    winners: np.ndarray  # 0 if the first Beyblade won, 1 if the second one did
+    turns: np.ndarray
+
+class BatchBattleEngine:
+    """Advances N battles between two Beyblades one turn at a time with NumPy"""
+
+    def __init__(self, beyblade1: Beyblade, beyblade2: Beyblade, policy1: str = "computer",
+                 policy2: str = "computer", seed: Optional[int] = None):
+        for policy in (policy1, policy2):
+            if policy not in VECTOR_POLICIES:
+                raise ValueError(f"Unknown policy: {policy}")
+        self.beyblade1 = beyblade1
+        self.beyblade2 = beyblade2
+        self.table1 = MoveTable(beyblade1)
+        self.table2 = MoveTable(beyblade2)
+        self.policy1 = policy1
+        self.policy2 = policy2
+        self.advantage1 = has_type_advantage(beyblade1.type, beyblade2.type)
+        self.advantage2 = has_type_advantage(beyblade2.type, beyblade1.type)
+        self.rng = np.random.default_rng(seed)
+
+    def run(self, battles: int) -> BatchResult:
+        """Play `battles` battles to the end"""
+        winners = np.zeros(battles, dtype=np.int8)
+        turns = np.zeros(battles, dtype=np.int32)
+        index = np.arange(battles)
+        side1 = SideState.fresh(battles)
+        side2 = SideState.fresh(battles)
+        rng = self.rng
+        BATTLES_STARTED.inc(battles)
+
+        turn = 0
+        criticals = 0
+        while index.shape[0]:
+            turn += 1
+            side1.start_turn()
+            side2.start_turn()
+
+            choice1 = choose_moves(self.policy1, self.table1, side1, rng)
+            choice2 = choose_moves(self.policy2, self.table2, side2, rng)
+            defending1 = self.table1.kinds[choice1] == DEFENSE
+            defending2 = self.table2.kinds[choice2] == DEFENSE
+
+            acting = np.ones(index.shape[0], dtype=bool)
+            criticals += resolve_moves(side1, side2, self.table1, choice1, self.advantage1, defending2, acting, rng)
+            criticals += resolve_moves(side2, side1, self.table2, choice2, self.advantage2, defending1,
+                                       ~side2.is_defeated(), rng)
+
+            # Record finished battles and drop them from the working set
+            defeated1 = side1.is_defeated()
+            finished = defeated1 | side2.is_defeated()
+            if finished.any():
+                done = index[finished]
+                winners[done] = np.where(defeated1[finished], 1, 0)
+                turns[done] = turn
+                keep = ~finished
+                index = index[keep]
+                side1 = side1.compact(keep)
+                side2 = side2.compact(keep)
+
+        # Counted per batch, like BattleSimulator counts per battle
+        BATTLES_FINISHED.inc(battles)
+        TURNS.inc(int(turns.sum()))
+        CRITICALS.inc(criticals)
+        return BatchResult(winners=winners, turns=turns)
+
+    def run_many(self, battles: int, chunk_size: int = 1_000_000) -> SimulationSummary:
+        """Play battles in chunks and summarize them like BattleSimulator.run_many"""
+        summary = SimulationSummary(self.beyblade1.name, self.beyblade2.name)
+        start = time.perf_counter()
+        remaining = battles
+        while remaining > 0:
+            result = self.run(min(chunk_size, remaining))
+            wins2 = int(result.winners.sum())
+            summary.battles += result.winners.shape[0]
+            summary.wins2 += wins2
+            summary.wins1 += result.winners.shape[0] - wins2
+            summary.total_turns += int(result.turns.sum())
+            remaining -= chunk_size
+        summary.elapsed = time.perf_counter() - start
+        return summary
@@ -2,44 +2,96 @@ from typing import List, Dict, Optional
 import uuid
 from datetime import datetime
 import random
+import time
 from beyblade import Beyblade, SpecialMove
+from metrics import BATTLES_FINISHED, BATTLES_STARTED, STADIUM_OUTS, TURN_SECONDS, TURNS
+from simulation import resolve_move
 from utils import BattleError, save_battle_log
 
+# Stamina every Beyblade starts a battle with
+MAX_STAMINA = 100
+
 class BeyBattle:
-    def __init__(self, beyblade1: Beyblade, beyblade2: Beyblade):
+    def __init__(self, beyblade1: Beyblade, beyblade2: Beyblade, log_writer=None, rng=None, quiet: bool = False):
         self.beyblade1 = beyblade1
         self.beyblade2 = beyblade2
+        # Optional battle_log.JsonlLogWriter; without one each battle gets its own JSON file
+        self.log_writer = log_writer
+        self.rng = rng if rng is not None else random.Random()
+        # Quiet battles (rollouts, replays) count no metrics and save no battle log; may be switched at any time
+        self.quiet = quiet
         self.current_turn = 1
         self.battle_id = str(uuid.uuid4())
         self.battle_log: List[Dict] = []
         self.winner: Optional[Beyblade] = None
+        if not quiet:
+            BATTLES_STARTED.inc()
+
+    @staticmethod
+    def is_knocked_out(beyblade: Beyblade) -> bool:
+        """Defeated, or knocked out of the stadium"""
+        return beyblade.is_stadium_out or beyblade.is_defeated()
 
     def is_battle_over(self) -> bool:
         """Check if the battle is over"""
-        return self.beyblade1.is_knocked_out() or self.beyblade2.is_knocked_out()
+        return self.is_knocked_out(self.beyblade1) or self.is_knocked_out(self.beyblade2)
 
     def get_winner(self) -> Optional[Beyblade]:
         """Get the winner of the battle"""
-        if self.beyblade1.is_knocked_out():
+        if self.is_knocked_out(self.beyblade1):
             return self.beyblade2
-        elif self.beyblade2.is_knocked_out():
+        elif self.is_knocked_out(self.beyblade2):
             return self.beyblade1
         return None
 
+    def snapshot(self, with_rng: bool = True) -> tuple:
+        """Mutable battle state as a flat tuple for restore()
+
+        Holds both Beyblades' STATE_FIELDS, the turn, the winner, the length
+        of the battle log and the RNG state. Copying the RNG state costs far
+        more than the rest, so rollouts that draw fresh random numbers anyway
+        can pass with_rng=False. Set `quiet` while rolling out, or a rollout
+        that ends the battle counts and saves it again.
+        """
+        beyblade1 = self.beyblade1
+        beyblade2 = self.beyblade2
+        return (beyblade1.health, beyblade1.stamina, beyblade1.spin_speed, beyblade1.defense_count,
+                beyblade1.critical_used, beyblade1.defense_active, beyblade1.is_stadium_out,
+                beyblade2.health, beyblade2.stamina, beyblade2.spin_speed, beyblade2.defense_count,
+                beyblade2.critical_used, beyblade2.defense_active, beyblade2.is_stadium_out,
+                self.current_turn, self.winner, len(self.battle_log),
+                self.rng.getstate() if with_rng else None)
+
+    def restore(self, snapshot: tuple) -> None:
+        """Return to a snapshot() of this battle; later battle log entries are dropped"""
+        beyblade1 = self.beyblade1
+        beyblade2 = self.beyblade2
+        (beyblade1.health, beyblade1.stamina, beyblade1.spin_speed, beyblade1.defense_count,
+         beyblade1.critical_used, beyblade1.defense_active, beyblade1.is_stadium_out,
+         beyblade2.health, beyblade2.stamina, beyblade2.spin_speed, beyblade2.defense_count,
+         beyblade2.critical_used, beyblade2.defense_active, beyblade2.is_stadium_out,
+         self.current_turn, self.winner, log_length, rng_state) = snapshot
+        del self.battle_log[log_length:]
+        if rng_state is not None:
+            self.rng.setstate(rng_state)
+
     def check_stadium_out(self) -> None:
         """Random chance for stadium out based on remaining stamina"""
         for beyblade in [self.beyblade1, self.beyblade2]:
             if not beyblade.is_stadium_out:
-                stamina_percentage = beyblade.current_stamina / beyblade.max_stamina
+                stamina_percentage = beyblade.stamina / MAX_STAMINA
                 stadium_out_chance = 0.05 * (1 - stamina_percentage)  # Higher chance when low on stamina
-                if random.random() < stadium_out_chance:
+                if self.rng.random() < stadium_out_chance:
                     beyblade.is_stadium_out = True
-                    beyblade.current_stamina = 0
+                    beyblade.stamina = 0
+                    if not self.quiet:
+                        STADIUM_OUTS.inc()
 
     def execute_turn(self, move1: SpecialMove, move2: SpecialMove) -> Dict[str, any]:
         """Execute a single turn of battle"""
         if self.is_battle_over():
             raise BattleError("Battle is already over!")
+        start = time.perf_counter()
 
         # Determine order based on spin speed
         first = self.beyblade1 if self.beyblade1.spin_speed >= self.beyblade2.spin_speed else self.beyblade2
@@ -53,31 +105,23 @@ class BeyBattle:
             'timestamp': datetime.now().isoformat(),
             'actions': []
         }
+        first.start_turn()
+        second.start_turn()
+        first_defending = first_move.move_type == "defense"
+        second_defending = second_move.move_type == "defense"
 
         # First Beyblade's move
-        if not first.is_knocked_out():
-            try:
-                result = first.use_special_move(first_move, second)
-                turn_log['actions'].append(result)
-            except BattleError as e:
-                turn_log['actions'].append({
-                    'error': str(e),
-                    'beyblade': first.name
-                })
+        if not self.is_knocked_out(first):
+            turn_log['actions'].append(resolve_move(first, second, first_move, second_defending, self.rng,
+                                                    quiet=self.quiet))
 
         # Check for stadium out
         self.check_stadium_out()
 
         # Second Beyblade's move
-        if not second.is_knocked_out():
-            try:
-                result = second.use_special_move(second_move, first)
-                turn_log['actions'].append(result)
-            except BattleError as e:
-                turn_log['actions'].append({
-                    'error': str(e),
-                    'beyblade': second.name
-                })
+        if not self.is_knocked_out(second):
+            turn_log['actions'].append(resolve_move(second, first, second_move, first_defending, self.rng,
+                                                    quiet=self.quiet))
 
         # Check for stadium out again
         self.check_stadium_out()
@@ -85,11 +129,17 @@ class BeyBattle:
         # Update battle state
         self.battle_log.append(turn_log)
         self.current_turn += 1
+        quiet = self.quiet
+        if not quiet:
+            TURNS.inc()
+            TURN_SECONDS.observe(time.perf_counter() - start)
 
         # Check for battle end
         if self.is_battle_over():
             self.winner = self.get_winner()
-            self.save_battle()
+            if not quiet:
+                BATTLES_FINISHED.inc()
+                self.save_battle()
 
         return turn_log
 
@@ -103,7 +153,7 @@ class BeyBattle:
             'total_turns': self.current_turn - 1,
             'log': self.battle_log
         }
-        save_battle_log(self.battle_id, battle_data)
+        save_battle_log(self.battle_id, battle_data, self.log_writer)
 
     def get_battle_status(self) -> str:
         """Get a string representation of the current battle status"""
@@ -0,0 +1,184 @@
+from typing import Callable, Dict, List, NamedTuple, Optional, TextIO, Tuple
+import sys
+from environment import EnvironmentalEvent
+from utils import NO_COLOR
+
+class TurnStart(NamedTuple):
+    turn: int
+
+class EnvironmentChange(NamedTuple):
+    turn: int
+    event: EnvironmentalEvent
+
+class MoveUsed(NamedTuple):
+    turn: int
+    beyblade: str
+    move: Optional[str]  # None when the Beyblade had no move to make
+    fallback: bool = False  # the chosen defense move was out, so the first attack move was used
+
+class Critical(NamedTuple):
+    turn: int
+    beyblade: str
+    move: str
+
+class Damage(NamedTuple):
+    turn: int
+    attacker: str
+    defender: str
+    damage: int
+    original: int
+    defended: bool  # the defender was defending, so the damage was reduced by 30%
+
+class Defense(NamedTuple):
+    turn: int
+    beyblade: str
+    move: str
+    remaining: int
+
+class Status(NamedTuple):
+    label: str
+    description: str
+    health: int
+    stamina: int
+
+class TurnEnd(NamedTuple):
+    turn: int
+    sides: Tuple[Status, ...]
+
+class KnockOut(NamedTuple):
+    turn: int
+    winner: str
+    loser: str
+    winner_side: int  # 0 for the first side, 1 for the second
+
+def status(label: str, beyblade) -> Status:
+    """Snapshot of a Beyblade for TurnEnd"""
+    return Status(label, str(beyblade), beyblade.health, beyblade.stamina)
+
+class BattleEventSink:
+    """Receives the events of a battle as it is played
+
+    Emitters skip building events for a sink whose `enabled` is False.
+    """
+    enabled = True
+
+    def emit(self, event: tuple) -> None:
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.flush()
+
+class NullSink(BattleEventSink):
+    """Discards everything; battles played with it do no event work at all"""
+    enabled = False
+
+    def emit(self, event: tuple) -> None:
+        pass
+
+NULL_SINK = NullSink()
+
+def active_sink(sink: Optional[BattleEventSink]) -> Optional[BattleEventSink]:
+    """The sink to emit to, or None when nothing should be emitted"""
+    return sink if sink is not None and sink.enabled else None
+
+class TextSink(BattleEventSink):
+    """Renders events as text lines and writes them in one go per turn or per battle
+
+    `fore`/`style` are colorama's Fore and Style (no colours by default) and
+    `comment` picks a commentary line for a kind of event, like
+    Commentator.comment in main.py.
+    """
+
+    def __init__(self, stream: Optional[TextIO] = None, per: str = "turn", fore=NO_COLOR, style=NO_COLOR,
+                 comment: Optional[Callable[[str], str]] = None):
+        if per not in ("event", "turn", "battle"):
+            raise ValueError(f"Unknown flush mode: {per}")
+        self.stream = stream if stream is not None else sys.stdout
+        self.per = per
+        self.fore = fore
+        self.style = style
+        self.comment = comment
+        self.lines: List[str] = []
+        self._renderers: Dict[type, Callable[[tuple], None]] = {
+            TurnStart: self._turn_start,
+            EnvironmentChange: self._environment,
+            MoveUsed: self._move,
+            Critical: self._critical,
+            Damage: self._damage,
+            Defense: self._defense,
+            TurnEnd: self._turn_end,
+            KnockOut: self._knock_out
+        }
+
+    def _commentary(self, kind: str, color: str = "") -> None:
+        if self.comment is not None:
+            text = self.comment(kind)
+            self.lines.append(f"{color}{text}{self.style.RESET_ALL}" if color else text)
+
+    def _turn_start(self, event: TurnStart) -> None:
+        self.lines.append(f"\n{self.fore.CYAN}=== Turn {event.turn} ==={self.style.RESET_ALL}")
+        self._commentary("turn_start")
+
+    def _environment(self, event: EnvironmentChange) -> None:
+        self.lines.append(f"\n{self.fore.YELLOW}Environmental Event: {event.event.description}{self.style.RESET_ALL}")
+        self._commentary("environmental", self.fore.YELLOW)
+
+    def _move(self, event: MoveUsed) -> None:
+        if event.move is None:
+            self.lines.append(f"\n{event.beyblade} could not make a move this turn!")
+            return
+        if event.fallback:
+            self.lines.append(f"\nAutomatically selected alternative move: {event.move}")
+        self.lines.append(f"\n{event.beyblade} used {event.move}!")
+
+    def _critical(self, event: Critical) -> None:
+        self.lines.append("🔥 CRITICAL HIT!")
+        self._commentary("critical_hit", self.fore.RED)
+
+    def _damage(self, event: Damage) -> None:
+        if event.defended:
+            self.lines.append(f"Original damage: {event.original}")
+            self.lines.append(f"🛡️ Defense reduced damage by: {event.original - event.damage} (30%)")
+            self.lines.append(f"Final damage: {event.damage}")
+        else:
+            self.lines.append(f"Damage dealt: {event.damage}")
+
+    def _defense(self, event: Defense) -> None:
+        self._commentary("defense", self.fore.BLUE)
+        self.lines.append("🛡️ Defense activated! Next attack damage will be reduced by 30%")
+        self.lines.append(f"Remaining defense moves: {event.remaining}")
+
+    def _turn_end(self, event: TurnEnd) -> None:
+        self.lines.append(f"\n{self.fore.CYAN}=== Status ==={self.style.RESET_ALL}")
+        for side in event.sides:
+            self.lines.append(f"{side.label}: {side.description}")
+        if any(side.health < 30 for side in event.sides):
+            self._commentary("low_health", self.fore.YELLOW)
+        if any(side.stamina < 30 for side in event.sides):
+            self._commentary("low_stamina", self.fore.YELLOW)
+
+    def _knock_out(self, event: KnockOut) -> None:
+        color = self.fore.GREEN if event.winner_side == 0 else self.fore.RED
+        self.lines.append(f"\n{color}{event.winner} wins!{self.style.RESET_ALL}")
+        if self.comment is not None:
+            self.lines.append(f"\n{self.fore.MAGENTA}{self.comment('victory')}{self.style.RESET_ALL}")
+
+    def emit(self, event: tuple) -> None:
+        self._renderers[type(event)](event)
+        if self.per == "event" or isinstance(event, KnockOut) or (self.per == "turn" and isinstance(event, TurnEnd)):
+            self.flush()
+
+    def flush(self) -> None:
+        if self.lines:
+            self.stream.write("\n".join(self.lines) + "\n")
+            self.lines.clear()
+            self.stream.flush()
+
+class TerminalRenderer(TextSink):
+    """The coloured battle output of the terminal game, commentary included, printed as events happen"""
+
+    def __init__(self, fore, style, comment: Optional[Callable[[str], str]] = None, stream: Optional[TextIO] = None):
+        super().__init__(stream, per="event", fore=fore, style=style, comment=comment)
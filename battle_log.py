@@ -0,0 +1,194 @@
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+import atexit
+import glob
+import gzip
+import json
+import lzma
+import os
+import shutil
+import threading
+import time
+from utils import BattleError
+
+COMPRESSORS = {
+    "gzip": (".gz", gzip.open),
+    "lzma": (".xz", lzma.open),
+    None: ("", None)
+}
+
+class JsonlLogWriter:
+    """Append-only battle log sink writing compact JSON lines to rotating segments
+
+    Records are buffered in memory and written when the buffer grows past
+    `flush_bytes` or `flush_interval` seconds have passed since the last write;
+    a background timer flushes writers that have gone idle. A failed write
+    keeps its records for the next flush. Segments are rotated once they
+    reach `segment_bytes`, and closed segments are compressed with gzip or
+    lzma outside the lock, so writers do not wait on the compressor.
+    """
+
+    def __init__(self, directory: str = "logs", prefix: str = "battles", flush_bytes: int = 1 << 20,
+                 flush_interval: float = 5.0, segment_bytes: int = 64 << 20, compression: Optional[str] = "gzip"):
+        if compression not in COMPRESSORS:
+            raise ValueError(f"Unknown compression: {compression}")
+        self.directory = directory
+        self.prefix = prefix
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.segment_bytes = segment_bytes
+        self.compression = compression
+        self._buffer: List[str] = []
+        self._buffered_bytes = 0
+        self._last_flush = time.monotonic()
+        self._segment_index = 0
+        self._segment_path: Optional[str] = None
+        self._segment_file = None
+        self._segment_size = 0
+        self._lock = threading.Lock()
+        self._closed = False
+        os.makedirs(directory, exist_ok=True)
+        self._stop = threading.Event()
+        if flush_interval > 0:
+            threading.Thread(target=self._run_timer, name="battle-log-flush", daemon=True).start()
+        atexit.register(self.close)
+
+    def _run_timer(self) -> None:
+        """Flush records an idle writer would otherwise hold until its next write"""
+        timeout = self.flush_interval
+        while not self._stop.wait(timeout):
+            due = self.flush_interval
+            try:
+                with self._lock:
+                    if self._closed:
+                        return
+                    due = self._last_flush + self.flush_interval - time.monotonic()
+                    closed = self._flush() if due <= 0 else None
+                self._compress(closed)
+            except Exception as e:
+                # The records stay buffered, so the next tick retries them
+                print(f"Error flushing battle log: {e}")
+            timeout = due if due > 0 else self.flush_interval
+
+    def write(self, record: Dict[str, Any]) -> None:
+        """Buffer one record, flushing when a size or time threshold is reached"""
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        closed = None
+        with self._lock:
+            if self._closed:
+                raise BattleError("Battle log writer is closed")
+            self._buffer.append(line)
+            self._buffered_bytes += len(line)
+            if self._buffered_bytes >= self.flush_bytes or time.monotonic() - self._last_flush >= self.flush_interval:
+                closed = self._flush()
+        self._compress(closed)
+
+    def flush(self) -> None:
+        """Write buffered records to the current segment"""
+        with self._lock:
+            closed = self._flush()
+        self._compress(closed)
+
+    def _flush(self) -> Optional[str]:
+        """Write the buffer out; returns the path of a segment this filled up, for the caller to compress"""
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return None
+        data = "".join(self._buffer).encode("utf-8")
+
+        try:
+            if self._segment_file is None:
+                self._open_segment()
+            self._segment_file.write(data)
+            self._segment_file.flush()
+        except IOError as e:
+            self._abandon_write()
+            raise BattleError(f"Failed to write battle log segment {self._segment_path}: {e}")
+        # Only dropped once written
+        self._buffer.clear()
+        self._buffered_bytes = 0
+        self._segment_size += len(data)
+        if self._segment_size >= self.segment_bytes:
+            return self._rotate()
+        return None
+
+    def _abandon_write(self) -> None:
+        """Close the segment and cut off what a failed write left of it; the next flush reopens it"""
+        if self._segment_file is not None:
+            try:
+                self._segment_file.close()
+            except IOError:
+                pass
+            self._segment_file = None
+        if self._segment_path is not None and os.path.exists(self._segment_path):
+            try:
+                os.truncate(self._segment_path, self._segment_size)
+            except IOError:
+                pass
+
+    def _open_segment(self) -> None:
+        if self._segment_path is None:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            self._segment_index += 1
+            self._segment_path = os.path.join(
+                self.directory, f"{self.prefix}_{timestamp}_{os.getpid()}_{self._segment_index:05d}.jsonl"
+            )
+            self._segment_size = 0
+        self._segment_file = open(self._segment_path, "ab")
+
+    def _rotate(self) -> Optional[str]:
+        """Close the current segment and return its path for _compress"""
+        if self._segment_file is None:
+            return None
+        self._segment_file.close()
+        self._segment_file = None
+        path, self._segment_path = self._segment_path, None
+        return path
+
+    def _compress(self, path: Optional[str]) -> None:
+        """Compress a closed segment; called without the lock held"""
+        extension, opener = COMPRESSORS[self.compression]
+        if path is None or opener is None:
+            return
+        # Dot-prefixed so read_battle_logs never picks up a half-written file
+        temp_path = os.path.join(os.path.dirname(path), "." + os.path.basename(path) + extension)
+        with open(path, "rb") as source, opener(temp_path, "wb") as target:
+            shutil.copyfileobj(source, target)
+        os.replace(temp_path, path + extension)
+        os.remove(path)
+
+    def rotate(self) -> None:
+        """Flush and start a new segment"""
+        with self._lock:
+            closed = self._flush() or self._rotate()
+        self._compress(closed)
+
+    def close(self) -> None:
+        """Flush remaining records and compress the last segment"""
+        with self._lock:
+            if self._closed:
+                return
+            closed = self._flush() or self._rotate()
+            self._closed = True
+        self._stop.set()
+        self._compress(closed)
+        atexit.unregister(self.close)
+
+    def __enter__(self) -> 'JsonlLogWriter':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+def read_battle_logs(directory: str = "logs", prefix: str = "battles") -> Iterator[Dict[str, Any]]:
+    """Iterate over the records of all plain and compressed segments in order"""
+    paths = sorted(glob.glob(os.path.join(directory, f"{prefix}_*.jsonl*")))
+    for path in paths:
+        opener = open
+        for extension, compressed_opener in COMPRESSORS.values():
+            if extension and path.endswith(extension):
+                opener = compressed_opener
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
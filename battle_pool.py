@@ -0,0 +1,108 @@
+from array import array
+from typing import Dict, List, Optional, Tuple
+from beyblade import Beyblade, BeybladeDefinition, STATE_FIELDS
+from utils import BattleError
+
+# Per battle: each side's STATE_FIELDS
+ROW_WIDTH = 2 * len(STATE_FIELDS)
+FREE = -1
+
+class BattlePool:
+    """Many in-flight battles packed into arrays: state as signed 16-bit values, kind ids as 32-bit ones
+
+    A battle costs ROW_WIDTH * 2 + 8 bytes. Beyblade objects only exist while
+    a battle is being played: load() fills two Beyblades from a row and store()
+    writes their state back. Definitions are kept once per kind of Beyblade
+    and let go of when the last battle using them is removed.
+    """
+
+    def __init__(self):
+        self.kinds: List[Optional[Tuple[type, BeybladeDefinition]]] = []
+        self._kind_ids: Dict[Tuple[type, int], int] = {}
+        self._kind_refs: List[int] = []
+        self._free_kinds: List[int] = []
+        self.rows = array('h')
+        # Both Beyblades' kind ids per battle; FREE marks a row waiting for reuse
+        self.battle_kinds = array('i')
+        self._free: List[int] = []
+        self.active = 0
+
+    def _acquire_kind(self, beyblade: Beyblade) -> int:
+        key = (beyblade.__class__, id(beyblade.definition))
+        kind_id = self._kind_ids.get(key)
+        if kind_id is None:
+            kind = (beyblade.__class__, beyblade.definition)
+            if self._free_kinds:
+                kind_id = self._free_kinds.pop()
+                self.kinds[kind_id] = kind
+            else:
+                kind_id = len(self.kinds)
+                self.kinds.append(kind)
+                self._kind_refs.append(0)
+            self._kind_ids[key] = kind_id
+        self._kind_refs[kind_id] += 1
+        return kind_id
+
+    def _release_kind(self, kind_id: int) -> None:
+        self._kind_refs[kind_id] -= 1
+        if not self._kind_refs[kind_id]:
+            beyblade_class, definition = self.kinds[kind_id]
+            # Dropping the definition also ends the id() it was keyed by, so the key goes first
+            del self._kind_ids[(beyblade_class, id(definition))]
+            self.kinds[kind_id] = None
+            self._free_kinds.append(kind_id)
+
+    def add(self, beyblade1: Beyblade, beyblade2: Beyblade) -> int:
+        """Pack a battle into the pool and return its id"""
+        kinds = (self._acquire_kind(beyblade1), self._acquire_kind(beyblade2))
+        row = beyblade1.get_state() + beyblade2.get_state()
+        if self._free:
+            battle = self._free.pop()
+            self.rows[battle * ROW_WIDTH:(battle + 1) * ROW_WIDTH] = array('h', row)
+            self.battle_kinds[battle * 2:battle * 2 + 2] = array('i', kinds)
+        else:
+            battle = len(self.battle_kinds) // 2
+            self.rows.extend(row)
+            self.battle_kinds.extend(kinds)
+        self.active += 1
+        return battle
+
+    def _offset(self, battle: int) -> int:
+        if battle < 0 or battle * 2 >= len(self.battle_kinds) or self.battle_kinds[battle * 2] == FREE:
+            raise BattleError(f"Battle {battle} is not in the pool")
+        return battle * ROW_WIDTH
+
+    def _materialize(self, kind_id: int, state: array, beyblade: Optional[Beyblade]) -> Beyblade:
+        beyblade_class, definition = self.kinds[kind_id]
+        if beyblade is None or beyblade.definition is not definition:
+            beyblade = beyblade_class.from_definition(definition)
+        health, stamina, spin_speed, defense_count, critical_used, defense_active, is_stadium_out = state
+        beyblade.set_state((health, stamina, spin_speed, defense_count, bool(critical_used), bool(defense_active),
+                            bool(is_stadium_out)))
+        return beyblade
+
+    def load(self, battle: int, beyblade1: Optional[Beyblade] = None,
+             beyblade2: Optional[Beyblade] = None) -> Tuple[Beyblade, Beyblade]:
+        """Beyblades holding a battle's state; pass the previous pair back in to reuse it"""
+        offset = self._offset(battle)
+        row = self.rows[offset:offset + ROW_WIDTH]
+        width = len(STATE_FIELDS)
+        return (self._materialize(self.battle_kinds[battle * 2], row[:width], beyblade1),
+                self._materialize(self.battle_kinds[battle * 2 + 1], row[width:], beyblade2))
+
+    def store(self, battle: int, beyblade1: Beyblade, beyblade2: Beyblade) -> None:
+        """Write the Beyblades' state back into a battle's row"""
+        offset = self._offset(battle)
+        self.rows[offset:offset + ROW_WIDTH] = array('h', beyblade1.get_state() + beyblade2.get_state())
+
+    def remove(self, battle: int) -> None:
+        """Drop a finished battle; its row is reused by the next add()"""
+        self._offset(battle)
+        for side in (0, 1):
+            self._release_kind(self.battle_kinds[battle * 2 + side])
+            self.battle_kinds[battle * 2 + side] = FREE
+        self._free.append(battle)
+        self.active -= 1
+
+    def __len__(self) -> int:
+        return self.active
@@ -0,0 +1,637 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Set, Tuple
+import argparse
+import asyncio
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from battle_pool import BattlePool
+from beyblade import Beyblade, SpecialMove, create_beyblade_from_data, create_starter_beyblade, get_starter_prototypes
+from environment import EnvironmentManager
+from matchmaking import MatchmakingQueue, player_rating
+from metrics import BATTLES_FINISHED, BATTLES_STARTED, DEFAULT_PORT, TURN_SECONDS, TURNS, serve_metrics
+from player import Player, PlayerManager
+from player_store import SqlitePlayerStore
+from simulation import MovePolicy, POLICIES, get_available_moves, play_turn
+from utils import BattleError, latency_summary
+
+COMPUTER = "Computer"
+# Player saves are only flushed by the write-behind timer thread, never inline on the event loop
+FLUSH_EVERY = sys.maxsize
+
+# Bench clients in the PvP queue give up after this many seconds without an opponent
+MATCH_TIMEOUT = 60.0
+
+# A full collection walks every live object, which with thousands of sessions stalls the event loop for
+# hundreds of ms; young cycles are still collected as often as with the default (700, 10, 10)
+GC_THRESHOLDS = (700, 10, 1000)
+
+_encode = json.JSONEncoder(separators=(",", ":")).encode
+
+def server_player_manager(path: str) -> PlayerManager:
+    """Write-behind PlayerManager; a .db path uses SQLite, whose writes hold the GIL far less than a JSON rewrite"""
+    store = SqlitePlayerStore(path) if path.endswith(".db") else None
+    return PlayerManager(path, store=store, write_behind=True, flush_every=FLUSH_EVERY)
+
+def tune_gc() -> None:
+    """Keep objects from startup out of collections and make full collections rare"""
+    gc.freeze()
+    gc.set_threshold(*GC_THRESHOLDS)
+
+def beyblade_state(beyblade: Beyblade) -> dict:
+    return {
+        "name": beyblade.name,
+        "type": beyblade.type,
+        "health": beyblade.health,
+        "stamina": beyblade.stamina,
+        "spin_speed": beyblade.spin_speed,
+        "defense_count": beyblade.defense_count,
+        "critical_used": beyblade.critical_used
+    }
+
+def move_state(move: SpecialMove) -> dict:
+    return {"name": move.name, "power": move.power, "move_type": move.move_type}
+
+class _Forfeit(Exception):
+    def __init__(self, side: int):
+        super().__init__(side)
+        self.side = side
+
+class Session:
+    """One connected client; its coroutine reads requests while a battle task may be waiting on its moves"""
+
+    def __init__(self, server: 'BattleServer', reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.server = server
+        self.reader = reader
+        self.writer = writer
+        self.player: Optional[Player] = None
+        self.battle: Optional['OnlineBattle'] = None
+        self.moves: asyncio.Queue = asyncio.Queue()
+        self.move_received = 0.0
+        self.closed = False
+        self._pending: List[str] = []
+
+    @property
+    def name(self) -> str:
+        return self.player.name if self.player else "?"
+
+    def post(self, message: dict) -> None:
+        """Queue a message to go out with the next send()"""
+        self._pending.append(_encode(message))
+
+    async def send(self, message: Optional[dict] = None) -> None:
+        """Write any posted messages and this one in a single write"""
+        if message is not None:
+            self._pending.append(_encode(message))
+        if self.closed or not self._pending:
+            self._pending.clear()
+            return
+        lines = "\n".join(self._pending) + "\n"
+        self._pending.clear()
+        try:
+            self.writer.write(lines.encode("utf-8"))
+            await self.writer.drain()
+        except (ConnectionError, RuntimeError):
+            self.close()
+
+    async def error(self, message: str) -> None:
+        await self.send({"type": "error", "message": message})
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            # Wakes up a battle waiting on this side's move, which then counts as a forfeit
+            self.moves.put_nowait(None)
+            self.writer.close()
+
+    async def run(self) -> None:
+        try:
+            while not self.closed:
+                line = await self.reader.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    await self.error("Messages must be JSON objects, one per line")
+                    continue
+                if not isinstance(message, dict):
+                    await self.error("Messages must be JSON objects, one per line")
+                    continue
+                if message.get("type") == "quit":
+                    break
+                await self.server.handle_message(self, message)
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            self.server.matchmaking.cancel(self)
+            self.close()
+
+class OnlineBattle:
+    """A battle between two sides, each a Session or the Computer (None), played with the simulation turn rules
+
+    While the clients think, the Beyblades' state waits packed in the
+    server's BattlePool; Beyblade objects only exist during each turn's steps.
+    """
+
+    def __init__(self, server: 'BattleServer', sessions: Tuple[Optional[Session], Optional[Session]],
+                 beyblades: Tuple[Beyblade, Beyblade], rng: random.Random):
+        self.server = server
+        self.sessions = sessions
+        self.battle_id = server.pool.add(*beyblades)
+        self.rng = rng
+        self.environment = EnvironmentManager(rng=rng)
+        self.event = None
+        self.turn = 0
+
+    def _names(self) -> Tuple[str, str]:
+        return tuple(session.name if session else COMPUTER for session in self.sessions)
+
+    async def _send(self, side: int, message: dict) -> None:
+        session = self.sessions[side]
+        if session is not None:
+            await session.send(message)
+
+    def _post(self, side: int, message: dict) -> None:
+        session = self.sessions[side]
+        if session is not None:
+            session.post(message)
+
+    def _options(self, beyblades: Tuple[Beyblade, Beyblade]) -> list:
+        """Per side: the Computer's move, or the moves its client may pick from"""
+        return [get_available_moves(beyblades[side]) if session else
+                self.server.computer_policy(beyblades[side], beyblades[1 - side], self.rng)
+                for side, session in enumerate(self.sessions)]
+
+    async def _choose(self, side: int, available_moves: List[SpecialMove]) -> SpecialMove:
+        session = self.sessions[side]
+        # Drop moves sent before this prompt
+        while not session.moves.empty():
+            if session.moves.get_nowait() is None:
+                raise _Forfeit(side)
+        # Current stats already went out with battle_start or the last turn result
+        await session.send({
+            "type": "choose_move",
+            "turn": self.turn,
+            "event": self.event.name if self.event else None,
+            "moves": [move.name for move in available_moves]
+        })
+        while True:
+            try:
+                choice = await asyncio.wait_for(session.moves.get(), self.server.turn_timeout)
+            except asyncio.TimeoutError:
+                raise _Forfeit(side)
+            if choice is None:
+                raise _Forfeit(side)
+            # A move is picked by its 1-based number in the prompt, like the terminal menu, or by name
+            if isinstance(choice, int) and not isinstance(choice, bool) and 1 <= choice <= len(available_moves):
+                return available_moves[choice - 1]
+            for move in available_moves:
+                if move.name == choice:
+                    return move
+            await session.error(f"Invalid move: {choice!r}")
+
+    async def _choose_both(self, options: list) -> Tuple[SpecialMove, SpecialMove]:
+        """Wait for both players; a forfeit ends the wait without waiting on the other side"""
+        tasks = [asyncio.ensure_future(self._choose(side, options[side])) for side in (0, 1)]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+        for task in done:
+            if task.exception() is not None:
+                raise task.exception()
+        return tasks[0].result(), tasks[1].result()
+
+    async def run(self) -> Optional[int]:
+        """Play the battle to the end and return the winning side"""
+        pool = self.server.pool
+        names = self._names()
+        winner = None
+        forfeit = False
+        try:
+            beyblades = pool.load(self.battle_id)
+            for side in (0, 1):
+                await self._send(side, {
+                    "type": "battle_start",
+                    "side": side + 1,
+                    "opponent_name": names[1 - side],
+                    "you": beyblade_state(beyblades[side]),
+                    "opponent": beyblade_state(beyblades[1 - side]),
+                    "moves": [move_state(move) for move in beyblades[side].special_moves]
+                })
+
+            BATTLES_STARTED.inc()
+            while not beyblades[0].is_defeated() and not beyblades[1].is_defeated():
+                self.turn += 1
+                self.event = self.environment.check_for_event()
+                for beyblade in beyblades:
+                    beyblade.start_turn()
+                options = self._options(beyblades)
+                # Only the packed row is kept while the clients choose
+                pool.store(self.battle_id, *beyblades)
+                beyblades = None
+                if self.sessions[0] is None or self.sessions[1] is None:
+                    # Only one side waits on a client, so skip the two tasks gather() would create
+                    move1, move2 = [await self._choose(side, options[side]) if session else options[side]
+                                    for side, session in enumerate(self.sessions)]
+                else:
+                    move1, move2 = await self._choose_both(options)
+                beyblades = pool.load(self.battle_id)
+                actions = play_turn(*beyblades, move1, move2, self.rng)
+                pool.store(self.battle_id, *beyblades)
+                self.server.turns_played += 1
+                TURNS.inc()
+                # Results go out together with the next turn's move prompt
+                for side in (0, 1):
+                    self._post(side, {
+                        "type": "turn",
+                        "turn": self.turn,
+                        "actions": actions,
+                        "you": beyblade_state(beyblades[side]),
+                        "opponent": beyblade_state(beyblades[1 - side])
+                    })
+                self.server.record_turn_latency(self.sessions)
+            winner = 1 if beyblades[0].is_defeated() else 0
+        except _Forfeit as e:
+            winner = 1 - e.side
+            forfeit = True
+        finally:
+            pool.remove(self.battle_id)
+
+        self.server.record_result(self.sessions, winner)
+        for side in (0, 1):
+            await self._send(side, {
+                "type": "battle_end",
+                "winner": names[winner],
+                "you_won": side == winner,
+                "forfeit": forfeit,
+                "turns": self.turn
+            })
+        return winner
+
+class BattleServer:
+    """asyncio server hosting PvP and vs-Computer battles over newline-delimited JSON
+
+    Requests: {"type": "login", "name": ...}, {"type": "play", "mode": "computer" | "pvp",
+    "beyblade": ..., "opponent_beyblade": ...}, {"type": "move", "move": number or name},
+    {"type": "cancel"} to leave the PvP queue, {"type": "stats"} and {"type": "quit"}.
+    PvP players are paired by rating through a MatchmakingQueue.
+    """
+
+    def __init__(self, player_manager: PlayerManager, host: str = "127.0.0.1", port: int = 8765,
+                 seed: Optional[int] = None, computer_policy: MovePolicy = POLICIES["computer"],
+                 turn_timeout: Optional[float] = 120.0, matchmaking: Optional[MatchmakingQueue] = None,
+                 poll_interval: float = 0.5):
+        self.player_manager = player_manager
+        self.host = host
+        self.port = port
+        self.rng = random.Random(seed)
+        self.computer_policy = computer_policy
+        self.turn_timeout = turn_timeout
+        self.sessions: Set[Session] = set()
+        self._handlers: Set[asyncio.Task] = set()
+        self.battles: Set[asyncio.Task] = set()
+        self.matchmaking = matchmaking or MatchmakingQueue()
+        self.pool = BattlePool()
+        self.poll_interval = poll_interval
+        self._matchmaker: Optional[asyncio.Task] = None
+        self.turns_played = 0
+        self.battles_finished = 0
+        # Seconds from a turn's last move arriving to its result being ready; only kept when set to a list
+        self.turn_latencies: Optional[List[float]] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        # Store reads can wait on a flush in progress, so they run here instead of on the event loop
+        self._store_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="player-store")
+
+    async def start(self) -> asyncio.AbstractServer:
+        self._server = await asyncio.start_server(self._on_connect, self.host, self.port, backlog=1024)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._matchmaker = asyncio.get_running_loop().create_task(self._run_matchmaking())
+        return self._server
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._matchmaker is not None:
+            self._matchmaker.cancel()
+        for session in list(self.sessions):
+            session.close()
+        if self.battles or self._handlers:
+            await asyncio.gather(*self.battles, *self._handlers, return_exceptions=True)
+        await asyncio.get_running_loop().run_in_executor(self._store_executor, self.player_manager.flush)
+        self._store_executor.shutdown()
+
+    async def _on_connect(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        session = Session(self, reader, writer)
+        handler = asyncio.current_task()
+        self.sessions.add(session)
+        self._handlers.add(handler)
+        try:
+            await session.run()
+        finally:
+            self.sessions.discard(session)
+            self._handlers.discard(handler)
+
+    async def handle_message(self, session: Session, message: dict) -> None:
+        kind = message.get("type")
+        if kind == "login":
+            await self._login(session, message.get("name"))
+        elif session.player is None:
+            await session.error("Log in first")
+        elif kind == "play":
+            await self._play(session, message)
+        elif kind == "move":
+            if session.battle is None:
+                await session.error("Not in a battle")
+            else:
+                session.move_received = time.perf_counter()
+                session.moves.put_nowait(message.get("move"))
+        elif kind == "cancel":
+            if self.matchmaking.cancel(session):
+                await session.send({"type": "cancelled"})
+            else:
+                await session.error("Not waiting for an opponent")
+        elif kind == "stats":
+            player = session.player
+            await session.send({"type": "stats", "name": player.name, "wins": player.wins, "losses": player.losses,
+                                "rating": player_rating(player)})
+        else:
+            await session.error(f"Unknown request: {kind!r}")
+
+    async def _login(self, session: Session, name) -> None:
+        if not isinstance(name, str) or not name.strip() or len(name) > 32 or name == COMPUTER:
+            await session.error("Invalid player name")
+            return
+        if session.battle is not None:
+            await session.error("Cannot log in during a battle")
+            return
+        name = name.strip()
+        player = await asyncio.get_running_loop().run_in_executor(self._store_executor, self._find_player, name)
+        session.player = player
+        await session.send({"type": "welcome", "name": player.name, "wins": player.wins, "losses": player.losses,
+                            "rating": player_rating(player), "starters": list(get_starter_prototypes())})
+
+    def _find_player(self, name: str) -> Player:
+        """Load or create a player; runs on the store thread, one lookup at a time"""
+        return self.player_manager.get_player(name) or self.player_manager.create_player(name)
+
+    def _beyblade_for(self, player: Optional[Player], name) -> Optional[Beyblade]:
+        """A starter by name, or one of the player's saved custom beyblades"""
+        if not isinstance(name, str):
+            return None
+        beyblade = create_starter_beyblade(name)
+        if beyblade is None and player is not None:
+            for build in self.player_manager.get_custom_beyblades(player.name):
+                if build["name"] == name:
+                    return create_beyblade_from_data(build)
+        return beyblade
+
+    async def _play(self, session: Session, message: dict) -> None:
+        if session.battle is not None or session in self.matchmaking:
+            await session.error("Already playing")
+            return
+        beyblade = self._beyblade_for(session.player, message.get("beyblade"))
+        if beyblade is None:
+            await session.error(f"Unknown Beyblade: {message.get('beyblade')!r}")
+            return
+
+        mode = message.get("mode", "computer")
+        if mode == "computer":
+            opponent_name = message.get("opponent_beyblade") or self.rng.choice(list(get_starter_prototypes()))
+            opponent = create_starter_beyblade(opponent_name)
+            if opponent is None:
+                await session.error(f"Unknown Beyblade: {opponent_name!r}")
+                return
+            # The player moves first, like in the terminal game
+            self._start_battle((session, None), (beyblade, opponent))
+        elif mode == "pvp":
+            match = self.matchmaking.add(session, player_rating(session.player), beyblade)
+            if match is None:
+                await session.send({"type": "waiting"})
+            else:
+                self._start_match(*match)
+        else:
+            await session.error(f"Unknown mode: {mode!r}")
+
+    def _start_match(self, first, second) -> None:
+        """Start a PvP battle between two matched tickets; the one who waited longer moves first"""
+        self._start_battle((first.key, second.key), (first.payload, second.payload))
+
+    async def _run_matchmaking(self) -> None:
+        """Widen the windows of waiting players and start the battles that become possible"""
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            for first, second in self.matchmaking.poll():
+                self._start_match(first, second)
+
+    def _start_battle(self, sessions: Tuple[Optional[Session], Optional[Session]],
+                      beyblades: Tuple[Beyblade, Beyblade]) -> None:
+        battle = OnlineBattle(self, sessions, beyblades, random.Random(self.rng.getrandbits(64)))
+        for session in sessions:
+            if session is not None:
+                session.battle = battle
+        task = asyncio.get_running_loop().create_task(battle.run())
+        self.battles.add(task)
+
+        def finished(task: asyncio.Task) -> None:
+            self.battles.discard(task)
+            for session in sessions:
+                if session is not None and session.battle is battle:
+                    session.battle = None
+
+        task.add_done_callback(finished)
+
+    def record_turn_latency(self, sessions: Tuple[Optional[Session], Optional[Session]]) -> None:
+        received = max(session.move_received for session in sessions if session is not None)
+        latency = time.perf_counter() - received
+        TURN_SECONDS.observe(latency)
+        if self.turn_latencies is not None:
+            self.turn_latencies.append(latency)
+
+    def record_result(self, sessions: Tuple[Optional[Session], Optional[Session]], winner: int) -> None:
+        """Update wins and losses through PlayerManager; the Computer has no record"""
+        self.battles_finished += 1
+        BATTLES_FINISHED.inc()
+        with self.player_manager.transaction():
+            for side, session in enumerate(sessions):
+                if session is None or session.player is None:
+                    continue
+                player = session.player
+                if side == winner:
+                    player.wins += 1
+                else:
+                    player.losses += 1
+                self.player_manager.update_player(player)
+
+async def _bench_session(host: str, port: int, index: int, mode: str, battles: int, think_time: float, ramp: float,
+                         connect_limit: asyncio.Semaphore, latencies: List[float]) -> int:
+    """A scripted client playing battles with random moves; returns battles finished"""
+    rng = random.Random(index)
+    # Clients arrive spread over the ramp-up instead of all at once
+    await asyncio.sleep(rng.random() * ramp)
+    async with connect_limit:
+        reader, writer = await asyncio.open_connection(host, port)
+
+    async def send(message: dict) -> None:
+        writer.write((json.dumps(message) + "\n").encode("utf-8"))
+        await writer.drain()
+
+    finished = 0
+    await send({"type": "login", "name": f"bench{index}"})
+    starters = json.loads(await reader.readline())["starters"]
+    sent_at = None
+    for _ in range(battles):
+        await send({"type": "play", "mode": mode, "beyblade": rng.choice(starters)})
+        waiting = False
+        while True:
+            try:
+                # A PvP player left without anyone in range gives up instead of waiting forever
+                line = await asyncio.wait_for(reader.readline(), MATCH_TIMEOUT if waiting else None)
+            except asyncio.TimeoutError:
+                await send({"type": "cancel"})
+                await send({"type": "quit"})
+                writer.close()
+                return finished
+            message = json.loads(line)
+            kind = message["type"]
+            if kind == "waiting":
+                waiting = True
+            elif kind == "battle_start":
+                waiting = False
+            elif kind == "choose_move":
+                if think_time:
+                    await asyncio.sleep(rng.random() * 2 * think_time)
+                sent_at = time.perf_counter()
+                await send({"type": "move", "move": rng.randint(1, len(message["moves"]))})
+            elif kind == "turn" and sent_at is not None:
+                latencies.append(time.perf_counter() - sent_at)
+                sent_at = None
+            elif kind == "battle_end":
+                finished += 1
+                break
+            elif kind == "error":
+                raise BattleError(message["message"])
+    await send({"type": "quit"})
+    writer.close()
+    return finished
+
+async def run_bench(sessions: int, battles: int, think_time: float, ramp: float = 10.0, seed: int = 0,
+                    mode: str = "computer") -> dict:
+    """Run a server and `sessions` concurrent clients in this process and measure per-turn latency
+
+    "server" is the time from a turn's last move arriving to its result being
+    ready; "client" is the full round trip seen by the clients, which share the
+    event loop with the server and so include its queueing. In PvP mode the
+    client round trip also includes the opponent's think time.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        player_manager = server_player_manager(os.path.join(directory, "players.db"))
+        server = BattleServer(player_manager, port=0, seed=seed)
+        server.turn_latencies = []
+        await server.start()
+        latencies: List[float] = []
+        connect_limit = asyncio.Semaphore(256)
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            _bench_session(server.host, server.port, i, mode, battles, think_time, ramp, connect_limit, latencies)
+            for i in range(sessions)
+        ))
+        elapsed = time.perf_counter() - start
+        await server.close()
+        player_manager.close()
+
+    return {
+        "sessions": sessions,
+        "battles": server.battles_finished,
+        "turns": len(latencies),
+        "elapsed": elapsed,
+        "turns_per_second": len(latencies) / elapsed if elapsed else 0.0,
+        "server": latency_summary(server.turn_latencies),
+        "client": latency_summary(latencies),
+        "time_to_match": server.matchmaking.time_to_match()
+    }
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Multi-session Beyblade battle server")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = subparsers.add_parser("serve", help="Host battles on a local TCP port")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8765)
+    serve_parser.add_argument("--players", default="data/players.db",
+                              help="SQLite players database, or a .json players file (rewritten whole on every flush); "
+                                   "player_store.py migrate copies the game's players.json over")
+    serve_parser.add_argument("--seed", type=int, default=None)
+    serve_parser.add_argument("--computer", choices=sorted(POLICIES) + ["ai"], default="computer",
+                              help="Computer move policy; ai uses the expectimax search (about 5 ms per move)")
+    serve_parser.add_argument("--turn-timeout", type=float, default=120.0, help="Seconds before a silent player forfeits")
+    serve_parser.add_argument("--metrics-port", type=int, nargs="?", const=DEFAULT_PORT, default=None,
+                              help=f"Serve Prometheus metrics at http://127.0.0.1:PORT/metrics (default port {DEFAULT_PORT})")
+
+    bench_parser = subparsers.add_parser("bench", help="Measure per-turn latency with many concurrent sessions")
+    bench_parser.add_argument("--sessions", type=int, default=1000)
+    bench_parser.add_argument("--mode", choices=["computer", "pvp"], default="computer")
+    bench_parser.add_argument("--battles", type=int, default=1, help="Battles per session")
+    bench_parser.add_argument("--think", type=float, default=5.0, help="Mean seconds a client waits before moving")
+    bench_parser.add_argument("--ramp", type=float, default=10.0, help="Seconds over which clients connect")
+    args = parser.parse_args(argv)
+
+    tune_gc()
+    if args.command == "bench":
+        report = asyncio.run(run_bench(args.sessions, args.battles, args.think, args.ramp, mode=args.mode))
+        print(f"{report['sessions']} sessions, {report['battles']} battles, {report['turns']} turns "
+              f"in {report['elapsed']:.1f}s ({report['turns_per_second']:.0f} turns/sec)")
+        for side in ("server", "client"):
+            latency = report[side]
+            print(f"{side.capitalize()} turn latency: p50 {latency['p50_ms']:.2f} ms, "
+                  f"p99 {latency['p99_ms']:.2f} ms, max {latency['max_ms']:.2f} ms")
+        if args.mode == "pvp":
+            wait = report["time_to_match"]
+            print(f"Time to match: p50 {wait['p50_ms']:.0f} ms, p99 {wait['p99_ms']:.0f} ms, "
+                  f"max {wait['max_ms']:.0f} ms over {wait['matches']} matches")
+        return 0
+
+    if args.computer == "ai":
+        from ai import ComputerAI
+        computer_policy = ComputerAI(time_budget=0.005)
+    else:
+        computer_policy = POLICIES[args.computer]
+    player_manager = server_player_manager(args.players)
+    server = BattleServer(player_manager, args.host, args.port, args.seed, computer_policy, args.turn_timeout)
+
+    if args.metrics_port is not None:
+        serve_metrics(port=args.metrics_port)
+        print(f"Metrics at http://127.0.0.1:{args.metrics_port}/metrics")
+
+    async def serve() -> None:
+        await server.start()
+        print(f"Battle server listening on {server.host}:{server.port}")
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        player_manager.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
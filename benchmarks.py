@@ -0,0 +1,371 @@
+from contextlib import contextmanager, redirect_stdout
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+from beyblade import create_starter_beyblade
+from utils import latency_summary
+
+FORMAT_VERSION = 1
+SUITES = ("engine", "players", "game", "logs", "startup")
+PLAYER_COUNTS = (1000, 100000, 1000000)
+PLAYER_BACKENDS = ("json", "sqlite")
+# Relative change past which compare flags a metric as regressed
+REGRESSION_THRESHOLD = 0.10
+
+class Metric(NamedTuple):
+    value: float
+    unit: str
+    higher_is_better: bool
+
+Metrics = Dict[str, Metric]
+
+def per_second(run: Callable[[int], None], min_time: float, batch: int = 1000) -> float:
+    """Operations per second of run(batch), repeated until at least `min_time` seconds have passed"""
+    operations = 0
+    start = time.perf_counter()
+    while True:
+        run(batch)
+        operations += batch
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return operations / elapsed
+
+def latencies(operation: Callable[[], None], runs: int, budget: float) -> List[float]:
+    """Seconds per call of `operation`, for up to `runs` calls or until `budget` seconds are spent"""
+    samples = []
+    deadline = time.perf_counter() + budget
+    while len(samples) < runs:
+        start = time.perf_counter()
+        operation()
+        end = time.perf_counter()
+        samples.append(end - start)
+        if end >= deadline:
+            break
+    return samples
+
+def _latency_metrics(name: str, samples: List[float]) -> Metrics:
+    summary = latency_summary(samples)
+    return {
+        f"{name}.p50_ms": Metric(summary["p50_ms"], "ms", False),
+        f"{name}.p99_ms": Metric(summary["p99_ms"], "ms", False)
+    }
+
+@contextmanager
+def _scratch_directory(chdir: bool = False) -> Iterator[str]:
+    """Temporary directory, optionally made the working directory for code that writes to relative paths"""
+    directory = tempfile.mkdtemp(prefix="beyblade-bench-")
+    cwd = os.getcwd()
+    try:
+        if chdir:
+            os.chdir(directory)
+        yield directory
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(directory, ignore_errors=True)
+
+class _DiscardLog:
+    """Battle log writer that drops records, so battle benchmarks leave no files behind"""
+
+    def __init__(self):
+        self.last = None
+
+    def write(self, record: dict) -> None:
+        self.last = record
+
+def bench_engine(min_time: float) -> Metrics:
+    """use_special_move, BeyBattle.execute_turn and BattleSimulator throughput"""
+    from battle import BeyBattle
+    from simulation import BattleSimulator, random_policy
+
+    rng = random.Random(0)
+    pegasus = create_starter_beyblade("Storm Pegasus")
+    driger = create_starter_beyblade("Driger")
+    attacks = [move for move in pegasus.special_moves if move.move_type == "attack"]
+
+    def use_moves(count: int) -> None:
+        use_special_move = pegasus.use_special_move
+        for i in range(count):
+            use_special_move(attacks[i % len(attacks)], driger, rng)
+
+    metrics = {"engine.use_special_move": Metric(per_second(use_moves, min_time), "moves/s", True)}
+
+    log = _DiscardLog()
+    state = {"battle": None}
+
+    def execute_turns(count: int) -> None:
+        for _ in range(count):
+            battle = state["battle"]
+            if battle is None or battle.is_battle_over():
+                battle = state["battle"] = BeyBattle(pegasus.clone(), driger.clone(), log, rng)
+            move1 = random_policy(battle.beyblade1, battle.beyblade2, rng)
+            move2 = random_policy(battle.beyblade2, battle.beyblade1, rng)
+            battle.execute_turn(move1, move2)
+
+    metrics["engine.execute_turn"] = Metric(per_second(execute_turns, min_time), "turns/s", True)
+
+    battle = BeyBattle(pegasus.clone(), driger.clone(), log, rng)
+
+    def snapshot_restores(count: int, with_rng: bool) -> None:
+        snapshot, restore = battle.snapshot, battle.restore
+        for _ in range(count):
+            restore(snapshot(with_rng))
+
+    metrics["engine.snapshot_restore"] = Metric(per_second(lambda count: snapshot_restores(count, False), min_time),
+                                                "pairs/s", True)
+    metrics["engine.snapshot_restore_rng"] = Metric(per_second(lambda count: snapshot_restores(count, True), min_time),
+                                                    "pairs/s", True)
+
+    simulator = BattleSimulator(seed=0)
+    battles = turns = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < min_time:
+        summary = simulator.run_many(pegasus, driger, 1000)
+        battles += summary.battles
+        turns += summary.total_turns
+    elapsed = time.perf_counter() - start
+    metrics["engine.battles"] = Metric(battles / elapsed, "battles/s", True)
+    metrics["engine.battle_turns"] = Metric(turns / elapsed, "turns/s", True)
+    return metrics
+
+def _player_name(i: int) -> str:
+    return f"player{i:07d}"
+
+def _populate_players(backend: str, path: str, count: int) -> None:
+    """Write `count` players straight to a store file without building Player objects"""
+    if backend == "sqlite":
+        from player_store import SqlitePlayerStore
+        store = SqlitePlayerStore(path)
+        with store.transaction():
+            store.connection.executemany(
+                "INSERT INTO players (name, wins, losses, custom_beyblades) VALUES (?, ?, ?, '[]')",
+                ((_player_name(i), i % 50, i % 37) for i in range(count))
+            )
+        store.close()
+        return
+    # Same layout as json.dump(players, f, indent=2)
+    with open(path, "w") as f:
+        f.write("{")
+        for i in range(count):
+            name = _player_name(i)
+            entry = json.dumps({"name": name, "wins": i % 50, "losses": i % 37, "custom_beyblades": []}, indent=2)
+            f.write(f"{',' if i else ''}\n  \"{name}\": {entry.replace(chr(10), chr(10) + '  ')}")
+        f.write("\n}" if count else "}")
+
+def bench_players(count: int, backend: str, runs: int = 200, budget: float = 2.0) -> Metrics:
+    """PlayerManager load, create, update and save latency with `count` players on disk"""
+    from player import PlayerManager
+    from player_store import JsonPlayerStore, SqlitePlayerStore
+
+    prefix = f"players.{backend}.{count}"
+    with _scratch_directory() as directory:
+        path = os.path.join(directory, "players.db" if backend == "sqlite" else "players.json")
+        _populate_players(backend, path, count)
+
+        start = time.perf_counter()
+        store = SqlitePlayerStore(path) if backend == "sqlite" else JsonPlayerStore(path)
+        manager = PlayerManager(path, store=store)
+        metrics = {f"{prefix}.load_ms": Metric((time.perf_counter() - start) * 1000, "ms", False)}
+
+        created = iter(range(count, count * 2 + runs))
+        metrics.update(_latency_metrics(f"{prefix}.create", latencies(
+            lambda: manager.create_player(_player_name(next(created))), runs, budget)))
+
+        rng = random.Random(0)
+
+        def update() -> None:
+            player = manager.get_player(_player_name(rng.randrange(count)))
+            player.wins += 1
+            manager.update_player(player)
+
+        metrics.update(_latency_metrics(f"{prefix}.update", latencies(update, runs, budget)))
+        metrics.update(_latency_metrics(f"{prefix}.save", latencies(manager.save_players, runs, budget)))
+        manager.close()
+    return metrics
+
+def bench_load_game(runs: int = 1000, budget: float = 2.0) -> Metrics:
+    """Save and resume latency of main.save_game/load_game for a starter-vs-Computer game in a checkpoint slot"""
+    os.environ.setdefault("BEYBLADE_HEADLESS", "1")
+    import main
+    from environment import EnvironmentManager
+    from player import PlayerManager
+
+    with _scratch_directory(chdir=True):
+        # The checkpoint store is opened on first use, so this one lives in the scratch directory
+        main._checkpoint_store = None
+        manager = PlayerManager("data/players.json")
+        player = manager.create_player("bench")
+        environment = EnvironmentManager()
+        player_beyblade = create_starter_beyblade("Storm Pegasus")
+        opponent_beyblade = create_starter_beyblade("Driger")
+        with redirect_stdout(io.StringIO()):
+            save_samples = latencies(lambda: main.save_game(player, player_beyblade, "Computer", opponent_beyblade, 3,
+                                                            environment), runs, budget)
+        if main.load_game(manager, player.name, environment) is None:
+            raise RuntimeError("load_game could not resume the benchmark save")
+        load_samples = latencies(lambda: main.load_game(manager, player.name, environment), runs, budget)
+        main.get_checkpoint_store().close()
+        main._checkpoint_store = None
+        manager.close()
+    metrics = _latency_metrics("game.save_game", save_samples)
+    metrics.update(_latency_metrics("game.load_game", load_samples))
+    return metrics
+
+def bench_battle_logs(min_time: float) -> Metrics:
+    """save_battle_log throughput for one JSON file per battle and for the JSONL log writer"""
+    from battle import BeyBattle
+    from battle_log import JsonlLogWriter
+    from simulation import random_policy
+    from utils import save_battle_log
+
+    # A real battle record, timestamps and all
+    rng = random.Random(0)
+    log = _DiscardLog()
+    battle = BeyBattle(create_starter_beyblade("Storm Pegasus"), create_starter_beyblade("Driger"), log, rng)
+    while not battle.is_battle_over():
+        battle.execute_turn(random_policy(battle.beyblade1, battle.beyblade2, rng),
+                            random_policy(battle.beyblade2, battle.beyblade1, rng))
+    record = log.last
+
+    metrics = {}
+    with _scratch_directory(chdir=True):
+        metrics["logs.save_battle_log.json_files"] = Metric(per_second(
+            lambda count: [save_battle_log(f"bench-{i}", record) for i in range(count)], min_time, 100),
+            "logs/s", True)
+
+    with _scratch_directory() as directory:
+        writer = JsonlLogWriter(directory)
+        start = time.perf_counter()
+        written = 0
+        while time.perf_counter() - start < min_time:
+            for _ in range(1000):
+                save_battle_log(battle.battle_id, record, writer)
+            written += 1000
+        writer.close()
+        metrics["logs.save_battle_log.jsonl"] = Metric(written / (time.perf_counter() - start), "logs/s", True)
+    return metrics
+
+def bench_startup(runs: int = 3) -> Metrics:
+    """Median cold import time of every module import_budget tracks"""
+    from import_budget import BUDGETS_MS, budget_report
+
+    return {
+        f"startup.import.{module}_ms": Metric(budget_report(module, runs, top=0)["median_ms"], "ms", False)
+        for module in sorted(BUDGETS_MS)
+    }
+
+def run_benchmarks(suites=SUITES, counts=PLAYER_COUNTS, backends=PLAYER_BACKENDS, min_time: float = 1.0,
+                   progress: Optional[Callable[[str, Metric], None]] = None) -> dict:
+    """Run the chosen suites and return the report compare() reads"""
+    metrics: Metrics = {}
+
+    def add(results: Metrics) -> None:
+        for name, metric in results.items():
+            metrics[name] = metric
+            if progress is not None:
+                progress(name, metric)
+
+    if "engine" in suites:
+        add(bench_engine(min_time))
+    if "players" in suites:
+        for backend in backends:
+            for count in counts:
+                add(bench_players(count, backend))
+    if "game" in suites:
+        add(bench_load_game())
+    if "logs" in suites:
+        add(bench_battle_logs(min_time))
+    if "startup" in suites:
+        add(bench_startup())
+    return {
+        "format": FORMAT_VERSION,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "metrics": {name: metric._asdict() for name, metric in metrics.items()}
+    }
+
+def compare(baseline: dict, current: dict, threshold: float = REGRESSION_THRESHOLD) -> List[dict]:
+    """Metrics present in both reports, each with its relative change and whether it regressed past `threshold`"""
+    rows = []
+    for name, base in baseline["metrics"].items():
+        now = current["metrics"].get(name)
+        if now is None:
+            continue
+        change = (now["value"] - base["value"]) / base["value"] if base["value"] else 0.0
+        worse = -change if base["higher_is_better"] else change
+        rows.append({
+            "metric": name,
+            "unit": base["unit"],
+            "baseline": base["value"],
+            "current": now["value"],
+            "change": change,
+            "regressed": worse > threshold
+        })
+    return rows
+
+def _format(metric: Metric) -> str:
+    return f"{metric.value:,.2f} {metric.unit}" if metric.value < 1000 else f"{metric.value:,.0f} {metric.unit}"
+
+def _csv(value: str) -> List[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks for the battle engine, persistence and startup")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run benchmarks and write the results as JSON")
+    run_parser.add_argument("--suites", type=_csv, default=list(SUITES), help=f"Comma-separated, from: {', '.join(SUITES)}")
+    run_parser.add_argument("--players", type=_csv, default=[str(count) for count in PLAYER_COUNTS],
+                            help="Comma-separated player counts for the players suite")
+    run_parser.add_argument("--backends", type=_csv, default=list(PLAYER_BACKENDS), help="json, sqlite or both")
+    run_parser.add_argument("--min-time", type=float, default=1.0, help="Seconds per throughput benchmark")
+    run_parser.add_argument("--output", default="benchmarks.json", help="Where to write the results")
+
+    compare_parser = subparsers.add_parser("compare", help="Flag regressions of a run against a baseline")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                                help="Relative change that counts as a regression (default: 0.10)")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        unknown = [suite for suite in args.suites if suite not in SUITES]
+        unknown += [backend for backend in args.backends if backend not in PLAYER_BACKENDS]
+        if unknown:
+            parser.error(f"Unknown suite or backend: {', '.join(unknown)}")
+        report = run_benchmarks(args.suites, [int(count) for count in args.players], args.backends, args.min_time,
+                                progress=lambda name, metric: print(f"{name}: {_format(metric)}", flush=True))
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    rows = compare(baseline, current, args.threshold)
+    for row in rows:
+        flag = "  REGRESSION" if row["regressed"] else ""
+        print(f"{row['metric']}: {row['baseline']:,.2f} -> {row['current']:,.2f} {row['unit']} "
+              f"({row['change']:+.1%}){flag}")
+    missing = sorted(set(baseline["metrics"]) - set(current["metrics"]))
+    if missing:
+        print(f"{len(missing)} baseline metric(s) not in the current run, e.g. {missing[0]}")
+    regressions = sum(row["regressed"] for row in rows)
+    print(f"{regressions} regression(s) past {args.threshold:.0%} in {len(rows)} metrics")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
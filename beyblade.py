@@ -1,9 +1,10 @@
-from dataclasses import dataclass
-from typing import List, Dict
-from utils import TYPE_ADVANTAGES, SpecialMoveError, calculate_damage, calculate_stamina_loss
+from dataclasses import dataclass, replace
+from typing import List, Dict, Optional, Tuple
+from utils import TYPE_ADVANTAGES, SpecialMoveError, calculate_damage, calculate_stamina_loss, load_json_data
+import os
 import random
 
-@dataclass
+@dataclass(frozen=True)
 class SpecialMove:
     name: str
     power: int
@@ -13,19 +14,87 @@ class SpecialMove:
         move_type_str = "🔥 Critical" if self.move_type == "critical" else self.move_type.title()
         return f"{self.name} ({move_type_str}, Power: {self.power})"
 
+@dataclass(frozen=True)
+class BeybladeDefinition:
+    """Identity, stats and moves of a Beyblade, shared by every copy of it"""
+    name: str
+    type: str
+    power: int
+    defense: int
+    special_moves: Tuple[SpecialMove, ...]
+    
+    def __post_init__(self):
+        object.__setattr__(self, 'special_moves', tuple(self.special_moves))
+
+def _definition_field(field: str) -> property:
+    """Beyblade attribute read from its definition; assigning it gives that Beyblade its own definition"""
+    def get(self):
+        return getattr(self.definition, field)
+    
+    def set(self, value):
+        self.definition = replace(self.definition, **{field: value})
+    
+    return property(get, set)
+
+# Mutable battle state of a Beyblade, in the order get_state/set_state use
+STATE_FIELDS = ('health', 'stamina', 'spin_speed', 'defense_count', 'critical_used', 'defense_active', 'is_stadium_out')
+
 class Beyblade:
+    # Slots keep a live Beyblade small; everything else sits in the shared definition
+    __slots__ = ('definition',) + STATE_FIELDS + ('available_moves',)
+    
+    name = _definition_field('name')
+    type = _definition_field('type')
+    power = _definition_field('power')
+    defense = _definition_field('defense')
+    special_moves = _definition_field('special_moves')
+    
     def __init__(self, name: str, type: str, power: int, defense: int, special_moves: List[SpecialMove]):
-        self.name = name
-        self.type = type
-        self.power = power
-        self.defense = defense
+        self.definition = BeybladeDefinition(name, type, power, defense, special_moves)
+        self.reset()
+    
+    def reset(self):
+        """Start-of-battle state"""
         self.health = 100
         self.stamina = 100  # New stamina attribute
         self.spin_speed = 100  # New spin speed attribute
-        self.special_moves = special_moves
         self.defense_count = 2
         self.critical_used = False
-        self.available_moves = []
+        self.defense_active = False
+        self.is_stadium_out = False
+        self.available_moves = ()
+    
+    @classmethod
+    def from_definition(cls, definition: BeybladeDefinition) -> 'Beyblade':
+        """Fresh Beyblade for an existing definition"""
+        beyblade = object.__new__(cls)
+        beyblade.definition = definition
+        beyblade.reset()
+        return beyblade
+    
+    def clone(self) -> 'Beyblade':
+        """Copy for another battle: battle state is copied, the definition is shared"""
+        clone = object.__new__(self.__class__)
+        clone.definition = self.definition
+        clone.health = self.health
+        clone.stamina = self.stamina
+        clone.spin_speed = self.spin_speed
+        clone.defense_count = self.defense_count
+        clone.critical_used = self.critical_used
+        clone.defense_active = self.defense_active
+        clone.is_stadium_out = self.is_stadium_out
+        clone.available_moves = ()
+        return clone
+    
+    def get_state(self) -> tuple:
+        """Battle state as a tuple in STATE_FIELDS order"""
+        return (self.health, self.stamina, self.spin_speed, self.defense_count, self.critical_used,
+                self.defense_active, self.is_stadium_out)
+    
+    def set_state(self, state: tuple):
+        """Restore battle state captured by get_state"""
+        (self.health, self.stamina, self.spin_speed, self.defense_count, self.critical_used,
+         self.defense_active, self.is_stadium_out) = state
     
     def start_turn(self):
         """Reset turn-specific attributes"""
@@ -37,7 +106,7 @@ class Beyblade:
         if self.stamina < 30:
             self.spin_speed = max(0, self.spin_speed - 5)
     
-    def use_special_move(self, move: SpecialMove, opponent: 'Beyblade') -> dict:
+    def use_special_move(self, move: SpecialMove, opponent: 'Beyblade', rng=random) -> dict:
         """Use a special move and return the result"""
         if move.move_type == "defense":
             if self.defense_count <= 0:
@@ -46,32 +115,34 @@ class Beyblade:
             self.defense_active = True
             return {'defense_remaining': self.defense_count}
         
+        definition = self.definition
         if move.move_type == "critical":
             if self.critical_used:
                 return {'error': 'critical_already_used'}
             self.critical_used = True
             # Critical moves have higher base damage
-            base_damage = int((self.power * move.power) / 150)  # Less reduction for critical moves
+            base_damage = int((definition.power * move.power) / 150)  # Less reduction for critical moves
             spin_multiplier = (self.spin_speed / 100) * 0.9  # Higher spin multiplier for critical
             final_damage = int(base_damage * spin_multiplier)
             is_critical = True
         else:
             # Normal attack calculation
-            base_damage = int((self.power * move.power) / 200)
+            base_damage = int((definition.power * move.power) / 200)
             spin_multiplier = (self.spin_speed / 100) * 0.7
             final_damage = int(base_damage * spin_multiplier)
             is_critical = False
         
         # Apply type advantage
-        if self.type == "attack" and opponent.type == "defense":
+        own_type, opponent_type = definition.type, opponent.definition.type
+        if own_type == "attack" and opponent_type == "defense":
             final_damage = int(final_damage * 1.1)
-        elif self.type == "defense" and opponent.type == "stamina":
+        elif own_type == "defense" and opponent_type == "stamina":
             final_damage = int(final_damage * 1.1)
-        elif self.type == "stamina" and opponent.type == "attack":
+        elif own_type == "stamina" and opponent_type == "attack":
             final_damage = int(final_damage * 1.1)
         
         # Additional critical hit chance for non-critical moves
-        if not is_critical and self.spin_speed > 70 and random.random() < 0.3:
+        if not is_critical and self.spin_speed > 70 and rng.random() < 0.3:
             final_damage = int(final_damage * 1.2)
             is_critical = True
         
@@ -98,13 +169,27 @@ class Beyblade:
         return f"{self.name} ({self.type}) - Health: {self.health}, Stamina: {self.stamina}, Spin Speed: {self.spin_speed}\n" \
                f"Critical Move: {critical_status}, Defense Moves: {defense_status}"
 
+# Signature moves of each starter Beyblade, by name
+STARTER_MOVES: Dict[str, Tuple[str, ...]] = {
+    "L-Drago Destructor": ("Dragon Emperor Soaring Bite Strike", "Dragon Emperor Shield", "Dragon Emperor Supreme Flight"),
+    "Storm Pegasus": ("Pegasus Starblast Attack", "Pegasus Shield", "Pegasus Stardust Driver"),
+    "Rock Leone": ("Lion Wild Wind Fang Dance", "Lion Shield", "Lion Reverse Wind Strike"),
+    "Dark Bull": ("Bull Upper Attack", "Bull Defense Wall", "Bull Destruction"),
+    "Draciel": ("Turtle Shell Attack", "Turtle Shell Defense", "Turtle Shell Counter"),
+    "Dragoon": ("Dragon Emperor Strike", "Dragon Emperor Shield", "Dragon Emperor Critical"),
+    "Dranzer": ("Phoenix Wing Attack", "Phoenix Wing Shield", "Phoenix Wing Critical"),
+    "Driger": ("Tiger Claw Attack", "Tiger Claw Shield", "Tiger Claw Critical")
+}
+
 # Specific Beyblades
 class DragonFury(Beyblade):
+    __slots__ = ()
+    
     def __init__(self, special_moves: list[SpecialMove]):
         # Select attack, defense, and critical moves
         dragon_moves = [
             move for move in special_moves 
-            if move.name in ["Dragon Emperor Soaring Bite Strike", "Dragon Emperor Shield", "Dragon Emperor Supreme Flight"]
+            if move.name in STARTER_MOVES["L-Drago Destructor"]
         ]
         super().__init__(
             name="L-Drago Destructor",
@@ -115,11 +200,13 @@ class DragonFury(Beyblade):
         )
 
 class StormPegasus(Beyblade):
+    __slots__ = ()
+    
     def __init__(self, special_moves: list[SpecialMove]):
         # Select attack, defense, and critical moves
         pegasus_moves = [
             move for move in special_moves 
-            if move.name in ["Pegasus Starblast Attack", "Pegasus Shield", "Pegasus Stardust Driver"]
+            if move.name in STARTER_MOVES["Storm Pegasus"]
         ]
         super().__init__(
             name="Storm Pegasus",
@@ -130,11 +217,13 @@ class StormPegasus(Beyblade):
         )
 
 class RockLion(Beyblade):
+    __slots__ = ()
+    
     def __init__(self, special_moves: list[SpecialMove]):
         # Select attack, defense, and critical moves
         lion_moves = [
             move for move in special_moves 
-            if move.name in ["Lion Wild Wind Fang Dance", "Lion Shield", "Lion Reverse Wind Strike"]
+            if move.name in STARTER_MOVES["Rock Leone"]
         ]
         super().__init__(
             name="Rock Leone",
@@ -145,11 +234,13 @@ class RockLion(Beyblade):
         )
 
 class DarkBull(Beyblade):
+    __slots__ = ()
+    
     def __init__(self, special_moves: list[SpecialMove]):
         # Select attack, defense, and critical moves
         bull_moves = [
             move for move in special_moves 
-            if move.name in ["Bull Upper Attack", "Bull Defense Wall", "Bull Destruction"]
+            if move.name in STARTER_MOVES["Dark Bull"]
         ]
         super().__init__(
             name="Dark Bull",
@@ -160,11 +251,13 @@ class DarkBull(Beyblade):
         )
 
 class Draciel(Beyblade):
+    __slots__ = ()
+    
     def __init__(self, special_moves: list[SpecialMove]):
         # Select attack, defense, and critical moves
         draciel_moves = [
             move for move in special_moves 
-            if move.name in ["Turtle Shell Attack", "Turtle Shell Defense", "Turtle Shell Counter"]
+            if move.name in STARTER_MOVES["Draciel"]
         ]
         super().__init__(
             name="Draciel",
@@ -175,11 +268,13 @@ class Draciel(Beyblade):
         )
 
 class Dragoon(Beyblade):
+    __slots__ = ()
+    
     def __init__(self, special_moves: list[SpecialMove]):
         # Select attack, defense, and critical moves
         dragoon_moves = [
             move for move in special_moves 
-            if move.name in ["Dragon Emperor Strike", "Dragon Emperor Shield", "Dragon Emperor Critical"]
+            if move.name in STARTER_MOVES["Dragoon"]
         ]
         super().__init__(
             name="Dragoon",
@@ -190,11 +285,13 @@ class Dragoon(Beyblade):
         )
 
 class Dranzer(Beyblade):
+    __slots__ = ()
+    
     def __init__(self, special_moves: list[SpecialMove]):
         # Select attack, defense, and critical moves
         dranzer_moves = [
             move for move in special_moves 
-            if move.name in ["Phoenix Wing Attack", "Phoenix Wing Shield", "Phoenix Wing Critical"]
+            if move.name in STARTER_MOVES["Dranzer"]
         ]
         super().__init__(
             name="Dranzer",
@@ -205,11 +302,13 @@ class Dranzer(Beyblade):
         )
 
 class Driger(Beyblade):
+    __slots__ = ()
+    
     def __init__(self, special_moves: list[SpecialMove]):
         # Select attack, defense, and critical moves
         driger_moves = [
             move for move in special_moves 
-            if move.name in ["Tiger Claw Attack", "Tiger Claw Shield", "Tiger Claw Critical"]
+            if move.name in STARTER_MOVES["Driger"]
         ]
         super().__init__(
             name="Driger",
@@ -219,3 +318,106 @@ class Driger(Beyblade):
             special_moves=driger_moves
         )
 
+def load_moves() -> dict:
+    """Load moves from JSON file"""
+    return load_json_data(os.path.join('data', 'moves.json'))
+
+class MoveRegistry:
+    """Every move in moves.json, loaded once and shared by all Beyblades
+
+    SpecialMove is frozen, so one instance per distinct move can safely be
+    handed to any number of Beyblades and battles.
+    """
+    
+    def __init__(self, moves_data: dict):
+        self._interned: Dict[Tuple[str, int, str], SpecialMove] = {}
+        self.moves: Tuple[SpecialMove, ...] = tuple(
+            self.intern(move)
+            for move_type in ['attack_moves', 'defense_moves', 'critical_moves']
+            for move in moves_data[move_type]
+        )
+        self.by_name: Dict[str, SpecialMove] = {}
+        by_type: Dict[str, List[SpecialMove]] = {}
+        for move in self.moves:
+            # Two different "Dragon Emperor Shield" moves exist; the first one wins here
+            self.by_name.setdefault(move.name, move)
+            by_type.setdefault(move.move_type, []).append(move)
+        self.by_type: Dict[str, Tuple[SpecialMove, ...]] = {move_type: tuple(moves) for move_type, moves in by_type.items()}
+        # Same selection and order as the starter constructors' filtering
+        self.by_starter: Dict[str, Tuple[SpecialMove, ...]] = {
+            beyblade_name: tuple(move for move in self.moves if move.name in move_names)
+            for beyblade_name, move_names in STARTER_MOVES.items()
+        }
+    
+    def intern(self, move_data: dict) -> SpecialMove:
+        """The shared SpecialMove for move data, created on first sight"""
+        key = (move_data['name'], move_data['power'], move_data['move_type'])
+        move = self._interned.get(key)
+        if move is None:
+            move = self._interned[key] = SpecialMove(*key)
+        return move
+    
+    def get(self, name: str) -> Optional[SpecialMove]:
+        return self.by_name.get(name)
+    
+    def of_type(self, move_type: str) -> Tuple[SpecialMove, ...]:
+        return self.by_type.get(move_type, ())
+    
+    def for_starter(self, beyblade_name: str) -> Tuple[SpecialMove, ...]:
+        return self.by_starter.get(beyblade_name, ())
+
+_move_registry: Optional[MoveRegistry] = None
+
+def get_move_registry() -> MoveRegistry:
+    """The process-wide move registry, loading moves.json on first use"""
+    global _move_registry
+    if _move_registry is None:
+        _move_registry = MoveRegistry(load_moves())
+    return _move_registry
+
+def create_move_from_data(move_data: dict) -> SpecialMove:
+    """Create a SpecialMove object from move data"""
+    return get_move_registry().intern(move_data)
+
+STARTER_CLASSES = (DragonFury, StormPegasus, RockLion, DarkBull, Draciel, Dragoon, Dranzer, Driger)
+
+_starter_prototypes: Optional[Dict[str, Beyblade]] = None
+
+def get_starter_prototypes() -> Dict[str, Beyblade]:
+    """Starter Beyblades built once per process, by name; hand out clones, never these"""
+    global _starter_prototypes
+    if _starter_prototypes is None:
+        all_moves = get_move_registry().moves
+        prototypes = {}
+        for starter_class in STARTER_CLASSES:
+            beyblade = starter_class(special_moves=all_moves)
+            # Boost stats for computer opponents
+            beyblade.power = int(beyblade.power * 1.2)
+            beyblade.defense = int(beyblade.defense * 1.2)
+            prototypes[beyblade.name] = beyblade
+        _starter_prototypes = prototypes
+    return _starter_prototypes
+
+def create_starter_beyblade(name: str) -> Optional[Beyblade]:
+    """Fresh copy of one starter Beyblade, or None for an unknown name"""
+    prototype = get_starter_prototypes().get(name)
+    return prototype.clone() if prototype is not None else None
+
+def create_starter_beyblades() -> list:
+    """Create starter Beyblades with their special moves"""
+    return [prototype.clone() for prototype in get_starter_prototypes().values()]
+
+def create_beyblade_from_data(beyblade_data: dict) -> Beyblade:
+    """Create a Beyblade object from saved custom beyblade data"""
+    special_moves = []
+    for move_type in ['attack_moves', 'defense_moves', 'critical_moves']:
+        for move in beyblade_data.get("special_moves", {}).get(move_type, []):
+            special_moves.append(create_move_from_data(move))
+    
+    return Beyblade(
+        name=beyblade_data["name"],
+        type=beyblade_data["type"],
+        power=beyblade_data["power"],
+        defense=beyblade_data["defense"],
+        special_moves=special_moves
+    )
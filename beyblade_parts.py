@@ -134,6 +134,19 @@ class BeybladePartsManager:
             "special_moves": custom_moves
         }
     
+    def create_all_custom_beyblades(self) -> List[dict]:
+        """Create a custom beyblade for every combination of parts"""
+        return [
+            self.create_custom_beyblade(
+                f"{energy_ring.name} {fusion_wheel.name} {spin_track.name} {performance_tip.name}",
+                energy_ring, fusion_wheel, spin_track, performance_tip
+            )
+            for energy_ring in self.energy_rings
+            for fusion_wheel in self.fusion_wheels
+            for spin_track in self.spin_tracks
+            for performance_tip in self.performance_tips
+        ]
+    
     def get_available_parts(self) -> Dict[str, List[str]]:
         """Get lists of available parts"""
         return {
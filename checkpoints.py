@@ -0,0 +1,317 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+import atexit
+import json
+import os
+import struct
+import threading
+from beyblade import Beyblade, BeybladeDefinition, SpecialMove, get_move_registry
+from utils import BattleError
+
+MAGIC = b"BBCP"
+VERSION = 1
+SUFFIX = ".ckpt"
+INDEX_FILE = "index.json"
+
+_HEADER = struct.Struct("<4sBI")  # magic, version, current turn
+_LENGTH = struct.Struct("<H")  # string byte length, move count
+_STATS = struct.Struct("<iihhhbB")  # power, defense, health, stamina, spin speed, defense count, flags
+_MOVE = struct.Struct("<H")  # move registry id, or INLINE_MOVE followed by the move itself
+_POWER = struct.Struct("<i")
+_ENVIRONMENT = struct.Struct("<bh")  # event index (-1 for none), turns it has left
+_RNG = struct.Struct("<BB625IBd")  # has state, Mersenne Twister version, key + position, has gauss_next, gauss_next
+INLINE_MOVE = 0xFFFF
+
+CRITICAL_USED, DEFENSE_ACTIVE, STADIUM_OUT = 1, 2, 4
+
+# Characters slot file names keep as they are; everything else is escaped, upper case too,
+# so names that differ only in case stay apart on case-insensitive file systems
+_FILE_NAME_SAFE = frozenset("abcdefghijklmnopqrstuvwxyz0123456789-")
+_MAX_FILE_NAME = 250
+
+@dataclass
+class Checkpoint:
+    """Everything needed to resume a battle exactly where it was left"""
+    player_name: str
+    opponent_name: str
+    current_turn: int
+    beyblades: Tuple[Beyblade, Beyblade]
+    event_index: int = -1  # index of the current event in the environment's events, -1 for none
+    event_duration: int = 0
+    rng_state: Optional[tuple] = None  # random.getstate() of the battle's RNG
+
+    @classmethod
+    def capture(cls, player_name: str, opponent_name: str, current_turn: int, beyblades: Tuple[Beyblade, Beyblade],
+                environment=None, rng=None) -> 'Checkpoint':
+        """Checkpoint of a running battle; Beyblades are cloned, the environment and RNG are read"""
+        event_index, event_duration = -1, 0
+        if environment is not None and environment.current_event is not None:
+            event_index = environment.events.index(environment.current_event)
+            event_duration = environment.event_duration
+        return cls(player_name, opponent_name, current_turn, tuple(beyblade.clone() for beyblade in beyblades),
+                   event_index, event_duration, rng.getstate() if rng is not None else None)
+
+    def restore_environment(self, environment) -> None:
+        environment.current_event = environment.events[self.event_index] if self.event_index >= 0 else None
+        environment.event_duration = self.event_duration
+
+    def restore_rng(self, rng) -> None:
+        if self.rng_state is not None:
+            rng.setstate(self.rng_state)
+
+    def rewind(self, beyblades: Tuple[Beyblade, Beyblade], environment=None, rng=None) -> None:
+        """Put a running battle back where this checkpoint of it was captured"""
+        for beyblade, saved in zip(beyblades, self.beyblades):
+            beyblade.set_state(saved.get_state())
+        if environment is not None:
+            self.restore_environment(environment)
+        if rng is not None:
+            self.restore_rng(rng)
+
+_registry_ids: Optional[Dict[SpecialMove, int]] = None
+
+def _move_ids() -> Dict[SpecialMove, int]:
+    global _registry_ids
+    if _registry_ids is None:
+        _registry_ids = {move: i for i, move in enumerate(get_move_registry().moves)}
+    return _registry_ids
+
+def _pack_string(parts: List[bytes], text: str) -> None:
+    data = text.encode("utf-8")
+    parts.append(_LENGTH.pack(len(data)))
+    parts.append(data)
+
+def _unpack_string(data: bytes, offset: int) -> Tuple[str, int]:
+    length, = _LENGTH.unpack_from(data, offset)
+    offset += _LENGTH.size
+    return bytes(data[offset:offset + length]).decode("utf-8"), offset + length
+
+def pack_beyblade(parts: List[bytes], beyblade: Beyblade) -> None:
+    """Append a Beyblade's definition and battle state; registry moves are stored as ids, other moves inline"""
+    move_ids = _move_ids()
+    _pack_string(parts, beyblade.name)
+    _pack_string(parts, beyblade.type)
+    flags = ((CRITICAL_USED if beyblade.critical_used else 0) | (DEFENSE_ACTIVE if beyblade.defense_active else 0)
+             | (STADIUM_OUT if beyblade.is_stadium_out else 0))
+    parts.append(_STATS.pack(beyblade.power, beyblade.defense, beyblade.health, beyblade.stamina,
+                             beyblade.spin_speed, beyblade.defense_count, flags))
+    moves = beyblade.special_moves
+    parts.append(_LENGTH.pack(len(moves)))
+    for move in moves:
+        move_id = move_ids.get(move)
+        if move_id is not None:
+            parts.append(_MOVE.pack(move_id))
+            continue
+        parts.append(_MOVE.pack(INLINE_MOVE))
+        _pack_string(parts, move.name)
+        parts.append(_POWER.pack(move.power))
+        _pack_string(parts, move.move_type)
+
+def unpack_beyblade(data: bytes, offset: int) -> Tuple[Beyblade, int]:
+    """The Beyblade packed at `offset` by pack_beyblade(), and the offset just past it"""
+    registry = get_move_registry()
+    name, offset = _unpack_string(data, offset)
+    beyblade_type, offset = _unpack_string(data, offset)
+    power, defense, health, stamina, spin_speed, defense_count, flags = _STATS.unpack_from(data, offset)
+    offset += _STATS.size
+    count, = _LENGTH.unpack_from(data, offset)
+    offset += _LENGTH.size
+    moves = []
+    for _ in range(count):
+        move_id, = _MOVE.unpack_from(data, offset)
+        offset += _MOVE.size
+        if move_id != INLINE_MOVE:
+            moves.append(registry.moves[move_id])
+            continue
+        move_name, offset = _unpack_string(data, offset)
+        move_power, = _POWER.unpack_from(data, offset)
+        move_type, offset = _unpack_string(data, offset + _POWER.size)
+        moves.append(registry.intern({"name": move_name, "power": move_power, "move_type": move_type}))
+    beyblade = Beyblade.from_definition(BeybladeDefinition(name, beyblade_type, power, defense, moves))
+    beyblade.set_state((health, stamina, spin_speed, defense_count, bool(flags & CRITICAL_USED),
+                        bool(flags & DEFENSE_ACTIVE), bool(flags & STADIUM_OUT)))
+    return beyblade, offset
+
+def encode_checkpoint(checkpoint: Checkpoint) -> bytes:
+    """Versioned binary snapshot of a Checkpoint"""
+    parts = [_HEADER.pack(MAGIC, VERSION, checkpoint.current_turn)]
+    _pack_string(parts, checkpoint.player_name)
+    _pack_string(parts, checkpoint.opponent_name)
+    for beyblade in checkpoint.beyblades:
+        pack_beyblade(parts, beyblade)
+    parts.append(_ENVIRONMENT.pack(checkpoint.event_index, checkpoint.event_duration))
+    state = checkpoint.rng_state
+    if state is None:
+        parts.append(_RNG.pack(0, 0, *([0] * 625), 0, 0.0))
+    else:
+        version, key, gauss_next = state
+        parts.append(_RNG.pack(1, version, *key, gauss_next is not None, gauss_next or 0.0))
+    return b"".join(parts)
+
+def decode_checkpoint(data: bytes) -> Checkpoint:
+    """Rebuild a Checkpoint from encode_checkpoint() output"""
+    magic, version, current_turn = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise BattleError("Not a checkpoint")
+    if version != VERSION:
+        raise BattleError(f"Unsupported checkpoint version {version}")
+    player_name, offset = _unpack_string(data, _HEADER.size)
+    opponent_name, offset = _unpack_string(data, offset)
+    beyblade1, offset = unpack_beyblade(data, offset)
+    beyblade2, offset = unpack_beyblade(data, offset)
+    event_index, event_duration = _ENVIRONMENT.unpack_from(data, offset)
+    offset += _ENVIRONMENT.size
+    has_state, rng_version, *key, has_gauss, gauss_next = _RNG.unpack_from(data, offset)
+    rng_state = (rng_version, tuple(key), gauss_next if has_gauss else None) if has_state else None
+    return Checkpoint(player_name, opponent_name, current_turn, (beyblade1, beyblade2), event_index, event_duration,
+                      rng_state)
+
+def slot_file_name(slot: str) -> str:
+    """File name of a slot: lower-case letters, digits and '-' are kept, other UTF-8 bytes become _xx"""
+    if not slot:
+        raise ValueError("Checkpoint slot names cannot be empty")
+    name = "".join(char if char in _FILE_NAME_SAFE else "".join(f"_{byte:02x}" for byte in char.encode("utf-8"))
+                   for char in slot) + SUFFIX
+    if len(name) > _MAX_FILE_NAME:
+        raise ValueError(f"Checkpoint slot name is too long: {slot!r}")
+    return name
+
+def slot_from_file_name(name: str) -> str:
+    """Slot name of a slot_file_name(); ValueError for any other file name"""
+    if not name.endswith(SUFFIX):
+        raise ValueError(f"Not a checkpoint file: {name!r}")
+    encoded = name[:-len(SUFFIX)]
+    data = bytearray()
+    i = 0
+    while i < len(encoded):
+        char = encoded[i]
+        if char == "_":
+            data.append(int(encoded[i + 1:i + 3], 16))
+            i += 3
+        elif char in _FILE_NAME_SAFE:
+            data.append(ord(char))
+            i += 1
+        else:
+            raise ValueError(f"Not a checkpoint file: {name!r}")
+    slot = data.decode("utf-8")
+    if slot_file_name(slot) != name:
+        raise ValueError(f"Not a checkpoint file: {name!r}")
+    return slot
+
+class CheckpointStore:
+    """Named checkpoint slots in a directory, one snapshot file per slot
+
+    Each save replaces the slot's file atomically (temp file and rename;
+    pass fsync=True to also survive power loss). index.json lists every
+    slot's turn, players and save time without opening the slot files. It
+    is written on flush() and at exit rather than on every save; when it is
+    stale, opening the store re-reads only the slots whose files changed.
+    """
+
+    def __init__(self, directory: str = "data/checkpoints", fsync: bool = False):
+        self.directory = directory
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._index_dirty = False
+        os.makedirs(directory, exist_ok=True)
+        self.index: Dict[str, dict] = self._load_index()
+        atexit.register(self._flush_at_exit)
+
+    def _path(self, slot: str) -> str:
+        return os.path.join(self.directory, slot_file_name(slot))
+
+    def _load_index(self) -> Dict[str, dict]:
+        index = {}
+        try:
+            with open(os.path.join(self.directory, INDEX_FILE)) as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            pass
+        current = {}
+        for entry in os.scandir(self.directory):
+            try:
+                slot = slot_from_file_name(entry.name)
+            except ValueError:
+                continue
+            mtime_ns = entry.stat().st_mtime_ns
+            known = index.get(slot)
+            if known is not None and known.get("mtime_ns") == mtime_ns:
+                current[slot] = known
+                continue
+            try:
+                with open(entry.path, "rb") as f:
+                    checkpoint = decode_checkpoint(f.read())
+            except (OSError, BattleError, struct.error):
+                continue
+            current[slot] = self._entry(checkpoint, mtime_ns)
+        self._index_dirty = current != index
+        return current
+
+    @staticmethod
+    def _entry(checkpoint: Checkpoint, mtime_ns: int) -> dict:
+        return {
+            "player": checkpoint.player_name,
+            "opponent": checkpoint.opponent_name,
+            "turn": checkpoint.current_turn,
+            "mtime_ns": mtime_ns
+        }
+
+    def save(self, slot: str, checkpoint: Checkpoint) -> None:
+        path = self._path(slot)
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write(encode_checkpoint(checkpoint))
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(temp_path, path)
+        with self._lock:
+            self.index[slot] = self._entry(checkpoint, os.stat(path).st_mtime_ns)
+            self._index_dirty = True
+
+    def load(self, slot: str) -> Optional[Checkpoint]:
+        """The slot's checkpoint, or None if the slot is empty"""
+        try:
+            with open(self._path(slot), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        return decode_checkpoint(data)
+
+    def delete(self, slot: str) -> bool:
+        try:
+            os.remove(self._path(slot))
+        except FileNotFoundError:
+            return False
+        with self._lock:
+            self.index.pop(slot, None)
+            self._index_dirty = True
+        return True
+
+    def slots(self) -> List[str]:
+        """Slot names, most recently saved first"""
+        with self._lock:
+            return sorted(self.index, key=lambda slot: self.index[slot]["mtime_ns"], reverse=True)
+
+    def flush(self) -> None:
+        """Write index.json if any slot changed since it was last written"""
+        with self._lock:
+            if not self._index_dirty:
+                return
+            data = json.dumps(self.index, indent=2).encode()
+            self._index_dirty = False
+        path = os.path.join(self.directory, INDEX_FILE)
+        with open(path + ".tmp", "wb") as f:
+            f.write(data)
+        os.replace(path + ".tmp", path)
+
+    def close(self) -> None:
+        self.flush()
+        atexit.unregister(self._flush_at_exit)
+
+    def _flush_at_exit(self) -> None:
+        # The directory may be gone by then; the index is rebuilt from the slot files anyway
+        try:
+            self.flush()
+        except OSError:
+            pass
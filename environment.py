@@ -1,6 +1,8 @@
+from bisect import bisect_right
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from typing import List, NamedTuple, Optional, Sequence, Tuple
 import random
+from metrics import ENVIRONMENT_EVENTS
 
 @dataclass
 class EnvironmentalEvent:
@@ -11,71 +13,109 @@ class EnvironmentalEvent:
     duration: int  # Number of turns the effect lasts
     probability: float  # Probability of this event occurring (0-1)
 
+# Stats an event can affect, in the order apply_event_effects returns them
+STATS = ("power", "defense", "speed", "stamina")
+
+class EventStats(NamedTuple):
+    """Stats after an event's effect; stats.power replaces the old dict's stats['power']"""
+    power: int
+    defense: int
+    speed: int
+    stamina: int
+
+DEFAULT_EVENTS: Tuple[EnvironmentalEvent, ...] = (
+    EnvironmentalEvent(
+        "Strong Wind",
+        "A strong wind has picked up, increasing attack power but reducing defense!",
+        "power",
+        1.3,
+        2,
+        0.2
+    ),
+    EnvironmentalEvent(
+        "Heavy Rain",
+        "Heavy rain has started, making the stadium slippery and reducing speed!",
+        "speed",
+        0.7,
+        2,
+        0.15
+    ),
+    EnvironmentalEvent(
+        "Sandstorm",
+        "A sandstorm has formed, reducing visibility and defense!",
+        "defense",
+        0.8,
+        2,
+        0.15
+    ),
+    EnvironmentalEvent(
+        "Heat Wave",
+        "A heat wave has hit, increasing stamina consumption!",
+        "stamina",
+        0.8,
+        2,
+        0.15
+    ),
+    EnvironmentalEvent(
+        "Magnetic Field",
+        "A magnetic field has formed, increasing defense but reducing speed!",
+        "defense",
+        1.2,
+        2,
+        0.1
+    ),
+    EnvironmentalEvent(
+        "Energy Surge",
+        "An energy surge has occurred, increasing power temporarily!",
+        "power",
+        1.4,
+        1,
+        0.1
+    ),
+    EnvironmentalEvent(
+        "Ice Formation",
+        "Ice has formed on the stadium, increasing speed but reducing control!",
+        "speed",
+        1.3,
+        2,
+        0.15
+    )
+)
+
+class EventSampler:
+    """Picks the turn's new event, if any, with a single uniform draw
+
+    Same distribution as rolling each event's probability in order and taking
+    the first hit, precompiled into a cumulative table: event i has
+    probability p_i * prod(1 - p_j for j < i), and a draw past the last entry
+    means no event.
+    """
+
+    def __init__(self, events: Sequence[EnvironmentalEvent]):
+        self.events = tuple(events)
+        self.cumulative: List[float] = []
+        total = 0.0
+        none = 1.0
+        for event in self.events:
+            total += none * event.probability
+            none *= 1 - event.probability
+            self.cumulative.append(total)
+        self.none_probability = none
+
+    def pick(self, draw: float) -> Optional[EnvironmentalEvent]:
+        """The event chosen by a uniform draw in [0, 1)"""
+        index = bisect_right(self.cumulative, draw)
+        return self.events[index] if index < len(self.events) else None
+
+DEFAULT_SAMPLER = EventSampler(DEFAULT_EVENTS)
+
 class EnvironmentManager:
-    def __init__(self):
+    def __init__(self, rng=None, sampler: Optional[EventSampler] = None):
         self.current_event: Optional[EnvironmentalEvent] = None
         self.event_duration: int = 0
-        self.events = self._create_events()
-    
-    def _create_events(self) -> List[EnvironmentalEvent]:
-        return [
-            EnvironmentalEvent(
-                "Strong Wind",
-                "A strong wind has picked up, increasing attack power but reducing defense!",
-                "power",
-                1.3,
-                2,
-                0.2
-            ),
-            EnvironmentalEvent(
-                "Heavy Rain",
-                "Heavy rain has started, making the stadium slippery and reducing speed!",
-                "speed",
-                0.7,
-                2,
-                0.15
-            ),
-            EnvironmentalEvent(
-                "Sandstorm",
-                "A sandstorm has formed, reducing visibility and defense!",
-                "defense",
-                0.8,
-                2,
-                0.15
-            ),
-            EnvironmentalEvent(
-                "Heat Wave",
-                "A heat wave has hit, increasing stamina consumption!",
-                "stamina",
-                0.8,
-                2,
-                0.15
-            ),
-            EnvironmentalEvent(
-                "Magnetic Field",
-                "A magnetic field has formed, increasing defense but reducing speed!",
-                "defense",
-                1.2,
-                2,
-                0.1
-            ),
-            EnvironmentalEvent(
-                "Energy Surge",
-                "An energy surge has occurred, increasing power temporarily!",
-                "power",
-                1.4,
-                1,
-                0.1
-            ),
-            EnvironmentalEvent(
-                "Ice Formation",
-                "Ice has formed on the stadium, increasing speed but reducing control!",
-                "speed",
-                1.3,
-                2,
-                0.15
-            )
-        ]
+        self.sampler = sampler or DEFAULT_SAMPLER
+        self.events = self.sampler.events
+        self.rng = rng or random
     
     def check_for_event(self) -> Optional[EnvironmentalEvent]:
         """Check if a new environmental event should occur"""
@@ -87,37 +127,29 @@ class EnvironmentManager:
         
         # Only allow new events if there isn't a current one
         if self.current_event is None:
-            for event in self.events:
-                if random.random() < event.probability:
-                    self.current_event = event
-                    self.event_duration = event.duration
-                    return event
+            event = self.sampler.pick(self.rng.random())
+            if event is not None:
+                self.current_event = event
+                self.event_duration = event.duration
+                ENVIRONMENT_EVENTS.inc()
+            return event
         
         return self.current_event
     
-    def apply_event_effects(self, power: int, defense: int, speed: int, stamina: int) -> Dict[str, int]:
+    def apply_event_effects(self, power: int, defense: int, speed: int, stamina: int) -> EventStats:
         """Apply current environmental event effects to stats"""
-        if self.current_event is None:
-            return {
-                "power": power,
-                "defense": defense,
-                "speed": speed,
-                "stamina": stamina
-            }
-        
-        modified_stats = {
-            "power": power,
-            "defense": defense,
-            "speed": speed,
-            "stamina": stamina
-        }
-        
-        if self.current_event.effect_type in modified_stats:
-            modified_stats[self.current_event.effect_type] = int(
-                modified_stats[self.current_event.effect_type] * self.current_event.effect_value
-            )
-        
-        return modified_stats
+        event = self.current_event
+        if event is not None:
+            effect = event.effect_type
+            if effect == "power":
+                power = int(power * event.effect_value)
+            elif effect == "defense":
+                defense = int(defense * event.effect_value)
+            elif effect == "speed":
+                speed = int(speed * event.effect_value)
+            elif effect == "stamina":
+                stamina = int(stamina * event.effect_value)
+        return EventStats(power, defense, speed, stamina)
     
     def get_current_event_status(self) -> Optional[str]:
         """Get description of current environmental event"""
@@ -0,0 +1,99 @@
+from typing import Dict, List, Optional, Tuple
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Cold import budget of the headless engine entry points, in milliseconds
+BUDGETS_MS: Dict[str, float] = {
+    "simulation": 80.0,
+    "tournament": 150.0,
+    "ai": 100.0,
+    "main": 150.0
+}
+
+# Modules that must stay off the headless import path
+HEAVY_MODULES = ("pygame", "colorama", "numpy")
+
+def measure_import(module: str) -> Tuple[float, List[Tuple[str, float, float]]]:
+    """Import a module in a fresh headless interpreter with -X importtime
+
+    Returns the module's cumulative import time in ms and every imported
+    module as (name, self ms, cumulative ms).
+    """
+    env = dict(os.environ, BEYBLADE_HEADLESS="1")
+    # Workers normally start from cached bytecode, so let the warm-up run write it
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((name.strip(), int(self_us) / 1000, int(cumulative_us) / 1000))
+    total = next(cumulative for name, _, cumulative in reversed(modules) if name == module)
+    return total, modules
+
+def budget_report(module: str, runs: int = 5, top: int = 10) -> dict:
+    """Median cold import time of a module over several runs, its slowest imports and heavy modules pulled in"""
+    # The first run only warms the bytecode cache
+    measure_import(module)
+    totals = []
+    slowest: Dict[str, float] = {}
+    imported = set()
+    for _ in range(runs):
+        total, modules = measure_import(module)
+        totals.append(total)
+        for name, self_ms, _ in modules:
+            slowest[name] = slowest.get(name, 0.0) + self_ms / runs
+            imported.add(name.split(".")[0])
+    median = statistics.median(totals)
+    budget = BUDGETS_MS.get(module)
+    heavy = sorted(name for name in HEAVY_MODULES if name in imported)
+    return {
+        "module": module,
+        "median_ms": round(median, 2),
+        "max_ms": round(max(totals), 2),
+        "budget_ms": budget,
+        "heavy_modules": heavy,
+        "ok": (budget is None or median <= budget) and not heavy,
+        "slowest": [
+            {"module": name, "self_ms": round(self_ms, 2)}
+            for name, self_ms in sorted(slowest.items(), key=lambda item: item[1], reverse=True)[:top]
+        ]
+    }
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Cold-start import time report for the headless battle engine")
+    parser.add_argument("modules", nargs="*", default=sorted(BUDGETS_MS), help="Modules to import (default: all budgeted)")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per module")
+    parser.add_argument("--top", type=int, default=10, help="Slowest imports to list per module")
+    parser.add_argument("--json", dest="json_path", help="Also write the report to this file")
+    args = parser.parse_args(argv)
+
+    reports = [budget_report(module, args.runs, args.top) for module in args.modules]
+    for report in reports:
+        budget = f"{report['budget_ms']:.0f} ms" if report["budget_ms"] is not None else "none"
+        status = "OK" if report["ok"] else "OVER BUDGET"
+        print(f"{report['module']}: {report['median_ms']:.1f} ms median, {report['max_ms']:.1f} ms max "
+              f"(budget {budget}) {status}")
+        if report["heavy_modules"]:
+            print(f"  pulls in: {', '.join(report['heavy_modules'])}")
+        for entry in report["slowest"]:
+            print(f"  {entry['self_ms']:8.2f} ms  {entry['module']}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(reports, f, indent=2)
+    return 0 if all(report["ok"] for report in reports) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
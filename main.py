@@ -1,58 +1,33 @@
-from beyblade import DragonFury, StormPegasus, RockLion, DarkBull, SpecialMove, Beyblade, Draciel, Dragoon, Dranzer, Driger
-from utils import load_json_data
+from beyblade import SpecialMove, Beyblade
+from beyblade import create_move_from_data, create_starter_beyblades, get_move_registry
+from utils import is_headless, NO_COLOR
 from player import PlayerManager, Player
 from beyblade_parts import BeybladePartsManager
 from environment import EnvironmentManager
+from battle_events import EnvironmentChange, KnockOut, TerminalRenderer, TurnEnd, TurnStart, status
+from simulation import play_turn
+from phase_timers import PhaseTimers, TIMINGS_ENV
+from checkpoints import Checkpoint, CheckpointStore
 import os
-from colorama import init, Fore, Style
 import random
 import json
 from music_manager import MusicManager
+from ai import ComputerAI
 
-# Initialize colorama for Windows
-init()
+if is_headless():
+    Fore = Style = NO_COLOR
+else:
+    from colorama import Fore, Style
 
-music_manager = MusicManager()
-music_manager.play_background_music()
+# Started by main(), so importing this module never touches the audio device
+music_manager = None
 
-def load_moves() -> dict:
-    """Load moves from JSON file"""
-    return load_json_data(os.path.join('data', 'moves.json'))
+computer_ai = ComputerAI(time_budget=0.005)
 
-def create_move_from_data(move_data: dict) -> SpecialMove:
-    """Create a SpecialMove object from move data"""
-    return SpecialMove(
-        name=move_data['name'],
-        power=move_data['power'],
-        move_type=move_data['move_type']
-    )
-
-def create_starter_beyblades() -> list:
-    """Create starter Beyblades with their special moves"""
-    moves_data = load_moves()
-    
-    # Load all moves
-    all_moves = []
-    for move_type in ['attack_moves', 'defense_moves', 'critical_moves']:
-        for move in moves_data[move_type]:
-            all_moves.append(create_move_from_data(move))
-    
-    # Create Beyblades with boosted stats for computer opponents
-    dragon = DragonFury(special_moves=all_moves)
-    pegasus = StormPegasus(special_moves=all_moves)
-    lion = RockLion(special_moves=all_moves)
-    bull = DarkBull(special_moves=all_moves)
-    draciel = Draciel(special_moves=all_moves)
-    dragoon = Dragoon(special_moves=all_moves)
-    dranzer = Dranzer(special_moves=all_moves)
-    driger = Driger(special_moves=all_moves)
-    
-    # Boost stats for computer opponents
-    for beyblade in [dragon, pegasus, lion, bull, draciel, dragoon, dranzer, driger]:
-        beyblade.power = int(beyblade.power * 1.2)
-        beyblade.defense = int(beyblade.defense * 1.2)
-    
-    return [dragon, pegasus, lion, bull, draciel, dragoon, dranzer, driger]
+# Per-phase timings of the game loop, off unless BEYBLADE_TIMINGS names a report file
+timers = PhaseTimers.from_environment()
+timers.instrument(computer_ai, "choose_move")
+play_turn = timers.wrap("play_turn", play_turn)
 
 def print_beyblade_list(beyblade_list: list) -> None:
     """Print available Beyblades"""
@@ -60,6 +35,7 @@ def print_beyblade_list(beyblade_list: list) -> None:
     for i, beyblade in enumerate(beyblade_list, 1):
         print(f"{i}. {beyblade}")
 
+@timers.timed("print_moves_list")
 def print_moves_list(beyblade) -> None:
     """Print available special moves for a Beyblade"""
     print(f"\n{Fore.YELLOW}Special moves for {beyblade.name}:{Style.RESET_ALL}")
@@ -83,15 +59,8 @@ def print_moves_list(beyblade) -> None:
             # Özel hareketleri güncelle
             beyblade.special_moves = custom_moves
         else:
-            # Starter beyblade - tüm hareketleri yükle ve filtrele
-            moves_data = load_moves()
-            all_moves = []
-            for move_type in ['attack_moves', 'defense_moves', 'critical_moves']:
-                for move in moves_data[move_type]:
-                    all_moves.append(create_move_from_data(move))
-            
-            # Bu beyblade için özel hareketleri filtreleme
-            filtered_moves = get_starter_beyblade_moves(beyblade.name, all_moves)
+            # Starter beyblade - hareketlerini paylaşılan move registry'den al
+            filtered_moves = get_starter_beyblade_moves(beyblade.name)
             
             # Eğer filtreleme başarılıysa (en az bir hareket bulunmuşsa), özel hareketleri güncelleme
             if filtered_moves:
@@ -198,11 +167,7 @@ def create_custom_beyblade(parts_manager: BeybladePartsManager) -> Beyblade:
     special_moves = []
     for move_type in ['attack_moves', 'defense_moves', 'critical_moves']:
         for move in beyblade_data["special_moves"][move_type]:
-            special_moves.append(SpecialMove(
-                name=move["name"],
-                power=move["power"],
-                move_type=move["move_type"]
-            ))
+            special_moves.append(create_move_from_data(move))
     
     # Print the custom special moves
     print(f"\n{Fore.YELLOW}Your custom Beyblade has the following special moves:{Style.RESET_ALL}")
@@ -294,42 +259,38 @@ class Commentator:
             return random.choice(self.phrases[event_type])
         return ""
 
-def save_game(player: Player, player_beyblade: Beyblade, opponent_name: str, opponent_beyblade: Beyblade, current_turn: int):
-    """Save the current game state"""
-    save_data = {
-        "player": {
-            "name": player.name,
-            "beyblade": {
-                "name": player_beyblade.name,
-                "type": player_beyblade.type,
-                "health": player_beyblade.health,
-                "stamina": player_beyblade.stamina,
-                "spin_speed": player_beyblade.spin_speed,
-                "defense_count": player_beyblade.defense_count,
-                "critical_used": player_beyblade.critical_used
-            }
-        },
-        "opponent": {
-            "name": opponent_name,
-            "beyblade": {
-                "name": opponent_beyblade.name,
-                "type": opponent_beyblade.type,
-                "health": opponent_beyblade.health,
-                "stamina": opponent_beyblade.stamina,
-                "spin_speed": opponent_beyblade.spin_speed,
-                "defense_count": opponent_beyblade.defense_count,
-                "critical_used": opponent_beyblade.critical_used
-            }
-        },
-        "current_turn": current_turn
-    }
-    
-    os.makedirs("data", exist_ok=True)
-    with open("data/save_game.json", "w") as f:
-        json.dump(save_data, f, indent=2)
+# Saves from before checkpoint slots; still offered for loading
+LEGACY_SAVE_FILE = "data/save_game.json"
+
+_checkpoint_store = None
+
+def get_checkpoint_store() -> CheckpointStore:
+    """The save slots in data/checkpoints, opened on first use"""
+    global _checkpoint_store
+    if _checkpoint_store is None:
+        _checkpoint_store = CheckpointStore()
+    return _checkpoint_store
+
+@timers.timed("save_game")
+def save_game(player: Player, player_beyblade: Beyblade, opponent_name: str, opponent_beyblade: Beyblade, current_turn: int,
+              environment_manager: EnvironmentManager = None, slot: str = None, checkpoint: Checkpoint = None):
+    """Save the current game state to a checkpoint slot, named after the player unless given
+
+    `checkpoint` is the state captured at the start of the turn, before its
+    event roll, so a loaded game replays the turn the same way; without one
+    the state is captured now.
+    """
+    if checkpoint is None:
+        checkpoint = Checkpoint.capture(player.name, opponent_name, current_turn, (player_beyblade, opponent_beyblade),
+                                        environment_manager, random)
+    try:
+        get_checkpoint_store().save(slot or player.name, checkpoint)
+    except (OSError, ValueError) as e:
+        print(f"{Fore.RED}Could not save the game: {e}{Style.RESET_ALL}")
+        return
     print(f"{Fore.GREEN}Game saved successfully!{Style.RESET_ALL}")
 
-def get_starter_beyblade_moves(beyblade_name: str, all_moves: list) -> list:
+def get_starter_beyblade_moves(beyblade_name: str) -> list:
     """Starter bir beyblade için özel hareketleri filtreler"""
     
     # Öncelikle, eğer beyblade adı bir custom beyblade gibi görünüyorsa (tek karakter veya rakam),
@@ -337,31 +298,32 @@ def get_starter_beyblade_moves(beyblade_name: str, all_moves: list) -> list:
     if len(beyblade_name) <= 2 or beyblade_name.isdigit():
         return []
         
-    # Tüm olası beyblade isimleri ve bunların özel hareketleri
-    beyblade_moves = {
-        "L-Drago Destructor": ["Dragon Emperor Soaring Bite Strike", "Dragon Emperor Shield", "Dragon Emperor Supreme Flight"],
-        "Storm Pegasus": ["Pegasus Starblast Attack", "Pegasus Shield", "Pegasus Stardust Driver"],
-        "Rock Lion": ["Lion Wild Wind Fang Dance", "Lion Shield", "Lion King Tearing Blast"],
-        "Rock Leone": ["Lion Wild Wind Fang Dance", "Lion Shield", "Lion King Tearing Blast"],
-        "Dark Bull": ["Bull Upper Attack", "Bull Defense Wall", "Bull Destruction"],
-        "Draciel": ["Turtle Shell Attack", "Turtle Shell Defense", "Turtle Shell Counter"],
-        "Dragoon": ["Dragon Emperor Strike", "Dragon Emperor Shield", "Dragon Emperor Critical"],
-        "Dranzer": ["Phoenix Wing Attack", "Phoenix Wing Shield", "Phoenix Wing Critical"],
-        "Driger": ["Tiger Claw Attack", "Tiger Claw Shield", "Tiger Claw Critical"]
-    }
-    
-    # Beyblade adına göre hareketleri filtrele
-    if beyblade_name in beyblade_moves:
-        moves = beyblade_moves[beyblade_name]
-        return [move for move in all_moves if move.name in moves]
+    # Rock Leone eski kayıtlarda "Rock Lion" olarak geçiyor
+    if beyblade_name == "Rock Lion":
+        beyblade_name = "Rock Leone"
     
-    # Eğer beyblade adı bulunamazsa boş liste döndür
-    return []
+    # Eğer beyblade adı bulunamazsa boş liste döner
+    return list(get_move_registry().for_starter(beyblade_name))
 
-def load_game(player_manager: PlayerManager) -> tuple:
-    """Load a saved game"""
+@timers.timed("load_game")
+def load_game(player_manager: PlayerManager, slot: str = None, environment_manager: EnvironmentManager = None) -> tuple:
+    """Load a saved game from a checkpoint slot, or from the legacy save file when no slot is given"""
     try:
-        with open("data/save_game.json", "r") as f:
+        if slot is not None:
+            checkpoint = get_checkpoint_store().load(slot)
+            if checkpoint is None:
+                raise ValueError(f"No saved game in slot {slot}")
+            player = player_manager.get_player(checkpoint.player_name)
+            if not player:
+                raise ValueError("Saved player not found")
+            # Pick up with the same event and the same random numbers as when the game was saved
+            if environment_manager is not None:
+                checkpoint.restore_environment(environment_manager)
+            checkpoint.restore_rng(random)
+            player_beyblade, opponent_beyblade = checkpoint.beyblades
+            return player, player_beyblade, checkpoint.opponent_name, opponent_beyblade, checkpoint.current_turn
+        
+        with open(LEGACY_SAVE_FILE, "r") as f:
             save_data = json.load(f)
         
         # Load player data
@@ -369,13 +331,9 @@ def load_game(player_manager: PlayerManager) -> tuple:
         if not player:
             raise ValueError("Saved player not found")
         
-        # Moves data ve all_moves değişkenlerini fonksiyonun başında tanımlayalım
+        # all_moves değişkenini fonksiyonun başında tanımlayalım
         # ki tüm kapsamda erişilebilir olsun
-        moves_data = load_moves()
-        all_moves = []
-        for move_type in ['attack_moves', 'defense_moves', 'critical_moves']:
-            for move in moves_data[move_type]:
-                all_moves.append(create_move_from_data(move))
+        all_moves = list(get_move_registry().moves)
                 
         # Get the original beyblade data with stored moves (if exists)
         original_beyblade = None
@@ -395,16 +353,12 @@ def load_game(player_manager: PlayerManager) -> tuple:
             for move_type in ["attack_moves", "defense_moves", "critical_moves"]:
                 if move_type in original_beyblade["special_moves"]:
                     for move in original_beyblade["special_moves"][move_type]:
-                        special_moves.append(SpecialMove(
-                            name=move["name"],
-                            power=move["power"],
-                            move_type=move["move_type"]
-                        ))
+                        special_moves.append(create_move_from_data(move))
         else:
             # Check if this is a starter beyblade and load its specific moves
             # all_moves değişkeni zaten yukarıda tanımlandı, tekrar oluşturmaya gerek yok
             # Filter moves for this specific starter beyblade
-            special_moves = get_starter_beyblade_moves(player_beyblade_name, all_moves)
+            special_moves = get_starter_beyblade_moves(player_beyblade_name)
             
             # If no moves were found (perhaps not a starter), use generic ones
             if not special_moves:
@@ -437,15 +391,10 @@ def load_game(player_manager: PlayerManager) -> tuple:
                         
             # Kayıtsız oyuncu için beyblade special_moves kaydını findBeyblade ile doğrudan veritabanında arayalım  
             if not original_opponent_beyblade:
-                # Tüm oyuncuların kayıtlarını incele
-                all_players = player_manager.players
-                for player_name, _ in all_players.items():
-                    player_beyblades = player_manager.get_custom_beyblades(player_name)
-                    if player_beyblades:
-                        for beyblade in player_beyblades:
-                            if beyblade["name"] == save_data["opponent"]["beyblade"]["name"]:
-                                original_opponent_beyblade = beyblade
-                                break
+                # Look the build up in the index of every player's custom beyblades
+                found = player_manager.find_custom_beyblade(save_data["opponent"]["beyblade"]["name"])
+                if found:
+                    original_opponent_beyblade = found[1]
         
         # Create moves list for opponent
         opponent_special_moves = []
@@ -456,15 +405,11 @@ def load_game(player_manager: PlayerManager) -> tuple:
             for move_type in ["attack_moves", "defense_moves", "critical_moves"]:
                 if move_type in original_opponent_beyblade["special_moves"]:
                     for move in original_opponent_beyblade["special_moves"][move_type]:
-                        opponent_special_moves.append(SpecialMove(
-                            name=move["name"],
-                            power=move["power"],
-                            move_type=move["move_type"]
-                        ))
+                        opponent_special_moves.append(create_move_from_data(move))
         else:
             # Check if this is a starter beyblade and load its specific moves
             # Filter moves for this specific starter beyblade
-            opponent_special_moves = get_starter_beyblade_moves(opponent_beyblade_name, all_moves)
+            opponent_special_moves = get_starter_beyblade_moves(opponent_beyblade_name)
             
             # If no moves were found, use generic ones
             if not opponent_special_moves:
@@ -503,23 +448,48 @@ def load_game(player_manager: PlayerManager) -> tuple:
         return None
 
 def main():
+    global music_manager
+    if not is_headless():
+        from colorama import init
+        # Initialize colorama for Windows
+        init()
+        music_manager = MusicManager()
+        music_manager.play_background_music()
+    
     print(f"{Fore.GREEN}Welcome to Beyblade Battle Simulator!{Style.RESET_ALL}")
     print("Let it rip! 🏃‍♂️")
     
     # Initialize managers
-    player_manager = PlayerManager()
+    player_manager = PlayerManager(write_behind=True)
     parts_manager = BeybladePartsManager()
     environment_manager = EnvironmentManager()
     commentator = Commentator()
-    
-    # Check for saved game
-    if os.path.exists("data/save_game.json"):
+    timers.instrument(player_manager, "update_player")
+    timers.instrument(environment_manager, "check_for_event")
+    timers.instrument(commentator, "comment", "commentary")
+    
+    # Check for saved games
+    checkpoint_store = get_checkpoint_store()
+    slots = checkpoint_store.slots()
+    has_legacy_save = os.path.exists(LEGACY_SAVE_FILE)
+    if slots or has_legacy_save:
         print("\n1. Start New Game")
         print("2. Load Saved Game")
         choice = get_user_choice("Enter your choice: ", 2)
         
         if choice == 2:
-            saved_game = load_game(player_manager)
+            slot = None
+            if slots:
+                print("\nSaved games:")
+                for i, name in enumerate(slots, 1):
+                    entry = checkpoint_store.index[name]
+                    print(f"{i}. {name}: {entry['player']} vs {entry['opponent']}, turn {entry['turn']}")
+                if has_legacy_save:
+                    print(f"{len(slots) + 1}. Older saved game")
+                slot_choice = get_user_choice("Enter your choice: ", len(slots) + has_legacy_save)
+                if slot_choice <= len(slots):
+                    slot = slots[slot_choice - 1]
+            saved_game = load_game(player_manager, slot, environment_manager)
             if saved_game:
                 player, player_beyblade, opponent_name, opponent_beyblade, current_turn = saved_game
                 print(f"\n{Fore.GREEN}Loaded saved game!{Style.RESET_ALL}")
@@ -530,7 +500,7 @@ def main():
                 
                 # Continue with the battle
                 battle_loop(player, player_beyblade, opponent_name, opponent_beyblade, 
-                          current_turn, player_manager, environment_manager, commentator)
+                          current_turn, player_manager, environment_manager, commentator, slot)
                 return
     
     # Player registration/login
@@ -642,17 +612,10 @@ def main():
                     for move_type in ['attack_moves', 'defense_moves', 'critical_moves']:
                         if move_type in saved_beyblade["special_moves"]:
                             for move in saved_beyblade["special_moves"][move_type]:
-                                custom_moves.append(SpecialMove(
-                                    name=move["name"],
-                                    power=move["power"],
-                                    move_type=move["move_type"]
-                                ))
+                                custom_moves.append(create_move_from_data(move))
                 else:
                     # Use generic moves as fallback
-                    moves_data = load_moves()
-                    for move_type in ['attack_moves', 'defense_moves', 'critical_moves']:
-                        for move in moves_data[move_type]:
-                            custom_moves.append(create_move_from_data(move))
+                    custom_moves.extend(get_move_registry().moves)
                 
                 player_beyblade = Beyblade(
                     name=saved_beyblade["name"],
@@ -784,17 +747,10 @@ def main():
                             for move_type in ['attack_moves', 'defense_moves', 'critical_moves']:
                                 if move_type in saved_beyblade["special_moves"]:
                                     for move in saved_beyblade["special_moves"][move_type]:
-                                        custom_moves.append(SpecialMove(
-                                            name=move["name"],
-                                            power=move["power"],
-                                            move_type=move["move_type"]
-                                        ))
+                                        custom_moves.append(create_move_from_data(move))
                         else:
                             # Use generic moves as fallback
-                            moves_data = load_moves()
-                            for move_type in ['attack_moves', 'defense_moves', 'critical_moves']:
-                                for move in moves_data[move_type]:
-                                    custom_moves.append(create_move_from_data(move))
+                            custom_moves.extend(get_move_registry().moves)
                         
                         opponent_beyblade = Beyblade(
                             name=saved_beyblade["name"],
@@ -806,16 +762,18 @@ def main():
         
         # Battle loop
         current_turn = 1
+        renderer = TerminalRenderer(Fore, Style, commentator.comment)
         
         while not player_beyblade.is_defeated() and not opponent_beyblade.is_defeated():
-            print(f"\n{Fore.CYAN}=== Turn {current_turn} ==={Style.RESET_ALL}")
-            print(f"{commentator.comment('turn_start')}")
+            renderer.emit(TurnStart(current_turn))
+            # Saves resume from here, before the event roll and the start of turn stamina loss
+            turn_start = Checkpoint.capture(player.name, opponent_name, current_turn,
+                                            (player_beyblade, opponent_beyblade), environment_manager, random)
             
             # Check for environmental events
             event = environment_manager.check_for_event()
             if event:
-                print(f"\n{Fore.YELLOW}Environmental Event: {event.description}{Style.RESET_ALL}")
-                print(f"{Fore.YELLOW}{commentator.comment('environmental')}{Style.RESET_ALL}")
+                renderer.emit(EnvironmentChange(current_turn, event))
                 # Apply event effects to both beyblades
                 player_stats = environment_manager.apply_event_effects(
                     player_beyblade.power,
@@ -846,7 +804,10 @@ def main():
             # Handle save/exit options
             if choice > len(player_beyblade.available_moves):
                 if choice == len(player_beyblade.available_moves) + 1:  # Save game
-                    save_game(player, player_beyblade, opponent_name, opponent_beyblade, current_turn)
+                    save_game(player, player_beyblade, opponent_name, opponent_beyblade, current_turn,
+                              environment_manager, checkpoint=turn_start)
+                    # Play the turn again from its start, as loading the save will
+                    turn_start.rewind((player_beyblade, opponent_beyblade), environment_manager, random)
                     continue
                 else:  # Exit game
                     if input("Are you sure you want to exit? (y/n): ").lower() == 'y':
@@ -857,184 +818,63 @@ def main():
             
             # Opponent move selection
             if opponent_name == "Computer":
-                # Computer AI move selection
-                available_moves = [m for m in opponent_beyblade.special_moves if m.move_type == "attack"]
-                if opponent_beyblade.defense_count > 0:
-                    available_moves.extend([m for m in opponent_beyblade.special_moves if m.move_type == "defense"])
-                if not opponent_beyblade.critical_used:
-                    available_moves.extend([m for m in opponent_beyblade.special_moves if m.move_type == "critical"])
-                
-                # Simple AI: 30% chance to defend if health is low, 20% chance to use critical if available
-                if opponent_beyblade.health < 30 and opponent_beyblade.defense_count > 0:
-                    defense_moves = [m for m in available_moves if m.move_type == "defense"]
-                    if defense_moves:
-                        move2 = random.choice(defense_moves)
-                    else:
-                        move2 = random.choice(available_moves)
-                elif not opponent_beyblade.critical_used and random.random() < 0.2:
-                    critical_moves = [m for m in available_moves if m.move_type == "critical"]
-                    if critical_moves:
-                        move2 = random.choice(critical_moves)
-                    else:
-                        move2 = random.choice(available_moves)
-                else:
-                    move2 = random.choice(available_moves)
+                # Computer AI move selection: expectimax search within a small time budget
+                move2 = computer_ai.choose_move(opponent_beyblade, player_beyblade)
             else:
                 print(f"\n{opponent_name} ({opponent_beyblade.name}), choose your move!")
                 print_moves_list(opponent_beyblade)
                 move2_choice = get_user_choice("Enter the number of your move: ", len(opponent_beyblade.available_moves))
                 move2 = opponent_beyblade.available_moves[move2_choice - 1]
             
-            # Track defense status
-            player_defending = move1.move_type == "defense"
-            opponent_defending = move2.move_type == "defense"
-            
-            # Execute moves
-            if player_defending:
-                result1 = player_beyblade.use_special_move(move1, player_beyblade)
-                
-                if 'error' in result1 and result1['error'] == 'no_defense_moves_left':
-                    attack_moves = [m for m in player_beyblade.special_moves if m.move_type == "attack"]
-                    if attack_moves:
-                        move1 = attack_moves[0]
-                        print(f"\nAutomatically selected alternative move: {move1.name}")
-                        result1 = player_beyblade.use_special_move(move1, opponent_beyblade)
-                        opponent_beyblade.health -= result1['damage']
-                        print(f"\n{player_beyblade.name} used {move1.name}!")
-                        if result1['critical']:
-                            print(f"🔥 CRITICAL HIT!")
-                            print(f"{Fore.RED}{commentator.comment('critical_hit')}{Style.RESET_ALL}")
-                        print(f"Damage dealt: {result1['damage']}")
-                    else:
-                        print(f"\n{player_beyblade.name} could not make a move this turn!")
-                        result1 = {'damage': 0}
-                else:
-                    print(f"\n{player_beyblade.name} used {move1.name}!")
-                    print(f"{Fore.BLUE}{commentator.comment('defense')}{Style.RESET_ALL}")
-                    print(f"🛡️ Defense activated! Next attack damage will be reduced by 30%")
-                    print(f"Remaining defense moves: {result1.get('defense_remaining', player_beyblade.defense_count)}")
-            else:
-                if opponent_defending:
-                    result1 = player_beyblade.use_special_move(move1, opponent_beyblade)
-                    original_damage = result1['damage']
-                    reduction = int(original_damage * 0.3)
-                    final_damage = original_damage - reduction
-                    final_damage = max(1, final_damage)
-                    
-                    opponent_beyblade.health -= final_damage
-                    
-                    print(f"\n{player_beyblade.name} used {move1.name}!")
-                    if result1['critical']:
-                        print(f"🔥 CRITICAL HIT!")
-                        print(f"{Fore.RED}{commentator.comment('critical_hit')}{Style.RESET_ALL}")
-                    print(f"Original damage: {original_damage}")
-                    print(f"🛡️ Defense reduced damage by: {reduction} (30%)")
-                    print(f"Final damage: {final_damage}")
-                else:
-                    result1 = player_beyblade.use_special_move(move1, opponent_beyblade)
-                    opponent_beyblade.health -= result1['damage']
-                    
-                    print(f"\n{player_beyblade.name} used {move1.name}!")
-                    if result1['critical']:
-                        print(f"🔥 CRITICAL HIT!")
-                        print(f"{Fore.RED}{commentator.comment('critical_hit')}{Style.RESET_ALL}")
-                    print(f"Damage dealt: {result1['damage']}")
-            
-            if not opponent_beyblade.is_defeated():
-                if opponent_defending:
-                    result2 = opponent_beyblade.use_special_move(move2, opponent_beyblade)
-                    
-                    if 'error' in result2 and result2['error'] == 'no_defense_moves_left':
-                        attack_moves = [m for m in opponent_beyblade.special_moves if m.move_type == "attack"]
-                        if attack_moves:
-                            move2 = attack_moves[0]
-                            print(f"\nAutomatically selected alternative move: {move2.name}")
-                            result2 = opponent_beyblade.use_special_move(move2, player_beyblade)
-                            player_beyblade.health -= result2['damage']
-                            print(f"\n{opponent_beyblade.name} used {move2.name}!")
-                            if result2['critical']:
-                                print(f"🔥 CRITICAL HIT!")
-                                print(f"{Fore.RED}{commentator.comment('critical_hit')}{Style.RESET_ALL}")
-                            print(f"Damage dealt: {result2['damage']}")
-                        else:
-                            print(f"\n{opponent_beyblade.name} could not make a move this turn!")
-                            result2 = {'damage': 0}
-                    else:
-                        print(f"\n{opponent_beyblade.name} used {move2.name}!")
-                        print(f"🛡️ Defense activated! Next attack damage will be reduced by 30%")
-                        print(f"Remaining defense moves: {result2.get('defense_remaining', opponent_beyblade.defense_count)}")
-                else:
-                    if player_defending:
-                        result2 = opponent_beyblade.use_special_move(move2, player_beyblade)
-                        original_damage = result2['damage']
-                        reduction = int(original_damage * 0.3)
-                        final_damage = original_damage - reduction
-                        final_damage = max(1, final_damage)
-                        
-                        player_beyblade.health -= final_damage
-                        
-                        print(f"\n{opponent_beyblade.name} used {move2.name}!")
-                        if result2['critical']:
-                            print(f"🔥 CRITICAL HIT!")
-                            print(f"{Fore.RED}{commentator.comment('critical_hit')}{Style.RESET_ALL}")
-                        print(f"Original damage: {original_damage}")
-                        print(f"🛡️ Defense reduced damage by: {reduction} (30%)")
-                        print(f"Final damage: {final_damage}")
-                    else:
-                        result2 = opponent_beyblade.use_special_move(move2, player_beyblade)
-                        player_beyblade.health -= result2['damage']
-                        
-                        print(f"\n{opponent_beyblade.name} used {move2.name}!")
-                        if result2['critical']:
-                            print(f"🔥 CRITICAL HIT!")
-                            print(f"{Fore.RED}{commentator.comment('critical_hit')}{Style.RESET_ALL}")
-                        print(f"Damage dealt: {result2['damage']}")
+            # Execute moves; the renderer prints what happens
+            play_turn(player_beyblade, opponent_beyblade, move1, move2, sink=renderer, turn=current_turn)
             
             # Show status after both moves
-            print(f"\n{Fore.CYAN}=== Status ==={Style.RESET_ALL}")
-            print(f"{player.name}: {player_beyblade}")
-            print(f"{opponent_name}: {opponent_beyblade}")
-            
-            if opponent_beyblade.health < 30:
-                print(f"{Fore.YELLOW}{commentator.comment('low_health')}{Style.RESET_ALL}")
+            renderer.emit(TurnEnd(current_turn, (status(player.name, player_beyblade),
+                                                 status(opponent_name, opponent_beyblade))))
             
             current_turn += 1
         
         # Battle end
         if player_beyblade.is_defeated():
-            print(f"\n{Fore.RED}{opponent_name} wins!{Style.RESET_ALL}")
+            renderer.emit(KnockOut(current_turn - 1, opponent_name, player.name, 1))
             if opponent_name != "Computer":
                 opponent = player_manager.get_player(opponent_name)
                 opponent.wins += 1
                 player.losses += 1
-                player_manager.update_player(opponent)
-                player_manager.update_player(player)
-            print(f"\n{Fore.MAGENTA}{commentator.comment('victory')}{Style.RESET_ALL}")
+                with player_manager.transaction():
+                    player_manager.update_player(opponent)
+                    player_manager.update_player(player)
         else:
-            print(f"\n{Fore.GREEN}{player.name} wins!{Style.RESET_ALL}")
+            renderer.emit(KnockOut(current_turn - 1, player.name, opponent_name, 0))
             player.wins += 1
             if opponent_name != "Computer":
                 opponent = player_manager.get_player(opponent_name)
                 opponent.losses += 1
-                player_manager.update_player(player)
-                player_manager.update_player(opponent)
-            print(f"\n{Fore.MAGENTA}{commentator.comment('victory')}{Style.RESET_ALL}")
+                with player_manager.transaction():
+                    player_manager.update_player(player)
+                    player_manager.update_player(opponent)
+        
+        # The battle is over, so its save slot is no longer needed
+        get_checkpoint_store().delete(player.name)
     
     except Exception as e:
         print(f"An error occurred: {e}")
 
 def battle_loop(player, player_beyblade, opponent_name, opponent_beyblade, 
-               current_turn, player_manager, environment_manager, commentator):
-    """Main battle loop"""
+               current_turn, player_manager, environment_manager, commentator, slot=None):
+    """Main battle loop; `slot` is the checkpoint slot the game was loaded from, None for the legacy save file"""
+    renderer = TerminalRenderer(Fore, Style, commentator.comment)
     while not player_beyblade.is_defeated() and not opponent_beyblade.is_defeated():
-        print(f"\n{Fore.CYAN}=== Turn {current_turn} ==={Style.RESET_ALL}")
-        print(f"{commentator.comment('turn_start')}")
+        renderer.emit(TurnStart(current_turn))
+        # Saves resume from here, before the event roll and the start of turn stamina loss
+        turn_start = Checkpoint.capture(player.name, opponent_name, current_turn,
+                                        (player_beyblade, opponent_beyblade), environment_manager, random)
         
         # Check for environmental events
         event = environment_manager.check_for_event()
         if event:
-            print(f"\n{Fore.YELLOW}Environmental Event: {event.description}{Style.RESET_ALL}")
-            print(f"{Fore.YELLOW}{commentator.comment('environmental')}{Style.RESET_ALL}")
+            renderer.emit(EnvironmentChange(current_turn, event))
             # Apply event effects to both beyblades
             player_stats = environment_manager.apply_event_effects(
                 player_beyblade.power,
@@ -1065,7 +905,10 @@ def battle_loop(player, player_beyblade, opponent_name, opponent_beyblade,
         # Handle save/exit options
         if choice > len(player_beyblade.available_moves):
             if choice == len(player_beyblade.available_moves) + 1:  # Save game
-                save_game(player, player_beyblade, opponent_name, opponent_beyblade, current_turn)
+                save_game(player, player_beyblade, opponent_name, opponent_beyblade, current_turn,
+                          environment_manager, slot, turn_start)
+                # Play the turn again from its start, as loading the save will
+                turn_start.rewind((player_beyblade, opponent_beyblade), environment_manager, random)
                 continue
             else:  # Exit game
                 if input("Are you sure you want to exit? (y/n): ").lower() == 'y':
@@ -1076,177 +919,54 @@ def battle_loop(player, player_beyblade, opponent_name, opponent_beyblade,
         
         # Opponent move selection
         if opponent_name == "Computer":
-            # Computer AI move selection
-            available_moves = [m for m in opponent_beyblade.special_moves if m.move_type == "attack"]
-            if opponent_beyblade.defense_count > 0:
-                available_moves.extend([m for m in opponent_beyblade.special_moves if m.move_type == "defense"])
-            if not opponent_beyblade.critical_used:
-                available_moves.extend([m for m in opponent_beyblade.special_moves if m.move_type == "critical"])
-            
-            # Simple AI: 30% chance to defend if health is low, 20% chance to use critical if available
-            if opponent_beyblade.health < 30 and opponent_beyblade.defense_count > 0:
-                defense_moves = [m for m in available_moves if m.move_type == "defense"]
-                if defense_moves:
-                    move2 = random.choice(defense_moves)
-                else:
-                    move2 = random.choice(available_moves)
-            elif not opponent_beyblade.critical_used and random.random() < 0.2:
-                critical_moves = [m for m in available_moves if m.move_type == "critical"]
-                if critical_moves:
-                    move2 = random.choice(critical_moves)
-                else:
-                    move2 = random.choice(available_moves)
-            else:
-                move2 = random.choice(available_moves)
+            # Computer AI move selection: expectimax search within a small time budget
+            move2 = computer_ai.choose_move(opponent_beyblade, player_beyblade)
         else:
             print(f"\n{opponent_name} ({opponent_beyblade.name}), choose your move!")
             print_moves_list(opponent_beyblade)
             move2_choice = get_user_choice("Enter the number of your move: ", len(opponent_beyblade.available_moves))
             move2 = opponent_beyblade.available_moves[move2_choice - 1]
         
-        # Track defense status
-        player_defending = move1.move_type == "defense"
-        opponent_defending = move2.move_type == "defense"
+        # Execute moves; the renderer prints what happens
+        play_turn(player_beyblade, opponent_beyblade, move1, move2, sink=renderer, turn=current_turn)
         
-        # Execute moves
-        if player_defending:
-            result1 = player_beyblade.use_special_move(move1, player_beyblade)
-            
-            if 'error' in result1 and result1['error'] == 'no_defense_moves_left':
-                attack_moves = [m for m in player_beyblade.special_moves if m.move_type == "attack"]
-                if attack_moves:
-                    move1 = attack_moves[0]
-                    print(f"\nAutomatically selected alternative move: {move1.name}")
-                    result1 = player_beyblade.use_special_move(move1, opponent_beyblade)
-                    opponent_beyblade.health -= result1['damage']
-                    print(f"\n{player_beyblade.name} used {move1.name}!")
-                    if result1['critical']:
-                        print(f"🔥 CRITICAL HIT!")
-                        print(f"{Fore.RED}{commentator.comment('critical_hit')}{Style.RESET_ALL}")
-                    print(f"Damage dealt: {result1['damage']}")
-                else:
-                    print(f"\n{player_beyblade.name} could not make a move this turn!")
-                    result1 = {'damage': 0}
-            else:
-                print(f"\n{player_beyblade.name} used {move1.name}!")
-                print(f"{Fore.BLUE}{commentator.comment('defense')}{Style.RESET_ALL}")
-                print(f"🛡️ Defense activated! Next attack damage will be reduced by 30%")
-                print(f"Remaining defense moves: {result1.get('defense_remaining', player_beyblade.defense_count)}")
-        else:
-            if opponent_defending:
-                result1 = player_beyblade.use_special_move(move1, opponent_beyblade)
-                original_damage = result1['damage']
-                reduction = int(original_damage * 0.3)
-                final_damage = original_damage - reduction
-                final_damage = max(1, final_damage)
-                
-                opponent_beyblade.health -= final_damage
-                
-                print(f"\n{player_beyblade.name} used {move1.name}!")
-                if result1['critical']:
-                    print(f"🔥 CRITICAL HIT!")
-                    print(f"{Fore.RED}{commentator.comment('critical_hit')}{Style.RESET_ALL}")
-                print(f"Original damage: {original_damage}")
-                print(f"🛡️ Defense reduced damage by: {reduction} (30%)")
-                print(f"Final damage: {final_damage}")
-            else:
-                result1 = player_beyblade.use_special_move(move1, opponent_beyblade)
-                opponent_beyblade.health -= result1['damage']
-                
-                print(f"\n{player_beyblade.name} used {move1.name}!")
-                if result1['critical']:
-                    print(f"🔥 CRITICAL HIT!")
-                    print(f"{Fore.RED}{commentator.comment('critical_hit')}{Style.RESET_ALL}")
-                print(f"Damage dealt: {result1['damage']}")
-            
-            if not opponent_beyblade.is_defeated():
-                if opponent_defending:
-                    result2 = opponent_beyblade.use_special_move(move2, opponent_beyblade)
-                    
-                    if 'error' in result2 and result2['error'] == 'no_defense_moves_left':
-                        attack_moves = [m for m in opponent_beyblade.special_moves if m.move_type == "attack"]
-                        if attack_moves:
-                            move2 = attack_moves[0]
-                            print(f"\nAutomatically selected alternative move: {move2.name}")
-                            result2 = opponent_beyblade.use_special_move(move2, player_beyblade)
-                            player_beyblade.health -= result2['damage']
-                            print(f"\n{opponent_beyblade.name} used {move2.name}!")
-                            if result2['critical']:
-                                print(f"🔥 CRITICAL HIT!")
-                                print(f"{Fore.RED}{commentator.comment('critical_hit')}{Style.RESET_ALL}")
-                            print(f"Damage dealt: {result2['damage']}")
-                        else:
-                            print(f"\n{opponent_beyblade.name} could not make a move this turn!")
-                            result2 = {'damage': 0}
-                    else:
-                        print(f"\n{opponent_beyblade.name} used {move2.name}!")
-                        print(f"🛡️ Defense activated! Next attack damage will be reduced by 30%")
-                        print(f"Remaining defense moves: {result2.get('defense_remaining', opponent_beyblade.defense_count)}")
-                else:
-                    if player_defending:
-                        result2 = opponent_beyblade.use_special_move(move2, player_beyblade)
-                        original_damage = result2['damage']
-                        reduction = int(original_damage * 0.3)
-                        final_damage = original_damage - reduction
-                        final_damage = max(1, final_damage)
-                        
-                        player_beyblade.health -= final_damage
-                        
-                        print(f"\n{opponent_beyblade.name} used {move2.name}!")
-                        if result2['critical']:
-                            print(f"🔥 CRITICAL HIT!")
-                            print(f"{Fore.RED}{commentator.comment('critical_hit')}{Style.RESET_ALL}")
-                        print(f"Original damage: {original_damage}")
-                        print(f"🛡️ Defense reduced damage by: {reduction} (30%)")
-                        print(f"Final damage: {final_damage}")
-                    else:
-                        result2 = opponent_beyblade.use_special_move(move2, player_beyblade)
-                        player_beyblade.health -= result2['damage']
-                        
-                        print(f"\n{opponent_beyblade.name} used {move2.name}!")
-                        if result2['critical']:
-                            print(f"🔥 CRITICAL HIT!")
-                            print(f"{Fore.RED}{commentator.comment('critical_hit')}{Style.RESET_ALL}")
-                        print(f"Damage dealt: {result2['damage']}")
-            
-            # Show status after both moves
-            print(f"\n{Fore.CYAN}=== Status ==={Style.RESET_ALL}")
-            print(f"{player.name}: {player_beyblade}")
-            print(f"{opponent_name}: {opponent_beyblade}")
-            
-            # Check for low stamina
-            if player_beyblade.stamina < 30:
-                print(f"{Fore.YELLOW}{commentator.comment('low_stamina')}{Style.RESET_ALL}")
-            if opponent_beyblade.stamina < 30:
-                print(f"{Fore.YELLOW}{commentator.comment('low_stamina')}{Style.RESET_ALL}")
-            
-            current_turn += 1
+        # Show status after both moves
+        renderer.emit(TurnEnd(current_turn, (status(player.name, player_beyblade),
+                                             status(opponent_name, opponent_beyblade))))
         
-        # Battle end
-        if player_beyblade.is_defeated():
-            print(f"\n{Fore.RED}{opponent_name} wins!{Style.RESET_ALL}")
-            if opponent_name != "Computer":
-                opponent = player_manager.get_player(opponent_name)
-                if opponent:  # Only update stats if opponent is registered
-                    opponent.wins += 1
-                    player.losses += 1
+        current_turn += 1
+    
+    # Battle end
+    if player_beyblade.is_defeated():
+        renderer.emit(KnockOut(current_turn - 1, opponent_name, player.name, 1))
+        if opponent_name != "Computer":
+            opponent = player_manager.get_player(opponent_name)
+            if opponent:  # Only update stats if opponent is registered
+                opponent.wins += 1
+                player.losses += 1
+                with player_manager.transaction():
                     player_manager.update_player(opponent)
                     player_manager.update_player(player)
-        else:
-            print(f"\n{Fore.GREEN}{player.name} wins!{Style.RESET_ALL}")
-            player.wins += 1
-            if opponent_name != "Computer":
-                opponent = player_manager.get_player(opponent_name)
-                if opponent:  # Only update stats if opponent is registered
-                    opponent.losses += 1
+    else:
+        renderer.emit(KnockOut(current_turn - 1, player.name, opponent_name, 0))
+        player.wins += 1
+        if opponent_name != "Computer":
+            opponent = player_manager.get_player(opponent_name)
+            if opponent:  # Only update stats if opponent is registered
+                opponent.losses += 1
+                with player_manager.transaction():
                     player_manager.update_player(player)
                     player_manager.update_player(opponent)
-        
-        print(f"\n{Fore.MAGENTA}{commentator.comment('victory')}{Style.RESET_ALL}")
-        
-        # Delete save file after battle ends
-        if os.path.exists("data/save_game.json"):
-            os.remove("data/save_game.json")
+    
+    # Delete the save after battle ends; a legacy game saved again went to the player's slot
+    get_checkpoint_store().delete(slot or player.name)
+    if slot is None and os.path.exists(LEGACY_SAVE_FILE):
+        os.remove(LEGACY_SAVE_FILE)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    try:
+        main()
+    finally:
+        if timers.enabled:
+            print(timers.format_report())
+            timers.write_report(os.environ[TIMINGS_ENV]) 
\ No newline at end of file
@@ -0,0 +1,199 @@
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional, Tuple
+import argparse
+import heapq
+import itertools
+import random
+import sys
+import time
+from metrics import MATCH_WAIT_SECONDS
+from player import Player
+from utils import latency_summary
+
+BUCKET_WIDTH = 25  # rating points per bucket
+WIDEN_INTERVAL = 5.0  # seconds between window steps
+MAX_STEPS = 8  # widest window in buckets on either side
+
+def player_rating(player: Player) -> int:
+    """Matchmaking rating from a player's record: 1000, moved up to 400 either way by the smoothed win rate"""
+    games = player.wins + player.losses
+    return 1000 + round(400 * (player.wins - player.losses) / (games + 10))
+
+@dataclass(eq=False)
+class Ticket:
+    key: Hashable
+    rating: int
+    bucket: int
+    enqueued: float
+    payload: Any = None
+    active: bool = True
+
+Match = Tuple[Ticket, Ticket]
+
+class MatchmakingQueue:
+    """Pairs waiting players by rating within windows that widen the longer they wait
+
+    Ratings are grouped into buckets of `bucket_width` points. A ticket accepts
+    an opponent up to `steps` buckets away, where steps grows by one every
+    `widen_interval` seconds up to `max_steps`; a pair matches when either side
+    accepts the other. Two tickets in the same bucket always match, so each
+    bucket holds at most one waiting ticket and a match probes at most
+    2 * max_steps + 1 buckets. Widening is driven by a heap of per-ticket
+    deadlines, so add(), cancel() and each widening step are O(log n).
+    """
+
+    def __init__(self, bucket_width: int = BUCKET_WIDTH, widen_interval: float = WIDEN_INTERVAL,
+                 max_steps: int = MAX_STEPS, clock: Callable[[], float] = time.monotonic, history: int = 10000):
+        self.bucket_width = bucket_width
+        self.widen_interval = widen_interval
+        self.max_steps = max_steps
+        self.clock = clock
+        self.buckets: Dict[int, Ticket] = {}
+        self.tickets: Dict[Hashable, Ticket] = {}
+        self._deadlines: List[Tuple[float, int, Ticket]] = []
+        self._order = itertools.count()
+        self.matches = 0
+        # Time-to-match in seconds of the most recent matched tickets
+        self.wait_times: Deque[float] = deque(maxlen=history)
+
+    def __len__(self) -> int:
+        return len(self.tickets)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.tickets
+
+    def steps(self, ticket: Ticket, now: float) -> int:
+        """How many buckets away the ticket accepts an opponent"""
+        return min(self.max_steps, int((now - ticket.enqueued) / self.widen_interval))
+
+    def _opponent(self, ticket: Ticket, now: float) -> Optional[Ticket]:
+        """The closest waiting ticket that accepts or is accepted by this one; the longest waiting on a tie"""
+        steps = self.steps(ticket, now)
+        for distance in range(self.max_steps + 1):
+            best = None
+            for bucket in {ticket.bucket - distance, ticket.bucket + distance}:
+                other = self.buckets.get(bucket)
+                if other is None or other is ticket:
+                    continue
+                if distance <= steps or distance <= self.steps(other, now):
+                    if best is None or other.enqueued < best.enqueued:
+                        best = other
+            if best is not None:
+                return best
+        return None
+
+    def _match(self, ticket: Ticket, other: Ticket, now: float) -> Match:
+        for matched in (ticket, other):
+            matched.active = False
+            self.tickets.pop(matched.key, None)
+            if self.buckets.get(matched.bucket) is matched:
+                del self.buckets[matched.bucket]
+            waited = now - matched.enqueued
+            self.wait_times.append(waited)
+            MATCH_WAIT_SECONDS.observe(waited)
+        self.matches += 1
+        # The player who waited longer goes first
+        return (other, ticket) if other.enqueued <= ticket.enqueued else (ticket, other)
+
+    def _schedule(self, ticket: Ticket, now: float) -> None:
+        steps = self.steps(ticket, now)
+        if steps < self.max_steps:
+            deadline = ticket.enqueued + (steps + 1) * self.widen_interval
+            heapq.heappush(self._deadlines, (deadline, next(self._order), ticket))
+
+    def add(self, key: Hashable, rating: int, payload: Any = None) -> Optional[Match]:
+        """Queue a player, or return (waiting, new) if someone waiting is within range"""
+        if key in self.tickets:
+            raise ValueError(f"{key!r} is already queued")
+        now = self.clock()
+        ticket = Ticket(key, rating, rating // self.bucket_width, now, payload)
+        other = self._opponent(ticket, now)
+        if other is not None:
+            return self._match(ticket, other, now)
+        self.tickets[key] = ticket
+        self.buckets[ticket.bucket] = ticket
+        self._schedule(ticket, now)
+        return None
+
+    def cancel(self, key: Hashable) -> bool:
+        """Leave the queue; its widening deadlines are skipped when they come up"""
+        ticket = self.tickets.pop(key, None)
+        if ticket is None:
+            return False
+        ticket.active = False
+        del self.buckets[ticket.bucket]
+        return True
+
+    def poll(self) -> List[Match]:
+        """Widen every window whose deadline has passed and return the matches that makes possible"""
+        now = self.clock()
+        matches = []
+        deadlines = self._deadlines
+        while deadlines and deadlines[0][0] <= now:
+            _, _, ticket = heapq.heappop(deadlines)
+            if not ticket.active:
+                continue
+            other = self._opponent(ticket, now)
+            if other is None:
+                self._schedule(ticket, now)
+            else:
+                matches.append(self._match(ticket, other, now))
+        return matches
+
+    def time_to_match(self) -> Dict[str, float]:
+        """Latency summary of recent time-to-match, plus how many matches were made and how many are waiting"""
+        summary = latency_summary(self.wait_times)
+        summary["matches"] = self.matches
+        summary["queued"] = len(self.tickets)
+        return summary
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+def simulate(players: int, arrival_rate: float, poll_interval: float = 0.5, seed: int = 0) -> dict:
+    """Feed `players` arrivals at `arrival_rate` per second through a queue on a simulated clock"""
+    rng = random.Random(seed)
+    clock = _Clock()
+    queue = MatchmakingQueue(clock=clock, history=players)
+    next_poll = poll_interval
+    peak = 0
+    operations = 0
+    start = time.perf_counter()
+    for key in range(players):
+        clock.now += rng.expovariate(arrival_rate)
+        while next_poll <= clock.now:
+            saved, clock.now = clock.now, next_poll
+            queue.poll()
+            clock.now = saved
+            next_poll += poll_interval
+            operations += 1
+        wins, losses = rng.randint(0, 60), rng.randint(0, 60)
+        queue.add(key, player_rating(Player(name=str(key), wins=wins, losses=losses)))
+        operations += 1
+        peak = max(peak, len(queue))
+    elapsed = time.perf_counter() - start
+    report = queue.time_to_match()
+    report.update(players=players, peak_queued=peak, operations_per_second=operations / elapsed if elapsed else 0.0)
+    return report
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Simulate rating-bucketed matchmaking and report time-to-match")
+    parser.add_argument("--players", type=int, default=100000, help="Players joining the queue")
+    parser.add_argument("--rate", type=float, default=50.0, help="Arrivals per simulated second")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    report = simulate(args.players, args.rate, seed=args.seed)
+    print(f"{report['players']} players, {report['matches']} matches, peak queue {report['peak_queued']}, "
+          f"{report['operations_per_second']:.0f} ops/sec")
+    print(f"Time to match (simulated): p50 {report['p50_ms'] / 1000:.1f}s, p99 {report['p99_ms'] / 1000:.1f}s, "
+          f"max {report['max_ms'] / 1000:.1f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
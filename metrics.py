@@ -0,0 +1,176 @@
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+import threading
+
+DEFAULT_PORT = 9464
+
+TURN_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+SAVE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+MATCH_WAIT_BUCKETS = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 15.0, 20.0, 30.0, 45.0, 60.0, 120.0, 300.0)
+
+class _Sharded:
+    """Values kept in one cell per thread, so recording never takes a lock
+
+    A thread's first record adds its cell under the lock; collection takes
+    the lock only to copy the list of cells and then sums them. Cells of
+    finished threads stay, so nothing recorded is lost. Counts merged from
+    other processes go to a cell of their own.
+    """
+
+    def __init__(self, name: str, help: str, width: int):
+        self.name = name
+        self.help = help
+        self._width = width
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._merged = [0] * width
+        self._cells: List[list] = [self._merged]
+
+    def _cell(self) -> list:
+        try:
+            return self._local.cell
+        except AttributeError:
+            cell = self._local.cell = [0] * self._width
+            with self._lock:
+                self._cells.append(cell)
+            return cell
+
+    def values(self) -> list:
+        with self._lock:
+            cells = list(self._cells)
+        return [sum(column) for column in zip(*cells)]
+
+    def merge(self, values: Sequence) -> None:
+        with self._lock:
+            for i, value in enumerate(values):
+                self._merged[i] += value
+
+    def reset(self) -> None:
+        """Zero every cell; only safe while no other thread is recording"""
+        with self._lock:
+            for cell in self._cells:
+                cell[:] = [0] * self._width
+
+class Counter(_Sharded):
+    def __init__(self, name: str, help: str):
+        super().__init__(name, help, 1)
+
+    def inc(self, amount: int = 1) -> None:
+        try:
+            cell = self._local.cell
+        except AttributeError:
+            cell = self._cell()
+        cell[0] += amount
+
+    @property
+    def value(self) -> int:
+        return self.values()[0]
+
+    def exposition(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter", f"{self.name} {self.value}"]
+
+class Histogram(_Sharded):
+    """Prometheus histogram: a count per upper bound, plus the sum of observed values"""
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float]):
+        self.buckets: Tuple[float, ...] = tuple(sorted(buckets))
+        # One count per bound, one for +Inf, then the sum
+        super().__init__(name, help, len(self.buckets) + 2)
+
+    def observe(self, value: float) -> None:
+        try:
+            cell = self._local.cell
+        except AttributeError:
+            cell = self._cell()
+        cell[bisect_left(self.buckets, value)] += 1
+        cell[-1] += value
+
+    def exposition(self) -> List[str]:
+        values = self.values()
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        cumulative = 0
+        for bound, count in zip(self.buckets + ("+Inf",), values[:-1]):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f"{self.name}_sum {values[-1]}")
+        lines.append(f"{self.name}_count {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: Dict[str, _Sharded] = {}
+
+    def counter(self, name: str, help: str) -> Counter:
+        return self._register(Counter(name, help))
+
+    def histogram(self, name: str, help: str, buckets: Sequence[float]) -> Histogram:
+        return self._register(Histogram(name, help, buckets))
+
+    def _register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def collect(self) -> Dict[str, list]:
+        """Current values of every metric, picklable so worker processes can send them to merge()"""
+        return {name: metric.values() for name, metric in self.metrics.items()}
+
+    def merge(self, snapshot: Dict[str, list]) -> None:
+        """Add values collected in another process"""
+        for name, values in snapshot.items():
+            metric = self.metrics.get(name)
+            if metric is not None:
+                metric.merge(values)
+
+    def reset(self) -> None:
+        for metric in self.metrics.values():
+            metric.reset()
+
+    def exposition(self) -> str:
+        """Every metric in the Prometheus text exposition format"""
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.exposition())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = MetricsRegistry()
+
+BATTLES_STARTED = REGISTRY.counter("beyblade_battles_started_total", "Battles started")
+BATTLES_FINISHED = REGISTRY.counter("beyblade_battles_finished_total", "Battles finished")
+TURNS = REGISTRY.counter("beyblade_turns_total", "Turns executed")
+CRITICALS = REGISTRY.counter("beyblade_criticals_total", "Critical hits landed")
+STADIUM_OUTS = REGISTRY.counter("beyblade_stadium_outs_total", "Beyblades knocked out of the stadium")
+ENVIRONMENT_EVENTS = REGISTRY.counter("beyblade_environment_events_total", "Environmental events fired")
+PLAYER_STORE_READS = REGISTRY.counter("beyblade_player_store_reads_total", "Players read from the player store")
+PLAYER_STORE_WRITES = REGISTRY.counter("beyblade_player_store_writes_total", "Writes to the player store")
+TURN_SECONDS = REGISTRY.histogram("beyblade_turn_seconds", "Seconds to resolve a turn once both moves are in",
+                                  TURN_BUCKETS)
+SAVE_SECONDS = REGISTRY.histogram("beyblade_save_seconds", "Seconds per player store write", SAVE_BUCKETS)
+MATCH_WAIT_SECONDS = REGISTRY.histogram("beyblade_match_wait_seconds", "Seconds a player waited in the matchmaking queue",
+                                        MATCH_WAIT_BUCKETS)
+
+def serve_metrics(registry: MetricsRegistry = REGISTRY, host: str = "127.0.0.1", port: int = DEFAULT_PORT):
+    """Serve GET /metrics from a daemon thread and return the HTTP server; shutdown() stops it"""
+    # Only servers pay for importing the HTTP stack
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.exposition().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
@@ -0,0 +1,159 @@
+from typing import Callable, Dict, Optional, TypeVar
+import functools
+import json
+import os
+import time
+
+# Set to a file name to time the phases of the terminal game and write a JSON report there on exit
+TIMINGS_ENV = "BEYBLADE_TIMINGS"
+
+SUB_BUCKET_BITS = 5  # 32 buckets per power of two, so any recorded value is within about 3%
+# Enough buckets for any 64-bit nanosecond count, so recording never needs a bounds check
+BUCKETS = (64 - SUB_BUCKET_BITS + 1) << SUB_BUCKET_BITS
+
+F = TypeVar("F", bound=Callable)
+
+class LatencyHistogram:
+    """HDR-style histogram of nanosecond latencies in log-linear buckets
+
+    Values below 2 ** (SUB_BUCKET_BITS + 1) get a bucket each; above that
+    every power of two is split into 2 ** SUB_BUCKET_BITS buckets. Recording
+    is one list increment, and like HDR histograms the reported percentiles,
+    max and total are each bucket's highest value, so within about 3%.
+    """
+    __slots__ = ('counts',)
+
+    def __init__(self):
+        self.counts = [0] * BUCKETS
+
+    @staticmethod
+    def bucket(value: int) -> int:
+        shift = value.bit_length() - SUB_BUCKET_BITS - 1
+        return (shift << SUB_BUCKET_BITS) + (value >> shift) if shift > 0 else value
+
+    @staticmethod
+    def bucket_limit(bucket: int) -> int:
+        """Largest value that falls in a bucket"""
+        shift = (bucket >> SUB_BUCKET_BITS) - 1
+        if shift <= 0:
+            return bucket
+        return ((bucket - (shift << SUB_BUCKET_BITS) + 1) << shift) - 1
+
+    def record(self, value: int) -> None:
+        self.counts[self.bucket(value)] += 1
+
+    def merge(self, other: 'LatencyHistogram') -> None:
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def percentile(self, fraction: float) -> int:
+        """Value at or below which `fraction` of the recorded values lie"""
+        count = self.count
+        if not count:
+            return 0
+        rank = max(1, int(fraction * count + 0.5))
+        seen = 0
+        for bucket, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return self.bucket_limit(bucket)
+        return 0
+
+    def summary(self) -> Dict[str, float]:
+        """count plus p50/p99/max/total in ms"""
+        total = sum(self.bucket_limit(bucket) * count for bucket, count in enumerate(self.counts) if count)
+        return {
+            "count": self.count,
+            "p50_ms": self.percentile(0.5) / 1e6,
+            "p99_ms": self.percentile(0.99) / 1e6,
+            "max_ms": self.percentile(1.0) / 1e6,
+            "total_ms": total / 1e6
+        }
+
+class PhaseTimers:
+    """Latency histograms per named phase of a turn or persistence call
+
+    Timing is added by wrapping the callables of each phase. A disabled
+    instance hands callables back untouched, so code built with one pays
+    nothing. With `sample_every` above 1 callers can time only every nth
+    battle or turn by checking sample() and picking timed or plain
+    callables for it.
+    """
+
+    def __init__(self, enabled: bool = True, sample_every: int = 1):
+        self.enabled = enabled
+        self.sample_every = sample_every
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self._countdown = 1
+
+    @classmethod
+    def from_environment(cls) -> 'PhaseTimers':
+        """Enabled when BEYBLADE_TIMINGS names a report file"""
+        return cls(enabled=bool(os.environ.get(TIMINGS_ENV)))
+
+    def histogram(self, phase: str) -> LatencyHistogram:
+        histogram = self.histograms.get(phase)
+        if histogram is None:
+            histogram = self.histograms[phase] = LatencyHistogram()
+        return histogram
+
+    def sample(self) -> bool:
+        """True once every `sample_every` calls"""
+        self._countdown -= 1
+        if self._countdown:
+            return False
+        self._countdown = self.sample_every
+        return True
+
+    def wrap(self, phase: str, function: F) -> F:
+        """`function`, timing every call into the phase's histogram when enabled"""
+        if not self.enabled:
+            return function
+        counts = self.histogram(phase).counts
+        clock = time.perf_counter_ns
+
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                # LatencyHistogram.record, inlined
+                elapsed = clock() - start
+                shift = elapsed.bit_length() - SUB_BUCKET_BITS - 1
+                counts[(shift << SUB_BUCKET_BITS) + (elapsed >> shift) if shift > 0 else elapsed] += 1
+        return timed
+
+    def timed(self, phase: str) -> Callable[[F], F]:
+        """Decorator form of wrap()"""
+        return lambda function: self.wrap(phase, function)
+
+    def instrument(self, owner, attribute: str, phase: Optional[str] = None) -> None:
+        """Time a method of one object by replacing it with a wrapped instance attribute"""
+        if self.enabled:
+            setattr(owner, attribute, self.wrap(phase or attribute, getattr(owner, attribute)))
+
+    def report(self) -> dict:
+        return {
+            "sample_every": self.sample_every,
+            "phases": {phase: histogram.summary() for phase, histogram in self.histograms.items() if any(histogram.counts)}
+        }
+
+    def format_report(self) -> str:
+        lines = [f"{'phase':<20} {'count':>9} {'p50 ms':>10} {'p99 ms':>10} {'max ms':>10} {'total ms':>11}"]
+        phases = sorted(self.report()["phases"].items(), key=lambda item: item[1]["total_ms"], reverse=True)
+        for phase, summary in phases:
+            lines.append(f"{phase:<20} {summary['count']:>9} {summary['p50_ms']:>10.4f} {summary['p99_ms']:>10.4f} "
+                         f"{summary['max_ms']:>10.4f} {summary['total_ms']:>11.1f}")
+        if self.sample_every > 1:
+            lines.append(f"(one in {self.sample_every} sampled)")
+        return "\n".join(lines)
+
+    def write_report(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+
+NULL_TIMERS = PhaseTimers(enabled=False)
@@ -1,7 +1,8 @@
-import json
-import os
 from dataclasses import dataclass, asdict
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple
+
+# Fields whose assignment marks a Player as needing a save
+_TRACKED_FIELDS = ('name', 'wins', 'losses', 'custom_beyblades')
 
 @dataclass
 class Player:
@@ -13,6 +14,25 @@ class Player:
     def __post_init__(self):
         if self.custom_beyblades is None:
             self.custom_beyblades = []
+        # Not a dataclass field, so it never ends up in to_dict()
+        object.__setattr__(self, '_dirty', False)
+    
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name in _TRACKED_FIELDS:
+            object.__setattr__(self, '_dirty', True)
+    
+    @property
+    def is_dirty(self) -> bool:
+        """Whether the player changed since it was last saved"""
+        return self._dirty
+    
+    def mark_dirty(self):
+        """Flag in-place changes, e.g. to custom_beyblades, that __setattr__ cannot see"""
+        object.__setattr__(self, '_dirty', True)
+    
+    def mark_clean(self):
+        object.__setattr__(self, '_dirty', False)
     
     def to_dict(self) -> dict:
         return asdict(self)
@@ -22,34 +42,42 @@ class Player:
         return cls(**data)
 
 class PlayerManager:
-    def __init__(self, save_file: str = "data/players.json"):
+    def __init__(self, save_file: str = "data/players.json", store=None, write_behind: bool = False,
+                 flush_interval: float = 5.0, flush_every: int = 1000):
         self.save_file = save_file
+        # Imported here because player_store builds on Player
+        from player_store import JsonPlayerStore, WriteBehindPlayerStore
+        if store is None:
+            store = JsonPlayerStore(save_file)
+        if write_behind:
+            store = WriteBehindPlayerStore(store, flush_interval=flush_interval, flush_every=flush_every)
+        self.store = store
         self.players: Dict[str, Player] = {}
         self._load_players()
     
     def _load_players(self):
-        """Load players from save file"""
-        if os.path.exists(self.save_file):
-            try:
-                with open(self.save_file, 'r') as f:
-                    data = json.load(f)
-                    self.players = {
-                        name: Player.from_dict(player_data)
-                        for name, player_data in data.items()
-                    }
-            except Exception as e:
-                print(f"Error loading players: {e}")
-                self.players = {}
+        """Load players from the storage backend"""
+        try:
+            self.players = self.store.load_all()
+        except Exception as e:
+            print(f"Error loading players: {e}")
+            self.players = {}
     
     def save_players(self):
-        """Save players to file"""
-        os.makedirs(os.path.dirname(self.save_file), exist_ok=True)
-        with open(self.save_file, 'w') as f:
-            json.dump(
-                {name: player.to_dict() for name, player in self.players.items()},
-                f,
-                indent=2
-            )
+        """Save all players"""
+        self.store.save_all(self.players)
+    
+    def transaction(self):
+        """Group several player updates into a single write"""
+        return self.store.transaction()
+    
+    def flush(self):
+        """Write any pending player updates now"""
+        self.store.flush()
+    
+    def close(self):
+        """Flush pending updates and release the storage backend"""
+        self.store.close()
     
     def get_player(self, name: str) -> Optional[Player]:
         """Get player by name"""
@@ -62,13 +90,14 @@ class PlayerManager:
         
         player = Player(name=name)
         self.players[name] = player
-        self.save_players()
+        self.store.save_player(player)
         return player
     
     def update_player(self, player: Player):
         """Update player data"""
         self.players[player.name] = player
-        self.save_players()
+        player.mark_dirty()
+        self.store.save_player(player)
     
     def add_custom_beyblade(self, player_name: str, beyblade_data: dict):
         """Add a custom beyblade to player's collection"""
@@ -84,4 +113,8 @@ class PlayerManager:
         player = self.get_player(player_name)
         if not player:
             return []
-        return player.custom_beyblades 
\ No newline at end of file
+        return player.custom_beyblades 
+    
+    def find_custom_beyblade(self, beyblade_name: str) -> Optional[Tuple[str, Dict]]:
+        """Owner and build of a custom beyblade by name; the first owner wins if several have one"""
+        return self.store.find_custom_beyblade(beyblade_name, self.players)
\ No newline at end of file
@@ -0,0 +1,806 @@
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+import argparse
+import atexit
+import bisect
+import hashlib
+import json
+import mmap
+import os
+import re
+import sqlite3
+import struct
+import sys
+import tempfile
+import threading
+import time
+from metrics import PLAYER_STORE_READS, PLAYER_STORE_WRITES, SAVE_SECONDS
+from player import Player
+
+class PlayerStore:
+    """Storage backend interface used by PlayerManager"""
+
+    def load_all(self) -> Dict[str, Player]:
+        raise NotImplementedError
+
+    def save_player(self, player: Player) -> None:
+        raise NotImplementedError
+
+    def save_players(self, players: List[Player]) -> None:
+        """Save several changed players at once"""
+        for player in players:
+            self.save_player(player)
+
+    def save_all(self, players: Dict[str, Player]) -> None:
+        raise NotImplementedError
+
+    def find_custom_beyblade(self, beyblade_name: str, players: Dict[str, Player]) -> Optional[Tuple[str, Dict]]:
+        """(owner, build) of the first player, in player order, with a custom Beyblade of that name"""
+        for name, player in players.items():
+            for build in player.custom_beyblades:
+                if build["name"] == beyblade_name:
+                    return name, build
+        return None
+
+    @staticmethod
+    def _first_owner(beyblade_name: str, owners: List[str], players: Dict[str, Player]) -> Optional[Tuple[str, Dict]]:
+        """Check indexed owners in order against their current builds"""
+        for owner in owners:
+            player = players.get(owner)
+            for build in player.custom_beyblades if player else []:
+                if build["name"] == beyblade_name:
+                    return owner, build
+        return None
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """Group several saves into one write"""
+        yield
+
+    def flush(self) -> None:
+        """Write anything the store is holding back"""
+        pass
+
+    def close(self) -> None:
+        pass
+
+class LazyPlayers(MutableMapping):
+    """Player mapping backed by a store's index; players are only built on first access
+
+    `source` provides load_player, has_player, player_names and player_count.
+    Materialized and newly added players live in `loaded`. Both it and
+    `deleted` only change under a lock, so a flush thread can snapshot them.
+    """
+
+    def __init__(self, source: 'PlayerStore'):
+        self.source = source
+        self.loaded: Dict[str, Player] = {}
+        self.deleted: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name: str) -> Player:
+        player = self.loaded.get(name)
+        if player is None:
+            if name in self.deleted:
+                raise KeyError(name)
+            player = self.source.load_player(name)
+            if player is None:
+                raise KeyError(name)
+            with self._lock:
+                player = self.loaded.setdefault(name, player)
+        return player
+
+    def __setitem__(self, name: str, player: Player) -> None:
+        with self._lock:
+            self.deleted.discard(name)
+            self.loaded[name] = player
+
+    def __delitem__(self, name: str) -> None:
+        if name not in self:
+            raise KeyError(name)
+        with self._lock:
+            self.loaded.pop(name, None)
+            self.deleted.add(name)
+
+    def snapshot(self) -> Tuple[Dict[str, Player], Set[str]]:
+        """Copies of `loaded` and `deleted` to save from"""
+        with self._lock:
+            return dict(self.loaded), set(self.deleted)
+
+    def forget_deleted(self, names: Set[str]) -> None:
+        """Drop deletions the store has written"""
+        with self._lock:
+            self.deleted.difference_update(names)
+
+    def __contains__(self, name: object) -> bool:
+        if name in self.loaded:
+            return True
+        return name not in self.deleted and self.source.has_player(name)
+
+    def __iter__(self) -> Iterator[str]:
+        for name in self.source.player_names():
+            if name not in self.deleted:
+                yield name
+        for name in list(self.loaded):
+            if not self.source.has_player(name):
+                yield name
+
+    def __len__(self) -> int:
+        added = sum(1 for name in self.loaded if not self.source.has_player(name))
+        removed = sum(1 for name in self.deleted if self.source.has_player(name))
+        return self.source.player_count() + added - removed
+
+def _name_hash(name: str) -> int:
+    return int.from_bytes(hashlib.blake2b(name.encode("utf-8"), digest_size=8).digest(), "little")
+
+class _Column:
+    """Read-only sequence over one fixed-width field of a mapped array, for bisect"""
+
+    def __init__(self, buffer, offset: int, count: int, layout: struct.Struct):
+        self.buffer = buffer
+        self.offset = offset
+        self.count = count
+        self.layout = layout
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, i: int) -> int:
+        return self.layout.unpack_from(self.buffer, self.offset + i * self.layout.size)[0]
+
+INDEX_MAGIC = b"BBPIDX02"
+INDEX_HEADER = struct.Struct("<QQQQ")  # players, custom builds, size and mtime_ns of the players file it describes
+INDEX_RECORD = struct.Struct("<QII")  # entry offset, key length, entry length (file order)
+INDEX_HASH = struct.Struct("<Q")  # name hashes, sorted; then custom build name hashes, sorted
+INDEX_SLOT = struct.Struct("<I")  # record number of each sorted hash
+
+def _build_hashes(custom_beyblades: List[Dict]) -> List[int]:
+    """Distinct name hashes of a player's custom builds"""
+    return sorted({_name_hash(build["name"]) for build in custom_beyblades})
+
+class JsonPlayerIndex:
+    """Maps player names to byte ranges of players.json through a sidecar `.idx` file
+
+    Each entry of the players file is the `"name": {...}` text of one player.
+    Records are kept in file order; a hash-sorted table next to them gives
+    O(log n) lookups straight from the memory-mapped index. A second sorted
+    table maps custom build names to the records of the players owning them.
+    """
+
+    def __init__(self, data_path: str, index_path: str):
+        self.data_path = data_path
+        self.index_path = index_path
+        self.count = 0
+        self.build_count = 0
+        self._data_file = self._data = None
+        self._index_file = self._index = None
+        self._open()
+
+    def _open(self) -> None:
+        if os.path.getsize(self.data_path) == 0:
+            raise ValueError(f"{self.data_path} is empty")
+        self._data_file = open(self.data_path, "rb")
+        self._data = mmap.mmap(self._data_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if not self._load_index():
+            records = self.scan(self._data)
+            hashes, builds = [], []
+            for record, (offset, key_length, length) in enumerate(records):
+                hashes.append(_name_hash(json.loads(self._data[offset:offset + key_length])))
+                entry = self._data[offset:offset + length]
+                # Only players with builds need parsing
+                if b'"custom_beyblades": []' not in entry:
+                    data = next(iter(json.loads(b"{" + entry + b"}").values()))
+                    builds.extend((build_hash, record) for build_hash in _build_hashes(data["custom_beyblades"]))
+            self.write(self.index_path, self.data_path, records, hashes, builds)
+            if not self._load_index():
+                raise ValueError(f"Could not index {self.data_path}")
+
+    def _load_index(self) -> bool:
+        """Map the index if it exists and still describes the players file"""
+        if not os.path.exists(self.index_path):
+            return False
+        stat = os.stat(self.data_path)
+        index_file = open(self.index_path, "rb")
+        try:
+            index = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            index_file.close()
+            return False
+        header_end = len(INDEX_MAGIC) + INDEX_HEADER.size
+        valid = len(index) >= header_end and index[:len(INDEX_MAGIC)] == INDEX_MAGIC
+        if valid:
+            count, build_count, size, mtime_ns = INDEX_HEADER.unpack_from(index, len(INDEX_MAGIC))
+            valid = (size, mtime_ns) == (stat.st_size, stat.st_mtime_ns) and len(index) == (
+                header_end + count * (INDEX_RECORD.size + INDEX_HASH.size + INDEX_SLOT.size)
+                + build_count * (INDEX_HASH.size + INDEX_SLOT.size))
+        if not valid:
+            index.close()
+            index_file.close()
+            return False
+        self._index_file, self._index, self.count, self.build_count = index_file, index, count, build_count
+        self._records_start = header_end
+        hashes_start = header_end + count * INDEX_RECORD.size
+        slots_start = hashes_start + count * INDEX_HASH.size
+        build_hashes_start = slots_start + count * INDEX_SLOT.size
+        build_slots_start = build_hashes_start + build_count * INDEX_HASH.size
+        self._hashes = _Column(index, hashes_start, count, INDEX_HASH)
+        self._slots = _Column(index, slots_start, count, INDEX_SLOT)
+        self._build_hashes = _Column(index, build_hashes_start, build_count, INDEX_HASH)
+        self._build_slots = _Column(index, build_slots_start, build_count, INDEX_SLOT)
+        return True
+
+    @staticmethod
+    def scan(data) -> List[Tuple[int, int, int]]:
+        """(entry offset, key length, entry length) of every top-level entry of a players file"""
+        # latin-1 maps bytes to characters one to one, so string offsets are byte offsets
+        text = bytes(data).decode("latin-1")
+        decoder = json.JSONDecoder()
+        whitespace = re.compile(r"[ \t\n\r]*")
+        i = whitespace.match(text, 0).end()
+        if text[i:i + 1] != "{":
+            raise ValueError("Players file must hold a JSON object")
+        i = whitespace.match(text, i + 1).end()
+        records = []
+        if text[i:i + 1] == "}":
+            return records
+        while True:
+            start = i
+            _, i = json.decoder.scanstring(text, i + 1)
+            key_length = i - start
+            i = whitespace.match(text, i).end()
+            if text[i:i + 1] != ":":
+                raise ValueError(f"Expected ':' at byte {i}")
+            i = whitespace.match(text, i + 1).end()
+            _, i = decoder.raw_decode(text, i)
+            records.append((start, key_length, i - start))
+            i = whitespace.match(text, i).end()
+            if text[i:i + 1] == "}":
+                return records
+            if text[i:i + 1] != ",":
+                raise ValueError(f"Expected ',' at byte {i}")
+            i = whitespace.match(text, i + 1).end()
+
+    @staticmethod
+    def write(index_path: str, data_path: str, records: List[Tuple[int, int, int]], hashes: List[int],
+              builds: List[Tuple[int, int]]) -> None:
+        """Write the index for `records` of the players file at data_path
+
+        `hashes` holds each record's name hash and `builds` a (build name hash,
+        record) pair per custom build name a record owns.
+        """
+        stat = os.stat(data_path)
+        count = len(records)
+        order = sorted(range(count), key=hashes.__getitem__)
+        # Sorted by record within a hash, so the first match is the first owner in file order
+        builds = sorted(builds)
+        _atomic_write(index_path, b"".join([
+            INDEX_MAGIC,
+            INDEX_HEADER.pack(count, len(builds), stat.st_size, stat.st_mtime_ns),
+            struct.pack("<" + INDEX_RECORD.format[1:] * count, *[field for record in records for field in record]),
+            struct.pack(f"<{count}Q", *[hashes[i] for i in order]),
+            struct.pack(f"<{count}I", *order),
+            struct.pack(f"<{len(builds)}Q", *[build_hash for build_hash, _ in builds]),
+            struct.pack(f"<{len(builds)}I", *[record for _, record in builds])
+        ]))
+
+    def records(self) -> List[Tuple[int, int, int]]:
+        """Every record in file order"""
+        start = self._records_start
+        return list(INDEX_RECORD.iter_unpack(self._index[start:start + self.count * INDEX_RECORD.size]))
+
+    def record_hashes(self) -> List[int]:
+        """Name hash of every record, in file order"""
+        hashes = [0] * self.count
+        sorted_hashes = struct.unpack_from(f"<{self.count}Q", self._index, self._hashes.offset)
+        slots = struct.unpack_from(f"<{self.count}I", self._index, self._slots.offset)
+        for name_hash, record in zip(sorted_hashes, slots):
+            hashes[record] = name_hash
+        return hashes
+
+    def record_builds(self) -> Dict[int, List[int]]:
+        """Custom build name hashes of every record that has builds"""
+        builds: Dict[int, List[int]] = {}
+        build_hashes = struct.unpack_from(f"<{self.build_count}Q", self._index, self._build_hashes.offset)
+        records = struct.unpack_from(f"<{self.build_count}I", self._index, self._build_slots.offset)
+        for build_hash, record in zip(build_hashes, records):
+            builds.setdefault(record, []).append(build_hash)
+        return builds
+
+    def find_builds(self, beyblade_name: str) -> List[int]:
+        """Records, in file order, that may own a custom build of that name; hashes can collide"""
+        if not self.build_count:
+            return []
+        build_hash = _name_hash(beyblade_name)
+        slot = bisect.bisect_left(self._build_hashes, build_hash)
+        records = []
+        while slot < self.build_count and self._build_hashes[slot] == build_hash:
+            records.append(self._build_slots[slot])
+            slot += 1
+        return records
+
+    def find(self, name: str) -> int:
+        """Record number of a player, or -1"""
+        if not self.count:
+            return -1
+        name_hash = _name_hash(name)
+        slot = bisect.bisect_left(self._hashes, name_hash)
+        while slot < self.count and self._hashes[slot] == name_hash:
+            record = self._slots[slot]
+            if self.name(record) == name:
+                return record
+            slot += 1
+        return -1
+
+    def record(self, record: int) -> Tuple[int, int, int]:
+        """(entry offset, key length, entry length) of a record"""
+        return INDEX_RECORD.unpack_from(self._index, self._records_start + record * INDEX_RECORD.size)
+
+    def entry(self, record: int) -> bytes:
+        """Raw `"name": {...}` text of a record"""
+        offset, _, length = self.record(record)
+        return self._data[offset:offset + length]
+
+    def name(self, record: int) -> str:
+        offset, key_length, _ = self.record(record)
+        return json.loads(self._data[offset:offset + key_length])
+
+    def load(self, record: int) -> Player:
+        data = json.loads(b"{" + self.entry(record) + b"}")
+        return Player.from_dict(next(iter(data.values())))
+
+    def close(self) -> None:
+        # Unmap before the files get replaced; Windows refuses to replace mapped files
+        for handle in (self._index, self._index_file, self._data, self._data_file):
+            if handle is not None:
+                handle.close()
+        self._data_file = self._data = None
+        self._index_file = self._index = None
+        self.count = self.build_count = 0
+
+def _atomic_write(path: str, data: bytes) -> None:
+    """Write a temp file next to `path` and rename it over, so a crash never leaves a torn file"""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".players_", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+class JsonPlayerStore(PlayerStore):
+    """players.json store; the whole file is rewritten on every save
+
+    A sidecar index (`players.json.idx`) maps names to byte ranges, so
+    load_all returns a LazyPlayers mapping and players are only parsed
+    when first looked up. Pass indexed=False to parse the whole file up front.
+    """
+
+    def __init__(self, save_file: str = "data/players.json", indexed: bool = True):
+        self.save_file = save_file
+        self.index_file = save_file + ".idx"
+        self.indexed = indexed
+        self.players: Dict[str, Player] = {}
+        self._index: Optional[JsonPlayerIndex] = None
+        # Guards the index against the write-behind flush thread swapping it
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._pending = False
+
+    def load_all(self) -> Dict[str, Player]:
+        # PlayerManager keeps using the returned dict, so later saves see its changes
+        with self._lock:
+            self._close_index()
+            if not self.indexed:
+                self.players = {}
+                if os.path.exists(self.save_file):
+                    with open(self.save_file, 'r') as f:
+                        data = json.load(f)
+                    self.players = {name: Player.from_dict(player_data) for name, player_data in data.items()}
+                    PLAYER_STORE_READS.inc(len(self.players))
+                return self.players
+            # An empty players file holds no players
+            if os.path.exists(self.save_file) and os.path.getsize(self.save_file):
+                self._index = JsonPlayerIndex(self.save_file, self.index_file)
+            self.players = LazyPlayers(self)
+            return self.players
+
+    def load_player(self, name: str) -> Optional[Player]:
+        PLAYER_STORE_READS.inc()
+        with self._lock:
+            record = self._index.find(name) if self._index else -1
+            return self._index.load(record) if record >= 0 else None
+
+    def has_player(self, name: str) -> bool:
+        with self._lock:
+            return bool(self._index) and self._index.find(name) >= 0
+
+    def player_names(self) -> List[str]:
+        with self._lock:
+            return [self._index.name(i) for i in range(self._index.count)] if self._index else []
+
+    def player_count(self) -> int:
+        return self._index.count if self._index else 0
+
+    def save_player(self, player: Player) -> None:
+        self.players[player.name] = player
+        self.save_all(self.players)
+
+    def save_players(self, players: List[Player]) -> None:
+        for player in players:
+            self.players[player.name] = player
+        self.save_all(self.players)
+
+    def find_custom_beyblade(self, beyblade_name: str, players: Dict[str, Player]) -> Optional[Tuple[str, Dict]]:
+        """Looked up in the index's build table; sees saved players only"""
+        if not (isinstance(players, LazyPlayers) and players.source is self):
+            return super().find_custom_beyblade(beyblade_name, players)
+        with self._lock:
+            index = self._index
+            owners = [index.name(record) for record in index.find_builds(beyblade_name)] if index else []
+        return self._first_owner(beyblade_name, owners, players)
+
+    @staticmethod
+    def _entry(name: str, player: Player) -> Tuple[bytes, int]:
+        """One player as it appears in json.dump(..., indent=2) output, and its key length"""
+        key = json.dumps(name)
+        value = json.dumps(player.to_dict(), indent=2).replace("\n", "\n  ")
+        return f"{key}: {value}".encode("utf-8"), len(key)
+
+    def _entries(self, loaded: Dict[str, Player], deleted: Set[str],
+                 lazy: bool) -> Iterator[Tuple[int, bytes, int, List[int]]]:
+        """(name hash, entry text, key length, build name hashes) of every player, in file order
+
+        `loaded` holds every player, unless `lazy` when it only holds those
+        looked up from this store; `deleted` then names the removed ones.
+        """
+        if not (lazy and self._index):
+            for name, player in loaded.items():
+                yield (_name_hash(name), *self._entry(name, player), _build_hashes(player.custom_beyblades))
+            return
+        # Players never looked up cannot have changed: copy their text from the current file
+        index = self._index
+        changed = {}
+        for name in list(loaded) + list(deleted):
+            record = index.find(name)
+            if record >= 0:
+                changed[record] = name
+        data = index._data
+        builds = index.record_builds()
+        for record, ((offset, key_length, length), name_hash) in enumerate(zip(index.records(), index.record_hashes())):
+            name = changed.get(record)
+            if name is None:
+                yield name_hash, data[offset:offset + length], key_length, builds.get(record, [])
+            elif name in loaded:
+                player = loaded[name]
+                yield (name_hash, *self._entry(name, player), _build_hashes(player.custom_beyblades))
+        for name, player in loaded.items():
+            if index.find(name) < 0:
+                yield (_name_hash(name), *self._entry(name, player), _build_hashes(player.custom_beyblades))
+
+    def save_all(self, players: Dict[str, Player]) -> None:
+        with self._lock:
+            self.players = players
+            if self._depth:
+                self._pending = True
+                return
+            start = time.perf_counter()
+            # Other threads may keep looking players up while this one writes
+            lazy = isinstance(players, LazyPlayers) and players.source is self
+            loaded, deleted = players.snapshot() if lazy else (dict(players.items()), set())
+            # Same bytes as json.dump(players, f, indent=2), with entry offsets recorded on the way
+            parts, records, hashes, builds = [b"{"], [], [], []
+            position = 1
+            for name_hash, entry, key_length, build_hashes in self._entries(loaded, deleted, lazy):
+                builds.extend((build_hash, len(records)) for build_hash in build_hashes)
+                separator = b",\n  " if records else b"\n  "
+                parts.append(separator)
+                parts.append(entry)
+                position += len(separator)
+                records.append((position, key_length, len(entry)))
+                hashes.append(name_hash)
+                position += len(entry)
+            parts.append(b"\n}" if records else b"}")
+            data = b"".join(parts)
+
+            self._close_index()
+            _atomic_write(self.save_file, data)
+            if self.indexed:
+                JsonPlayerIndex.write(self.index_file, self.save_file, records, hashes, builds)
+                self._index = JsonPlayerIndex(self.save_file, self.index_file)
+            for player in loaded.values():
+                player.mark_clean()
+            if lazy:
+                players.forget_deleted(deleted)
+            PLAYER_STORE_WRITES.inc()
+            SAVE_SECONDS.observe(time.perf_counter() - start)
+
+    def _close_index(self) -> None:
+        if self._index is not None:
+            self._index.close()
+            self._index = None
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+        if not self._depth and self._pending:
+            self._pending = False
+            self.save_all(self.players)
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_index()
+
+class SqlitePlayerStore(PlayerStore):
+    """One row per player in an SQLite database running in WAL mode
+
+    A custom_beyblades table maps build names to their owners and is
+    rewritten with each saved player.
+    """
+
+    def __init__(self, path: str = "data/players.db"):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Autocommit mode; transaction() issues explicit BEGIN/COMMIT
+        self.connection = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS players ("
+            "name TEXT PRIMARY KEY, wins INTEGER NOT NULL DEFAULT 0, losses INTEGER NOT NULL DEFAULT 0, "
+            "custom_beyblades TEXT NOT NULL DEFAULT '[]')"
+        )
+        self._depth = 0
+        indexed = self.connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'custom_beyblades'").fetchone()
+        if not indexed:
+            # Databases from before the build index get it filled in once
+            with self.transaction():
+                # Keyed by owner for the rewrite on every save, with a second index for lookups by name
+                self.connection.execute("CREATE TABLE custom_beyblades (owner TEXT NOT NULL, name TEXT NOT NULL, "
+                                        "PRIMARY KEY (owner, name)) WITHOUT ROWID")
+                self.connection.execute("CREATE INDEX custom_beyblades_name ON custom_beyblades (name)")
+                rows = self.connection.execute(
+                    "SELECT name, custom_beyblades FROM players WHERE custom_beyblades != '[]'").fetchall()
+                self._index_builds([(name, json.loads(custom_beyblades)) for name, custom_beyblades in rows])
+
+    @staticmethod
+    def _row_to_player(row: tuple) -> Player:
+        name, wins, losses, custom_beyblades = row
+        return Player(name=name, wins=wins, losses=losses, custom_beyblades=json.loads(custom_beyblades))
+
+    @staticmethod
+    def _player_to_row(player: Player) -> tuple:
+        return (player.name, player.wins, player.losses, json.dumps(player.custom_beyblades, separators=(",", ":")))
+
+    def _index_builds(self, owners: List[Tuple[str, List[Dict]]]) -> None:
+        """Replace the build index rows of each (owner, custom builds)"""
+        self.connection.executemany("DELETE FROM custom_beyblades WHERE owner = ?", [(owner,) for owner, _ in owners])
+        self.connection.executemany(
+            "INSERT OR IGNORE INTO custom_beyblades (name, owner) VALUES (?, ?)",
+            [(build["name"], owner) for owner, builds in owners for build in builds]
+        )
+
+    def load_all(self) -> Dict[str, Player]:
+        # Rows are only turned into players when looked up
+        return LazyPlayers(self)
+
+    def has_player(self, name: str) -> bool:
+        return self.connection.execute("SELECT 1 FROM players WHERE name = ?", (name,)).fetchone() is not None
+
+    def player_names(self) -> List[str]:
+        return [row[0] for row in self.connection.execute("SELECT name FROM players")]
+
+    def player_count(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM players").fetchone()[0]
+
+    def load_player(self, name: str) -> Optional[Player]:
+        PLAYER_STORE_READS.inc()
+        row = self.connection.execute(
+            "SELECT name, wins, losses, custom_beyblades FROM players WHERE name = ?", (name,)
+        ).fetchone()
+        return self._row_to_player(row) if row else None
+
+    def save_player(self, player: Player) -> None:
+        self.save_players([player])
+
+    def save_players(self, players: List[Player]) -> None:
+        """Upsert only the given rows"""
+        start = time.perf_counter()
+        with self.transaction():
+            self.connection.executemany(
+                "INSERT INTO players (name, wins, losses, custom_beyblades) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET wins = excluded.wins, losses = excluded.losses, "
+                "custom_beyblades = excluded.custom_beyblades",
+                [self._player_to_row(player) for player in players]
+            )
+            self._index_builds([(player.name, player.custom_beyblades) for player in players])
+        for player in players:
+            player.mark_clean()
+        PLAYER_STORE_WRITES.inc()
+        SAVE_SECONDS.observe(time.perf_counter() - start)
+
+    def find_custom_beyblade(self, beyblade_name: str, players: Dict[str, Player]) -> Optional[Tuple[str, Dict]]:
+        """Looked up in the custom_beyblades table; owners in the order they were first saved"""
+        if not (isinstance(players, LazyPlayers) and players.source is self):
+            return super().find_custom_beyblade(beyblade_name, players)
+        owners = [row[0] for row in self.connection.execute(
+            "SELECT c.owner FROM custom_beyblades c JOIN players p ON p.name = c.owner WHERE c.name = ? "
+            "ORDER BY p.rowid", (beyblade_name,))]
+        return self._first_owner(beyblade_name, owners, players)
+
+    def save_all(self, players: Dict[str, Player]) -> None:
+        if isinstance(players, LazyPlayers) and players.source is self:
+            # Rows of players never looked up are already current
+            loaded, deleted = players.snapshot()
+            with self.transaction():
+                self.connection.executemany("DELETE FROM players WHERE name = ?", [(name,) for name in deleted])
+                self._index_builds([(name, []) for name in deleted])
+                self.save_players(list(loaded.values()))
+            players.forget_deleted(deleted)
+            return
+        self.save_players(list(players.values()))
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        if self._depth == 0:
+            self.connection.execute("BEGIN")
+        self._depth += 1
+        try:
+            yield
+        except BaseException:
+            self._depth -= 1
+            if self._depth == 0:
+                self.connection.execute("ROLLBACK")
+            raise
+        self._depth -= 1
+        if self._depth == 0:
+            self.connection.execute("COMMIT")
+
+    def close(self) -> None:
+        self.connection.close()
+
+class WriteBehindPlayerStore(PlayerStore):
+    """Wraps another store and coalesces saves of dirty players into periodic batched writes
+
+    Saved players are only remembered until `flush_every` saves have piled up
+    or `flush_interval` seconds have passed; a background timer and an exit
+    hook flush whatever is left. A crash loses at most one flush window.
+    Writes happen outside the lock that saves take, so a save never waits on
+    a flush in progress.
+    """
+
+    def __init__(self, store: PlayerStore, flush_interval: float = 5.0, flush_every: int = 1000):
+        self.store = store
+        self.flush_interval = flush_interval
+        self.flush_every = flush_every
+        self.writes = 0
+        self._pending: Dict[str, Player] = {}
+        self._mutations = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.RLock()
+        self._write_lock = threading.Lock()
+        self._closed = False
+        self._stop = threading.Event()
+        self._timer: Optional[threading.Thread] = None
+        if flush_interval > 0:
+            self._timer = threading.Thread(target=self._run_timer, name="player-store-flush", daemon=True)
+            self._timer.start()
+        atexit.register(self.close)
+
+    def _run_timer(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                # The players stay pending, so the next tick retries them
+                print(f"Error flushing players: {e}")
+
+    def load_all(self) -> Dict[str, Player]:
+        return self.store.load_all()
+
+    def save_player(self, player: Player) -> None:
+        with self._lock:
+            # Marked under the lock so a concurrent flush cannot clear it unwritten
+            player.mark_dirty()
+            self._pending[player.name] = player
+            self._mutations += 1
+            # With a timer running, interval flushes are left to its thread
+            flush = self._mutations >= self.flush_every or (
+                self._timer is None and time.monotonic() - self._last_flush >= self.flush_interval)
+        if flush:
+            self.flush()
+
+    def save_players(self, players: List[Player]) -> None:
+        for player in players:
+            self.save_player(player)
+
+    def save_all(self, players: Dict[str, Player]) -> None:
+        with self._write_lock:
+            with self._lock:
+                self._pending.clear()
+                self._mutations = 0
+                self._last_flush = time.monotonic()
+            self.store.save_all(players)
+            self.writes += 1
+
+    def find_custom_beyblade(self, beyblade_name: str, players: Dict[str, Player]) -> Optional[Tuple[str, Dict]]:
+        # The wrapped store's index only covers written players
+        self.flush()
+        return self.store.find_custom_beyblade(beyblade_name, players)
+
+    def flush(self) -> None:
+        with self._write_lock:
+            with self._lock:
+                self._last_flush = time.monotonic()
+                self._mutations = 0
+                # A player saved several times since the last flush is written once
+                dirty = [player for player in self._pending.values() if player.is_dirty]
+                self._pending.clear()
+            if not dirty:
+                return
+            try:
+                self.store.save_players(dirty)
+            except BaseException:
+                with self._lock:
+                    # Players saved again meanwhile are pending already
+                    for player in dirty:
+                        self._pending.setdefault(player.name, player)
+                raise
+            self.writes += 1
+            with self._lock:
+                # Saved while being written: the write may have marked them clean too early
+                for player in self._pending.values():
+                    player.mark_dirty()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._stop.set()
+        self.flush()
+        self.store.close()
+        atexit.unregister(self.close)
+
+def migrate_json_to_sqlite(json_file: str, sqlite_file: str) -> int:
+    """Copy every player from a players.json file into an SQLite store"""
+    # Parsed whole rather than through the index, which would leave a .idx file behind
+    source = JsonPlayerStore(json_file, indexed=False)
+    try:
+        players = source.load_all()
+    finally:
+        source.close()
+    store = SqlitePlayerStore(sqlite_file)
+    try:
+        store.save_all(players)
+    finally:
+        store.close()
+    return len(players)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Player storage tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    migrate_parser = subparsers.add_parser("migrate", help="Copy players.json into an SQLite database")
+    migrate_parser.add_argument("json_file", nargs="?", default="data/players.json")
+    migrate_parser.add_argument("sqlite_file", nargs="?", default="data/players.db")
+    args = parser.parse_args(argv)
+
+    count = migrate_json_to_sqlite(args.json_file, args.sqlite_file)
+    print(f"Migrated {count} players from {args.json_file} to {args.sqlite_file}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,265 @@
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+import argparse
+import json
+import random
+import struct
+import sys
+import time
+import zlib
+from battle import BeyBattle
+from beyblade import Beyblade, SpecialMove, create_starter_beyblades
+from checkpoints import pack_beyblade, unpack_beyblade
+from simulation import POLICIES, find_starter_beyblade
+from utils import BattleError
+
+MAGIC = b"BBRP"
+VERSION = 1
+KEYFRAME_INTERVAL = 16
+
+_HEADER = struct.Struct("<4sBQI")  # magic, version, seed, turns
+_RECORD = struct.Struct("<I")  # byte length of each replay in an archive
+
+@dataclass
+class Replay:
+    """A BeyBattle as its starting Beyblades, its RNG seed and the index of each side's move every turn
+
+    Moves are stored as two bytes per turn: the positions of the chosen
+    moves in each Beyblade's special_moves.
+    """
+    seed: int
+    beyblades: Tuple[Beyblade, Beyblade]
+    moves: bytes
+
+    @property
+    def turns(self) -> int:
+        return len(self.moves) // 2
+
+    def encode(self) -> bytes:
+        parts = [_HEADER.pack(MAGIC, VERSION, self.seed, self.turns)]
+        for beyblade in self.beyblades:
+            pack_beyblade(parts, beyblade)
+        parts.append(self.moves)
+        return b"".join(parts)
+
+    @classmethod
+    def decode(cls, data: bytes) -> 'Replay':
+        magic, version, seed, turns = _HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise BattleError("Not a replay")
+        if version != VERSION:
+            raise BattleError(f"Unsupported replay version {version}")
+        beyblade1, offset = unpack_beyblade(data, _HEADER.size)
+        beyblade2, offset = unpack_beyblade(data, offset)
+        return cls(seed, (beyblade1, beyblade2), bytes(data[offset:offset + 2 * turns]))
+
+class ReplayRecorder:
+    """Plays a BeyBattle seeded for replay and records both move choices every turn
+
+    Everything random in the battle comes from its seeded RNG, so move
+    policies must draw from an RNG of their own.
+    """
+
+    def __init__(self, beyblade1: Beyblade, beyblade2: Beyblade, seed: Optional[int] = None, log_writer=None):
+        self.seed = seed if seed is not None else random.getrandbits(64)
+        self.beyblades = (beyblade1.clone(), beyblade2.clone())
+        self.battle = BeyBattle(beyblade1, beyblade2, log_writer, random.Random(self.seed))
+        self.moves = bytearray()
+        self._move_indices: Tuple[Dict[SpecialMove, int], ...] = tuple(
+            {move: i for i, move in enumerate(beyblade.special_moves)} for beyblade in (beyblade1, beyblade2))
+
+    def execute_turn(self, move1: SpecialMove, move2: SpecialMove) -> dict:
+        """BeyBattle.execute_turn, recording the moves"""
+        try:
+            indices = (self._move_indices[0][move1], self._move_indices[1][move2])
+        except KeyError:
+            raise BattleError("Only a Beyblade's own special moves can be replayed")
+        turn_log = self.battle.execute_turn(move1, move2)
+        self.moves.extend(indices)
+        return turn_log
+
+    def replay(self) -> Replay:
+        return Replay(self.seed, self.beyblades, bytes(self.moves))
+
+class ReplayPlayer:
+    """Re-simulates a replay, rebuilding the battle as it stood after any turn
+
+    Every `keyframe_interval` turns played, the battle is snapshotted, so
+    seeking restores the nearest keyframe at or before the wanted turn and
+    plays fewer than `keyframe_interval` turns from it. Keyframes past the
+    furthest turn reached so far are made on the way there.
+    """
+
+    def __init__(self, replay: Replay, keyframe_interval: int = KEYFRAME_INTERVAL):
+        if keyframe_interval < 1:
+            raise ValueError("keyframe_interval must be at least 1")
+        self.replay = replay
+        self.keyframe_interval = keyframe_interval
+        beyblade1, beyblade2 = (beyblade.clone() for beyblade in replay.beyblades)
+        # Quiet: the battle was counted and saved when it was played
+        self.battle = BeyBattle(beyblade1, beyblade2, rng=random.Random(replay.seed), quiet=True)
+        self._moves = (beyblade1.special_moves, beyblade2.special_moves)
+        # keyframes[i] is the battle after i * keyframe_interval turns
+        self.keyframes: List[tuple] = [self.battle.snapshot()]
+        # Log entries of every turn played so far, to refill the battle log when restoring ahead of it
+        self._turn_logs: List[dict] = []
+        self.turn = 0
+
+    def _step(self) -> dict:
+        if self.turn >= self.replay.turns:
+            raise BattleError("The replay has no more turns")
+        moves = self.replay.moves
+        i = 2 * self.turn
+        turn_log = self.battle.execute_turn(self._moves[0][moves[i]], self._moves[1][moves[i + 1]])
+        if self.turn == len(self._turn_logs):
+            self._turn_logs.append(turn_log)
+        self.turn += 1
+        if self.turn == len(self.keyframes) * self.keyframe_interval:
+            self.keyframes.append(self.battle.snapshot())
+        return turn_log
+
+    def seek(self, turn: int) -> BeyBattle:
+        """The battle after `turn` turns; 0 is the starting position"""
+        if not 0 <= turn <= self.replay.turns:
+            raise ValueError(f"Turn {turn} is outside the replay's {self.replay.turns} turns")
+        keyframe = min(turn // self.keyframe_interval, len(self.keyframes) - 1)
+        keyframe_turn = keyframe * self.keyframe_interval
+        # Playing on from where the battle is beats restoring only when it is between the keyframe and the turn
+        if not keyframe_turn <= self.turn <= turn:
+            self.battle.restore(self.keyframes[keyframe])
+            battle_log = self.battle.battle_log
+            battle_log.extend(self._turn_logs[len(battle_log):keyframe_turn])
+            self.turn = keyframe_turn
+        while self.turn < turn:
+            self._step()
+        return self.battle
+
+    def turn_log(self, turn: int) -> dict:
+        """The battle log entry of a turn, counting from 1; timestamps are those of the re-simulation"""
+        if not 1 <= turn <= self.replay.turns:
+            raise ValueError(f"Turn {turn} is outside the replay's {self.replay.turns} turns")
+        self.seek(turn - 1)
+        return self._step()
+
+    def battle_log(self) -> List[dict]:
+        """The whole battle log, re-simulated"""
+        return self.seek(self.replay.turns).battle_log
+
+def write_archive(f: BinaryIO, replays: Iterable[Replay]) -> int:
+    """Append replays to an archive file as one zlib stream; returns the bytes written
+
+    Each replay is prefixed with its length. Battles between the same
+    Beyblades repeat the same setup bytes, which the compression all but
+    removes, leaving mostly the moves.
+    """
+    compressor = zlib.compressobj()
+    written = 0
+    for replay in replays:
+        data = replay.encode()
+        written += f.write(compressor.compress(_RECORD.pack(len(data)) + data))
+    return written + f.write(compressor.flush())
+
+def read_archive(f: BinaryIO) -> Iterator[Replay]:
+    """Every replay in an archive, over all the streams appended to it"""
+    data = f.read()
+    while data:
+        decompressor = zlib.decompressobj()
+        records = decompressor.decompress(data)
+        data = decompressor.unused_data
+        view = memoryview(records)
+        offset = 0
+        while offset < len(records):
+            length, = _RECORD.unpack_from(records, offset)
+            offset += _RECORD.size
+            yield Replay.decode(view[offset:offset + length])
+            offset += length
+
+def record_battles(beyblade1: Beyblade, beyblade2: Beyblade, battles: int, policy1: str = "computer",
+                   policy2: str = "computer", seed: Optional[int] = None, log_writer=None) -> List[Replay]:
+    """Play seeded battles between copies of two Beyblades and return their replays"""
+    rng = random.Random(seed)
+    choose1, choose2 = POLICIES[policy1], POLICIES[policy2]
+    replays = []
+    for _ in range(battles):
+        recorder = ReplayRecorder(beyblade1.clone(), beyblade2.clone(), rng.getrandbits(64), log_writer)
+        battle = recorder.battle
+        while not battle.is_battle_over():
+            recorder.execute_turn(choose1(battle.beyblade1, battle.beyblade2, rng),
+                                  choose2(battle.beyblade2, battle.beyblade1, rng))
+        replays.append(recorder.replay())
+    return replays
+
+class _LogSizer:
+    """Battle log writer adding up the size of the JSON files save_battle_log would have written"""
+
+    def __init__(self):
+        self.bytes = 0
+
+    def write(self, record: dict) -> None:
+        self.bytes += len(json.dumps(record, indent=2))
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compact seed-plus-moves battle replays")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = subparsers.add_parser("record", help="Play battles between two starter Beyblades into an archive")
+    record_parser.add_argument("archive", help="Replay archive to append to")
+    record_parser.add_argument("--a", required=True, help="First Beyblade (e.g. \"Storm Pegasus\")")
+    record_parser.add_argument("--b", required=True, help="Second Beyblade (e.g. Driger)")
+    record_parser.add_argument("--n", type=int, default=1000, help="Number of battles to record")
+    record_parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducible runs")
+    record_parser.add_argument("--policy-a", choices=sorted(POLICIES), default="computer")
+    record_parser.add_argument("--policy-b", choices=sorted(POLICIES), default="computer")
+
+    show_parser = subparsers.add_parser("show", help="Print a battle from an archive as it stood after a turn")
+    show_parser.add_argument("archive")
+    show_parser.add_argument("--battle", type=int, default=0, help="Position of the battle in the archive")
+    show_parser.add_argument("--turn", type=int, default=None, help="Turns played; the end of the battle by default")
+
+    replay_parser = subparsers.add_parser("replay", help="Re-simulate every battle in an archive")
+    replay_parser.add_argument("archive")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        starters = create_starter_beyblades()
+        beyblade1 = find_starter_beyblade(args.a, starters)
+        beyblade2 = find_starter_beyblade(args.b, starters)
+        for name, beyblade in ((args.a, beyblade1), (args.b, beyblade2)):
+            if beyblade is None:
+                parser.error(f"Unknown Beyblade: {name}. Choose from: {', '.join(b.name for b in starters)}")
+        log = _LogSizer()
+        replays = record_battles(beyblade1, beyblade2, args.n, args.policy_a, args.policy_b, args.seed, log)
+        with open(args.archive, "ab") as f:
+            replay_bytes = write_archive(f, replays)
+        encoded_bytes = sum(len(replay.encode()) for replay in replays)
+        print(f"{len(replays)} replays: {encoded_bytes} bytes encoded ({encoded_bytes / len(replays):.0f} per battle), "
+              f"{replay_bytes} in the archive; the battle log files would take {log.bytes} bytes "
+              f"({log.bytes / encoded_bytes:.1f}x / {log.bytes / replay_bytes:.1f}x)")
+        return 0
+
+    with open(args.archive, "rb") as f:
+        replays = read_archive(f)
+        if args.command == "show":
+            for i, replay in enumerate(replays):
+                if i == args.battle:
+                    break
+            else:
+                parser.error(f"The archive has no battle {args.battle}")
+            turn = replay.turns if args.turn is None else args.turn
+            print(ReplayPlayer(replay).seek(turn).get_battle_status())
+            return 0
+
+        battles = turns = 0
+        start = time.perf_counter()
+        for replay in replays:
+            ReplayPlayer(replay).seek(replay.turns)
+            battles += 1
+            turns += replay.turns
+        elapsed = time.perf_counter() - start
+        print(f"Re-simulated {battles} battles ({turns} turns) in {elapsed:.2f}s "
+              f"({battles / elapsed if elapsed else 0.0:.0f} battles/sec)")
+        return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
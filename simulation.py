@@ -0,0 +1,337 @@
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+import argparse
+import random
+import sys
+import time
+from battle_events import (BattleEventSink, Critical, Damage, Defense, EnvironmentChange, KnockOut, MoveUsed,
+                           TextSink, TurnEnd, TurnStart, active_sink, status)
+from beyblade import Beyblade, SpecialMove, create_starter_beyblades
+from environment import EnvironmentManager
+from metrics import BATTLES_FINISHED, BATTLES_STARTED, CRITICALS, TURNS
+from phase_timers import PhaseTimers
+
+# Same fallback move the battle menu offers when nothing else is available
+BASIC_ATTACK = SpecialMove("Basic Attack", 50, "attack")
+
+# A policy picks a move for `beyblade` against `opponent` using the given RNG
+MovePolicy = Callable[[Beyblade, Beyblade, random.Random], SpecialMove]
+
+def get_available_moves(beyblade: Beyblade) -> List[SpecialMove]:
+    """Get the moves a Beyblade may use this turn"""
+    available_moves = [m for m in beyblade.special_moves if m.move_type == "attack"]
+    if beyblade.defense_count > 0:
+        available_moves.extend([m for m in beyblade.special_moves if m.move_type == "defense"])
+    if not beyblade.critical_used:
+        available_moves.extend([m for m in beyblade.special_moves if m.move_type == "critical"])
+    return available_moves or [BASIC_ATTACK]
+
+def random_policy(beyblade: Beyblade, opponent: Beyblade, rng: random.Random) -> SpecialMove:
+    """Pick any available move uniformly at random"""
+    return rng.choice(get_available_moves(beyblade))
+
+def computer_policy(beyblade: Beyblade, opponent: Beyblade, rng: random.Random) -> SpecialMove:
+    """Pick a move the same way the Computer opponent does in main.py"""
+    available_moves = get_available_moves(beyblade)
+
+    # 30% chance to defend if health is low, 20% chance to use critical if available
+    if beyblade.health < 30 and beyblade.defense_count > 0:
+        defense_moves = [m for m in available_moves if m.move_type == "defense"]
+        if defense_moves:
+            return rng.choice(defense_moves)
+        return rng.choice(available_moves)
+    if not beyblade.critical_used and rng.random() < 0.2:
+        critical_moves = [m for m in available_moves if m.move_type == "critical"]
+        if critical_moves:
+            return rng.choice(critical_moves)
+    return rng.choice(available_moves)
+
+def aggressive_policy(beyblade: Beyblade, opponent: Beyblade, rng: random.Random) -> SpecialMove:
+    """Always use the critical move first, then the strongest attack"""
+    available_moves = get_available_moves(beyblade)
+    critical_moves = [m for m in available_moves if m.move_type == "critical"]
+    if critical_moves:
+        return critical_moves[0]
+    attack_moves = [m for m in available_moves if m.move_type == "attack"] or available_moves
+    return max(attack_moves, key=lambda m: m.power)
+
+POLICIES: Dict[str, MovePolicy] = {
+    "random": random_policy,
+    "computer": computer_policy,
+    "aggressive": aggressive_policy
+}
+
+def resolve_move(attacker: Beyblade, defender: Beyblade, move: SpecialMove,
+                 defender_defending: bool, rng=random, sink: Optional[BattleEventSink] = None, turn: int = 0,
+                 quiet: bool = False) -> dict:
+    """Resolve a single move with the battle loop rules and apply its damage
+
+    Events go to `sink` when one is given; pass it through active_sink() first.
+    Quiet moves (rollouts, replays) are left out of the metrics.
+    """
+    fallback = False
+    if move.move_type == "defense":
+        result = attacker.use_special_move(move, attacker, rng)
+        if 'error' not in result:
+            if sink is not None:
+                sink.emit(MoveUsed(turn, attacker.name, move.name))
+                sink.emit(Defense(turn, attacker.name, move.name, result['defense_remaining']))
+            return {
+                'beyblade': attacker.name,
+                'move': move.name,
+                'defense': True,
+                'defense_remaining': result['defense_remaining']
+            }
+
+        # No defense moves left: fall back to the first attack move
+        attack_moves = [m for m in attacker.special_moves if m.move_type == "attack"]
+        if not attack_moves:
+            if sink is not None:
+                sink.emit(MoveUsed(turn, attacker.name, None))
+            return {'beyblade': attacker.name, 'move': None, 'damage': 0, 'critical': False}
+        move = attack_moves[0]
+        fallback = True
+        defender_defending = False
+
+    result = attacker.use_special_move(move, defender, rng)
+    if sink is not None:
+        sink.emit(MoveUsed(turn, attacker.name, move.name, fallback))
+    if 'error' in result:
+        return {'beyblade': attacker.name, 'move': move.name, 'error': result['error'], 'damage': 0, 'critical': False}
+
+    damage = result['damage']
+    reduction = 0
+    if defender_defending:
+        # Defense reduces the incoming damage by 30%
+        reduction = int(damage * 0.3)
+        damage = max(1, damage - reduction)
+    defender.health -= damage
+    if result['critical'] and not quiet:
+        CRITICALS.inc()
+    if sink is not None:
+        if result['critical']:
+            sink.emit(Critical(turn, attacker.name, move.name))
+        sink.emit(Damage(turn, attacker.name, defender.name, damage, result['damage'], defender_defending))
+
+    return {
+        'beyblade': attacker.name,
+        'move': move.name,
+        'damage': damage,
+        'critical': result['critical'],
+        'reduction': reduction
+    }
+
+def play_turn(beyblade1: Beyblade, beyblade2: Beyblade, move1: SpecialMove, move2: SpecialMove,
+              rng=random, sink: Optional[BattleEventSink] = None, turn: int = 0) -> List[dict]:
+    """Play the moves of one turn, beyblade1 first, and return the resolved actions"""
+    defending1 = move1.move_type == "defense"
+    defending2 = move2.move_type == "defense"
+    sink = active_sink(sink)
+
+    actions = [resolve_move(beyblade1, beyblade2, move1, defending2, rng, sink, turn)]
+    if not beyblade2.is_defeated():
+        actions.append(resolve_move(beyblade2, beyblade1, move2, defending1, rng, sink, turn))
+    return actions
+
+@dataclass
+class BattleResult:
+    winner: int  # 0 if the first Beyblade won, 1 if the second one did
+    turns: int
+
+@dataclass
+class SimulationSummary:
+    beyblade1: str
+    beyblade2: str
+    battles: int = 0
+    wins1: int = 0
+    wins2: int = 0
+    total_turns: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def win_rate1(self) -> float:
+        return self.wins1 / self.battles if self.battles else 0.0
+
+    @property
+    def win_rate2(self) -> float:
+        return self.wins2 / self.battles if self.battles else 0.0
+
+    @property
+    def average_turns(self) -> float:
+        return self.total_turns / self.battles if self.battles else 0.0
+
+    @property
+    def battles_per_second(self) -> float:
+        return self.battles / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self) -> str:
+        return f"{self.beyblade1} vs {self.beyblade2}: {self.battles} battles in {self.elapsed:.2f}s " \
+               f"({self.battles_per_second:.0f} battles/sec)\n" \
+               f"{self.beyblade1} wins: {self.win_rate1:.2%}\n" \
+               f"{self.beyblade2} wins: {self.win_rate2:.2%}\n" \
+               f"Average turns: {self.average_turns:.2f}"
+
+class BattleSimulator:
+    """Plays battles without any terminal I/O using the same turn rules as main.py"""
+
+    def __init__(self, policy1: MovePolicy = computer_policy, policy2: MovePolicy = computer_policy,
+                 seed: Optional[int] = None, use_environment: bool = True, turn_log=None,
+                 sink: Optional[BattleEventSink] = None, timers: Optional[PhaseTimers] = None):
+        self.policy1 = policy1
+        self.policy2 = policy2
+        self.rng = random.Random(seed)
+        self.environment = EnvironmentManager(rng=self.rng) if use_environment else None
+        # Optional turn_log.ColumnarLogWriter receiving every action
+        self.turn_log = turn_log
+        # Optional battle_events sink receiving every battle event
+        self.sink = sink
+        # Optional phase_timers.PhaseTimers; sampled battles run with timed policies and turn phases
+        self.timers = timers if timers is not None and timers.enabled else None
+        self._timed = None
+        if self.timers is not None:
+            check_for_event = self.environment.check_for_event if self.environment is not None else None
+            self._timed = (
+                self.timers.wrap("choose_move", policy1),
+                self.timers.wrap("choose_move", policy2),
+                self.timers.wrap("check_for_event", check_for_event) if check_for_event else None,
+                self.timers.wrap("play_turn", play_turn)
+            )
+        self.battles_played = 0
+
+    def run_battle(self, beyblade1: Beyblade, beyblade2: Beyblade) -> BattleResult:
+        """Play a full battle between fresh copies of two Beyblades"""
+        beyblade1 = beyblade1.clone()
+        beyblade2 = beyblade2.clone()
+        rng = self.rng
+        environment = self.environment
+        sink = active_sink(self.sink)
+        check_for_event = None
+        if environment is not None:
+            environment.current_event = None
+            environment.event_duration = 0
+            check_for_event = environment.check_for_event
+        if self.timers is not None and self.timers.sample():
+            policy1, policy2, check_for_event, play = self._timed
+        else:
+            policy1, policy2, play = self.policy1, self.policy2, play_turn
+        BATTLES_STARTED.inc()
+
+        turns = 0
+        while not beyblade1.is_defeated() and not beyblade2.is_defeated():
+            turns += 1
+            if sink is not None:
+                sink.emit(TurnStart(turns))
+            # Events are rolled like in the interactive loop, which does not apply their effects
+            if check_for_event is not None:
+                event = check_for_event()
+                if event is not None and sink is not None:
+                    sink.emit(EnvironmentChange(turns, event))
+
+            beyblade1.start_turn()
+            beyblade2.start_turn()
+            move1 = policy1(beyblade1, beyblade2, rng)
+            move2 = policy2(beyblade2, beyblade1, rng)
+            actions = play(beyblade1, beyblade2, move1, move2, rng, sink, turns)
+            if self.turn_log is not None:
+                self.turn_log.append_actions(self.battles_played, turns, actions, (beyblade1, beyblade2))
+            if sink is not None:
+                sink.emit(TurnEnd(turns, (status(beyblade1.name, beyblade1), status(beyblade2.name, beyblade2))))
+
+        self.battles_played += 1
+        # Counted per battle rather than per turn to stay off the turn loop
+        TURNS.inc(turns)
+        BATTLES_FINISHED.inc()
+        winner = 1 if beyblade1.is_defeated() else 0
+        if sink is not None:
+            names = (beyblade1.name, beyblade2.name)
+            sink.emit(KnockOut(turns, names[winner], names[1 - winner], winner))
+        return BattleResult(winner=winner, turns=turns)
+
+    def run_many(self, beyblade1: Beyblade, beyblade2: Beyblade, battles: int) -> SimulationSummary:
+        """Play a number of battles between two Beyblades and summarize the results"""
+        summary = SimulationSummary(beyblade1.name, beyblade2.name)
+        start = time.perf_counter()
+        for _ in range(battles):
+            result = self.run_battle(beyblade1, beyblade2)
+            summary.battles += 1
+            summary.total_turns += result.turns
+            if result.winner == 0:
+                summary.wins1 += 1
+            else:
+                summary.wins2 += 1
+        summary.elapsed = time.perf_counter() - start
+        return summary
+
+def find_starter_beyblade(name: str, beyblades: List[Beyblade]) -> Optional[Beyblade]:
+    """Find a starter Beyblade by its name or class name"""
+    wanted = name.strip().lower()
+    for beyblade in beyblades:
+        if wanted in (beyblade.name.lower(), type(beyblade).__name__.lower()):
+            return beyblade
+    return None
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Headless Beyblade battle simulator")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    simulate_parser = subparsers.add_parser("simulate", help="Run many battles between two starter Beyblades")
+    simulate_parser.add_argument("--a", required=True, help="First Beyblade (e.g. \"Storm Pegasus\")")
+    simulate_parser.add_argument("--b", required=True, help="Second Beyblade (e.g. Driger)")
+    simulate_parser.add_argument("--n", type=int, default=10000, help="Number of battles to run")
+    simulate_parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducible runs")
+    simulate_parser.add_argument("--policy-a", choices=sorted(POLICIES), default="computer")
+    simulate_parser.add_argument("--policy-b", choices=sorted(POLICIES), default="computer")
+    simulate_parser.add_argument("--no-environment", action="store_true", help="Disable environmental events")
+    simulate_parser.add_argument("--engine", choices=["scalar", "vector"], default="scalar",
+                                 help="Play battles one by one or in NumPy batches")
+    simulate_parser.add_argument("--turn-log", default=None, help="Write every turn to a columnar turn log")
+    simulate_parser.add_argument("--narrate", action="store_true", help="Print every battle, turn by turn")
+    simulate_parser.add_argument("--timings", nargs="?", const="", default=None, metavar="REPORT",
+                                 help="Time the turn phases of one battle in --timings-every; "
+                                      "also write the JSON report to REPORT if given")
+    simulate_parser.add_argument("--timings-every", type=int, default=32, help="Battles per timed battle")
+
+    args = parser.parse_args(argv)
+
+    starters = create_starter_beyblades()
+    beyblade1 = find_starter_beyblade(args.a, starters)
+    beyblade2 = find_starter_beyblade(args.b, starters)
+    for name, beyblade in ((args.a, beyblade1), (args.b, beyblade2)):
+        if beyblade is None:
+            parser.error(f"Unknown Beyblade: {name}. Choose from: {', '.join(b.name for b in starters)}")
+
+    if args.engine == "vector":
+        if args.narrate or args.timings is not None or args.turn_log:
+            parser.error("--narrate, --timings and --turn-log need the scalar engine")
+        # Environmental events have no effect on the stats, so the batch engine skips them
+        from batch_engine import BatchBattleEngine
+        engine = BatchBattleEngine(beyblade1, beyblade2, args.policy_a, args.policy_b, seed=args.seed)
+        print(engine.run_many(args.n))
+        return 0
+
+    turn_log = None
+    if args.turn_log:
+        from turn_log import ColumnarLogWriter
+        turn_log = ColumnarLogWriter(args.turn_log)
+
+    timers = PhaseTimers(sample_every=args.timings_every) if args.timings is not None else None
+    simulator = BattleSimulator(
+        policy1=POLICIES[args.policy_a],
+        policy2=POLICIES[args.policy_b],
+        seed=args.seed,
+        use_environment=not args.no_environment,
+        turn_log=turn_log,
+        sink=TextSink(per="battle") if args.narrate else None,
+        timers=timers
+    )
+    print(simulator.run_many(beyblade1, beyblade2, args.n))
+    if timers is not None:
+        print(timers.format_report())
+        if args.timings:
+            timers.write_report(args.timings)
+    if turn_log is not None:
+        turn_log.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,280 @@
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+import argparse
+import sys
+import time
+from beyblade import Beyblade, SpecialMove, create_starter_beyblades
+from simulation import get_available_moves, find_starter_beyblade
+
+# Chance of the extra critical hit rolled in Beyblade.use_special_move
+CRITICAL_CHANCE = 0.3
+
+class BattleState(NamedTuple):
+    """Battle state at the start of a turn, before start_turn is applied"""
+    health1: int
+    stamina1: int
+    spin_speed1: int
+    defense_count1: int
+    critical_used1: bool
+    health2: int
+    stamina2: int
+    spin_speed2: int
+    defense_count2: int
+    critical_used2: bool
+
+    def is_terminal(self) -> bool:
+        return self.health1 <= 0 or self.spin_speed1 <= 0 or self.health2 <= 0 or self.spin_speed2 <= 0
+
+    @classmethod
+    def from_beyblades(cls, beyblade1: Beyblade, beyblade2: Beyblade) -> 'BattleState':
+        return cls(
+            beyblade1.health, beyblade1.stamina, beyblade1.spin_speed, beyblade1.defense_count, beyblade1.critical_used,
+            beyblade2.health, beyblade2.stamina, beyblade2.spin_speed, beyblade2.defense_count, beyblade2.critical_used
+        )
+
+# A move distribution lists (move, probability) pairs for a Beyblade this turn
+MoveDistribution = Callable[[Beyblade], List[Tuple[SpecialMove, float]]]
+
+def _uniform(moves: List[SpecialMove], weight: float = 1.0) -> List[Tuple[SpecialMove, float]]:
+    return [(move, weight / len(moves)) for move in moves]
+
+def random_distribution(beyblade: Beyblade) -> List[Tuple[SpecialMove, float]]:
+    """Move probabilities of simulation.random_policy"""
+    return _uniform(get_available_moves(beyblade))
+
+def computer_distribution(beyblade: Beyblade) -> List[Tuple[SpecialMove, float]]:
+    """Move probabilities of simulation.computer_policy"""
+    available_moves = get_available_moves(beyblade)
+    if beyblade.health < 30 and beyblade.defense_count > 0:
+        defense_moves = [m for m in available_moves if m.move_type == "defense"]
+        return _uniform(defense_moves or available_moves)
+    critical_moves = [m for m in available_moves if m.move_type == "critical"]
+    if critical_moves:
+        return _uniform(critical_moves, 0.2) + _uniform(available_moves, 0.8)
+    return _uniform(available_moves)
+
+def aggressive_distribution(beyblade: Beyblade) -> List[Tuple[SpecialMove, float]]:
+    """Move probabilities of simulation.aggressive_policy"""
+    available_moves = get_available_moves(beyblade)
+    critical_moves = [m for m in available_moves if m.move_type == "critical"]
+    if critical_moves:
+        return [(critical_moves[0], 1.0)]
+    attack_moves = [m for m in available_moves if m.move_type == "attack"] or available_moves
+    return [(max(attack_moves, key=lambda m: m.power), 1.0)]
+
+DISTRIBUTIONS: Dict[str, MoveDistribution] = {
+    "random": random_distribution,
+    "computer": computer_distribution,
+    "aggressive": aggressive_distribution
+}
+
+class _FixedRoll:
+    """Stands in for the RNG so each critical roll can be forced either way"""
+
+    def __init__(self, rolls: Tuple[bool, ...]):
+        self.rolls = rolls
+        self.used = 0
+
+    def random(self) -> float:
+        critical = self.rolls[self.used] if self.used < len(self.rolls) else False
+        self.used += 1
+        return 0.0 if critical else 1.0
+
+def _start_turn(stamina: int, spin_speed: int) -> Tuple[int, int]:
+    """Beyblade.start_turn on plain numbers"""
+    stamina = max(0, stamina - 5)
+    spin_speed = max(0, spin_speed - 3)
+    if stamina < 30:
+        spin_speed = max(0, spin_speed - 5)
+    return stamina, spin_speed
+
+class BattleSolver:
+    """Exact win probabilities by memoized dynamic programming over BattleState
+
+    `values` holds the solved non-terminal states. Inside the solve, states
+    are plain tuples, which hash and compare equal to BattleStates.
+    """
+
+    def __init__(self, beyblade1: Beyblade, beyblade2: Beyblade,
+                 policy1: str = "computer", policy2: str = "computer"):
+        self.beyblades = (beyblade1, beyblade2)
+        self.distributions = (DISTRIBUTIONS[policy1], DISTRIBUTIONS[policy2])
+        # Probability that beyblade1 wins from each solved state
+        self.values: Dict[BattleState, float] = {}
+        # Bounded by the matchup: 16 policy threshold keys, and one key per side, move and spin speed
+        self._move_cache: Dict[tuple, List[Tuple[SpecialMove, float]]] = {}
+        self._damage_cache: Dict[tuple, List[Tuple[int, float]]] = {}
+
+    def initial_state(self) -> BattleState:
+        return BattleState.from_beyblades(*self.beyblades)
+
+    def move_distribution(self, side: int, health: int, defense_count: int, critical_used: bool) -> List[Tuple[SpecialMove, float]]:
+        """Move distribution of one side; the shipped policies only look at these thresholds"""
+        key = (side, health < 30, defense_count > 0, critical_used)
+        moves = self._move_cache.get(key)
+        if moves is None:
+            beyblade = self.beyblades[side].clone()
+            beyblade.health, beyblade.defense_count, beyblade.critical_used = health, defense_count, critical_used
+            merged: Dict[int, list] = {}
+            for move, probability in self.distributions[side](beyblade):
+                merged.setdefault(id(move), [move, 0.0])[1] += probability
+            moves = self._move_cache[key] = [(move, probability) for move, probability in merged.values()]
+        return moves
+
+    def _damage(self, side: int, move: SpecialMove, spin_speed: int) -> List[Tuple[int, float]]:
+        """Damage outcomes of an attack, computed once with Beyblade.use_special_move"""
+        key = (side, id(move), spin_speed)
+        outcomes = self._damage_cache.get(key)
+        if outcomes is None:
+            outcomes = []
+            for rolls, probability in (((False,), 1 - CRITICAL_CHANCE), ((True,), CRITICAL_CHANCE)):
+                attacker = self.beyblades[side].clone()
+                attacker.spin_speed = spin_speed
+                attacker.critical_used = False
+                rng = _FixedRoll(rolls)
+                result = attacker.use_special_move(move, self.beyblades[1 - side], rng)
+                if not rng.used:
+                    outcomes = [(result['damage'], 1.0)]
+                    break
+                outcomes.append((result['damage'], probability))
+            self._damage_cache[key] = outcomes
+        return outcomes
+
+    def _act(self, side: int, move: SpecialMove, spin_speed: int, defense_count: int, critical_used: bool,
+             defender_health: int, defender_defending: bool) -> List[Tuple[int, int, bool, float]]:
+        """simulation.resolve_move as (defender health, defense_count, critical_used, probability) outcomes"""
+        if move.move_type == "defense":
+            if defense_count > 0:
+                return [(defender_health, defense_count - 1, critical_used, 1.0)]
+            attack_moves = [m for m in self.beyblades[side].special_moves if m.move_type == "attack"]
+            if not attack_moves:
+                return [(defender_health, defense_count, critical_used, 1.0)]
+            move = attack_moves[0]
+            defender_defending = False
+        if move.move_type == "critical":
+            if critical_used:
+                return [(defender_health, defense_count, critical_used, 1.0)]
+            critical_used = True
+
+        outcomes = []
+        for damage, probability in self._damage(side, move, spin_speed):
+            if defender_defending:
+                damage = max(1, damage - int(damage * 0.3))
+            outcomes.append((defender_health - damage, defense_count, critical_used, probability))
+        return outcomes
+
+    def _turn(self, state: tuple, move1: SpecialMove, move2: SpecialMove, acts: dict,
+              weight: float, into: Dict[tuple, float]) -> None:
+        """Add the states one turn leads to, times `weight`, to `into`
+
+        `state` is taken after start_turn; `acts` caches _act outcomes for it.
+        """
+        health1, stamina1, spin1, defense1, critical1, health2, stamina2, spin2, defense2, critical2 = state
+        defending1 = move1.move_type == "defense"
+        defending2 = move2.move_type == "defense"
+        key = (0, id(move1), defending2)
+        outcomes1 = acts.get(key)
+        if outcomes1 is None:
+            outcomes1 = acts[key] = self._act(0, move1, spin1, defense1, critical1, health2, defending2)
+        outcomes2 = None
+        for new_health2, new_defense1, new_critical1, q1 in outcomes1:
+            if new_health2 <= 0 or spin2 <= 0:
+                next_state = (health1, stamina1, spin1, new_defense1, new_critical1,
+                              new_health2, stamina2, spin2, defense2, critical2)
+                into[next_state] = into.get(next_state, 0.0) + weight * q1
+                continue
+            if outcomes2 is None:
+                key = (1, id(move2), defending1)
+                outcomes2 = acts.get(key)
+                if outcomes2 is None:
+                    outcomes2 = acts[key] = self._act(1, move2, spin2, defense2, critical2, health1, defending1)
+            for new_health1, new_defense2, new_critical2, q2 in outcomes2:
+                next_state = (new_health1, stamina1, spin1, new_defense1, new_critical1,
+                              new_health2, stamina2, spin2, new_defense2, new_critical2)
+                into[next_state] = into.get(next_state, 0.0) + weight * q1 * q2
+
+    @staticmethod
+    def _after_start_turn(state: tuple) -> tuple:
+        health1, stamina1, spin1, defense1, critical1, health2, stamina2, spin2, defense2, critical2 = state
+        return (health1, *_start_turn(stamina1, spin1), defense1, critical1,
+                health2, *_start_turn(stamina2, spin2), defense2, critical2)
+
+    def transitions(self, state: BattleState, move1: SpecialMove, move2: SpecialMove,
+                    start_turn: bool = True) -> List[Tuple[BattleState, float]]:
+        """States reachable after one turn with the given moves, with their probabilities
+
+        Pass start_turn=False when the state was taken after start_turn already ran.
+        """
+        outcomes: Dict[tuple, float] = {}
+        self._turn(self._after_start_turn(state) if start_turn else state, move1, move2, {}, 1.0, outcomes)
+        return [(BattleState._make(next_state), p) for next_state, p in outcomes.items()]
+
+    def _successors(self, state: tuple) -> Dict[tuple, float]:
+        successors: Dict[tuple, float] = {}
+        after_start = self._after_start_turn(state)
+        acts: dict = {}
+        # Moves only depend on health and counters, which start_turn leaves alone
+        moves2 = self.move_distribution(1, state[5], state[8], state[9])
+        for move1, p1 in self.move_distribution(0, state[0], state[3], state[4]):
+            for move2, p2 in moves2:
+                self._turn(after_start, move1, move2, acts, p1 * p2, successors)
+        return successors
+
+    def successors(self, state: BattleState) -> List[Tuple[BattleState, float]]:
+        """States reachable after one turn under both move policies, with their probabilities"""
+        return [(BattleState._make(next_state), p) for next_state, p in self._successors(state).items()]
+
+    def value(self, state: BattleState) -> float:
+        """Probability that beyblade1 wins from the given state"""
+        health1, _, spin1, _, _, health2, _, spin2, _, _ = state
+        if health1 <= 0 or spin1 <= 0:
+            return 0.0
+        if health2 <= 0 or spin2 <= 0:
+            return 1.0
+        cached = self.values.get(state)
+        if cached is not None:
+            return cached
+
+        values = self.values
+        result = 0.0
+        for next_state, p in self._successors(state).items():
+            # Ended battles and solved states inline, without a call
+            if next_state[0] <= 0 or next_state[2] <= 0:
+                continue
+            if next_state[5] <= 0 or next_state[7] <= 0:
+                result += p
+                continue
+            next_value = values.get(next_state)
+            result += p * (self.value(next_state) if next_value is None else next_value)
+        values[state] = result
+        return result
+
+    def win_probability(self, state: Optional[BattleState] = None) -> float:
+        """Probability that beyblade1 wins, from the start of the battle by default"""
+        return self.value(state or self.initial_state())
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Exact win probabilities for a starter matchup")
+    parser.add_argument("--a", required=True, help="First Beyblade (e.g. \"Storm Pegasus\")")
+    parser.add_argument("--b", required=True, help="Second Beyblade (e.g. Driger)")
+    parser.add_argument("--policy-a", choices=sorted(DISTRIBUTIONS), default="computer")
+    parser.add_argument("--policy-b", choices=sorted(DISTRIBUTIONS), default="computer")
+    args = parser.parse_args(argv)
+
+    starters = create_starter_beyblades()
+    beyblade1 = find_starter_beyblade(args.a, starters)
+    beyblade2 = find_starter_beyblade(args.b, starters)
+    for name, beyblade in ((args.a, beyblade1), (args.b, beyblade2)):
+        if beyblade is None:
+            parser.error(f"Unknown Beyblade: {name}. Choose from: {', '.join(b.name for b in starters)}")
+
+    start = time.perf_counter()
+    solver = BattleSolver(beyblade1, beyblade2, args.policy_a, args.policy_b)
+    probability = solver.win_probability()
+    elapsed = time.perf_counter() - start
+    print(f"{beyblade1.name} wins: {probability:.6%}")
+    print(f"{beyblade2.name} wins: {1 - probability:.6%}")
+    print(f"Solved {len(solver.values)} states in {elapsed * 1000:.1f} ms")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+import random
+import time
+from ai import ComputerAI, pack_state
+from beyblade import create_starter_beyblades
+from simulation import play_turn, random_policy
+from solver import BattleState
+
+def test_decisions_stay_within_budget():
+    print("Timing Computer decisions...")
+    starters = create_starter_beyblades()
+    rng = random.Random(1)
+    ai = ComputerAI(time_budget=0.005, table_size=2000)
+    slowest = 0.0
+    for _ in range(40):
+        player, computer = starters[rng.randrange(8)].clone(), starters[rng.randrange(8)].clone()
+        while not player.is_defeated() and not computer.is_defeated():
+            player.start_turn()
+            computer.start_turn()
+            # CPU time, so a busy machine preempting the test does not count against the search
+            start = time.process_time()
+            move = ai.choose_move(computer, player)
+            slowest = max(slowest, time.process_time() - start)
+            assert move in computer.special_moves
+            assert len(ai.table) <= 2000
+            play_turn(player, computer, random_policy(player, computer, rng), move, rng)
+    print(f"Slowest decision: {slowest * 1000:.2f} ms CPU")
+    assert slowest < 0.005 + 0.002
+
+def test_table_evicts_least_recently_used():
+    print("Evicting from the transposition table...")
+    starters = create_starter_beyblades()
+    ai = ComputerAI(table_size=2)
+    player, computer = starters[1].clone(), starters[7].clone()
+    matchup, rules = ai._rules_for(player, computer, 1)
+    hot_state = BattleState.from_beyblades(player, computer)
+    hot = (matchup << 48) | pack_state(hot_state)
+    cold = -1
+    ai.table[hot] = (5, 0.25)
+    ai.table[cold] = (5, 0.75)
+    # A hit makes `hot` the most recently used, so the next new entry evicts `cold` even though it is newer
+    deadline = time.perf_counter() + 60
+    assert ai._value(rules, matchup, hot_state, 1, 1, deadline) == 0.25
+    ai._value(rules, matchup, hot_state._replace(health1=50), 1, 1, deadline)
+    assert len(ai.table) == 2 and hot in ai.table and cold not in ai.table
+
+def test_rules_evict_least_recently_used():
+    print("Evicting matchup rules...")
+    starters = create_starter_beyblades()
+    ai = ComputerAI(rules_size=2)
+    first = ai._rules_for(starters[0], starters[1], 1)
+    ai._rules_for(starters[2], starters[3], 1)
+    # Using the first matchup again makes the second the one to go
+    assert ai._rules_for(starters[0], starters[1], 1) is first
+    third = ai._rules_for(starters[4], starters[5], 1)
+    assert len(ai.rules) == 2 and ai._rules_for(starters[0], starters[1], 1) is first
+    assert ai._rules_for(starters[2], starters[3], 1)[0] not in (first[0], third[0])
+
+if __name__ == "__main__":
+    test_decisions_stay_within_budget()
+    test_table_evicts_least_recently_used()
+    test_rules_evict_least_recently_used()
+    print("Test complete!")
@@ -0,0 +1,61 @@
+import os
+import random
+import tempfile
+from battle import BeyBattle
+from beyblade import create_starter_beyblade
+from metrics import REGISTRY
+from simulation import random_policy
+
+def play_out(battle: BeyBattle, seed: int) -> tuple:
+    """Play a battle to its end with seeded random moves and return where it ended"""
+    rng = random.Random(seed)
+    while not battle.is_battle_over():
+        battle.execute_turn(random_policy(battle.beyblade1, battle.beyblade2, rng),
+                            random_policy(battle.beyblade2, battle.beyblade1, rng))
+    return (battle.beyblade1.get_state(), battle.beyblade2.get_state(), battle.current_turn, battle.winner.name,
+            len(battle.battle_log))
+
+def test_snapshot_restore_rollouts():
+    print("Rolling out a quiet battle from a snapshot...")
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            before = REGISTRY.collect()
+            battle = BeyBattle(create_starter_beyblade("Storm Pegasus"), create_starter_beyblade("Driger"),
+                               rng=random.Random(4), quiet=True)
+            snapshot = battle.snapshot()
+            results = []
+            for _ in range(3):
+                results.append(play_out(battle, 7))
+                battle.restore(snapshot)
+            assert results[0] == results[1] == results[2]
+            assert battle.snapshot() == snapshot and battle.winner is None and battle.battle_log == []
+            # No battle log files, no metrics
+            assert os.listdir(directory) == []
+            assert REGISTRY.collect() == before
+        finally:
+            os.chdir(cwd)
+
+def test_battle_end_is_saved_once():
+    print("Saving a battle that was rolled out quietly...")
+    records = []
+
+    class Writer:
+        def write(self, record: dict) -> None:
+            records.append(record)
+
+    battle = BeyBattle(create_starter_beyblade("Storm Pegasus"), create_starter_beyblade("Driger"), Writer(),
+                       random.Random(4))
+    snapshot = battle.snapshot()
+    battle.quiet = True
+    rollout = play_out(battle, 7)
+    battle.restore(snapshot)
+    battle.quiet = False
+    assert play_out(battle, 7) == rollout
+    assert len(records) == 1 and records[0]['total_turns'] == rollout[2] - 1
+
+if __name__ == "__main__":
+    test_snapshot_restore_rollouts()
+    test_battle_end_is_saved_once()
+    print("Test complete!")
@@ -0,0 +1,80 @@
+import os
+import tempfile
+import time
+from battle_log import JsonlLogWriter, read_battle_logs
+from utils import BattleError
+
+class FailingFile:
+    """Writes half of what it is given, then fails like a full disk"""
+
+    def __init__(self, file):
+        self.file = file
+
+    def write(self, data: bytes) -> None:
+        self.file.write(data[:len(data) // 2])
+        self.file.flush()
+        raise OSError("No space left on device")
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.file.close()
+
+def test_failed_write_keeps_records():
+    print("Retrying a failed battle log write...")
+    with tempfile.TemporaryDirectory() as directory:
+        writer = JsonlLogWriter(directory, flush_interval=3600, compression=None)
+        writer.write({"battle": 0})
+        writer.flush()
+        writer._segment_file = FailingFile(writer._segment_file)
+        for battle in (1, 2):
+            writer.write({"battle": battle})
+        try:
+            writer.flush()
+        except BattleError:
+            pass
+        else:
+            raise AssertionError("The failed write was not reported")
+        # The half-written records were cut off and are written again in full
+        writer.flush()
+        writer.close()
+        assert [record["battle"] for record in read_battle_logs(directory)] == [0, 1, 2]
+
+def test_idle_writer_flushes():
+    print("Flushing an idle battle log writer...")
+    with tempfile.TemporaryDirectory() as directory:
+        writer = JsonlLogWriter(directory, flush_interval=0.05)
+        writer.write({"battle": 0})
+        deadline = time.monotonic() + 10
+        while not list(read_battle_logs(directory)) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert list(read_battle_logs(directory)) == [{"battle": 0}]
+        writer.close()
+
+def test_segments_compress_outside_the_lock():
+    print("Compressing battle log segments...")
+    with tempfile.TemporaryDirectory() as directory:
+        writer = JsonlLogWriter(directory, flush_bytes=1, flush_interval=0, segment_bytes=200)
+        compressed = []
+        compress = writer._compress
+
+        def check_compress(path):
+            if path is not None:
+                assert not writer._lock.locked()
+                compressed.append(path)
+            compress(path)
+
+        writer._compress = check_compress
+        for battle in range(100):
+            writer.write({"battle": battle, "log": "x" * 20})
+        writer.close()
+        assert len(compressed) > 5
+        assert all(name.endswith(".jsonl.gz") for name in os.listdir(directory))
+        assert [record["battle"] for record in read_battle_logs(directory)] == list(range(100))
+
+if __name__ == "__main__":
+    test_failed_write_keeps_records()
+    test_idle_writer_flushes()
+    test_segments_compress_outside_the_lock()
+    print("Test complete!")
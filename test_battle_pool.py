@@ -0,0 +1,62 @@
+import random
+from battle_pool import BattlePool
+from beyblade import create_beyblade_from_data, create_starter_beyblade
+from simulation import play_turn, random_policy
+from utils import BattleError
+
+def custom_build(i: int) -> dict:
+    return {"name": f"Custom {i}", "type": "Attack", "power": 60, "defense": 40,
+            "special_moves": {"attack_moves": [{"name": "Spin Strike", "power": 30, "move_type": "attack"}]}}
+
+def test_pool_plays_like_objects():
+    print("Playing battles through the pool...")
+    rng = random.Random(3)
+    pool = BattlePool()
+    kept = {}
+    for seed in range(50):
+        pair = (create_starter_beyblade("Storm Pegasus"), create_starter_beyblade("Driger"))
+        kept[pool.add(*pair)] = pair
+    for _ in range(10):
+        for battle, (beyblade1, beyblade2) in kept.items():
+            if beyblade1.is_defeated() or beyblade2.is_defeated():
+                continue
+            moves = (random_policy(beyblade1, beyblade2, rng), random_policy(beyblade2, beyblade1, rng))
+            # The same turn played on the kept pair and on a pair loaded from the pool
+            pooled1, pooled2 = pool.load(battle)
+            for pair in ((beyblade1, beyblade2), (pooled1, pooled2)):
+                for beyblade in pair:
+                    beyblade.start_turn()
+                play_turn(*pair, *moves, random.Random(battle))
+            pool.store(battle, pooled1, pooled2)
+    for battle, (beyblade1, beyblade2) in kept.items():
+        pooled1, pooled2 = pool.load(battle)
+        assert (pooled1.get_state(), pooled2.get_state()) == (beyblade1.get_state(), beyblade2.get_state())
+        assert pooled1.definition is beyblade1.definition
+    assert len(pool) == 50 and len([kind for kind in pool.kinds if kind]) == 2
+
+def test_removed_battles_release_their_kinds():
+    print("Cycling custom Beyblades through the pool...")
+    pool = BattlePool()
+    starter = create_starter_beyblade("Dranzer")
+    live = []
+    # More distinct kinds than a 16-bit id could number, but only a few alive at once
+    for i in range(40000):
+        live.append(pool.add(create_beyblade_from_data(custom_build(i)), starter))
+        if len(live) > 8:
+            pool.remove(live.pop(0))
+    assert len(pool) == 8 and len(pool.kinds) <= 10
+    assert pool.load(live[-1])[0].name == "Custom 39999"
+    for battle in live:
+        pool.remove(battle)
+    assert pool.kinds == [None] * len(pool.kinds) and not pool._kind_ids
+    try:
+        pool.load(live[0])
+    except BattleError:
+        pass
+    else:
+        raise AssertionError("A removed battle was loaded")
+
+if __name__ == "__main__":
+    test_pool_plays_like_objects()
+    test_removed_battles_release_their_kinds()
+    print("Test complete!")
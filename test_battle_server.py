@@ -0,0 +1,113 @@
+import asyncio
+import json
+import os
+import tempfile
+from battle_server import BattleServer, server_player_manager
+from player import PlayerManager
+from player_store import SqlitePlayerStore
+
+class Client:
+    """A scripted client speaking the server's newline-delimited JSON"""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    async def connect(self, port: int) -> None:
+        self.reader, self.writer = await asyncio.open_connection("127.0.0.1", port)
+        await self.send({"type": "login", "name": self.name})
+        assert (await self.receive())["type"] == "welcome"
+
+    async def send(self, message: dict) -> None:
+        self.writer.write((json.dumps(message) + "\n").encode("utf-8"))
+        await self.writer.drain()
+
+    async def receive(self) -> dict:
+        message = json.loads(await self.reader.readline())
+        assert message["type"] != "error", message
+        return message
+
+    async def play(self, mode: str, beyblade: str, leave_at_turn: int = 0) -> dict:
+        """Play one battle picking the first move each turn; returns battle_end, or None after leaving"""
+        await self.send({"type": "play", "mode": mode, "beyblade": beyblade})
+        while True:
+            message = await self.receive()
+            if message["type"] == "choose_move":
+                if message["turn"] == leave_at_turn:
+                    self.writer.close()
+                    return None
+                await self.send({"type": "move", "move": 1})
+            elif message["type"] == "battle_end":
+                return message
+
+    async def quit(self) -> None:
+        await self.send({"type": "quit"})
+        self.writer.close()
+
+def play(path: str, script) -> None:
+    """Run a server on a free port, play `script(port)` against it and shut it down"""
+    async def run() -> None:
+        player_manager = server_player_manager(path)
+        server = BattleServer(player_manager, port=0, seed=3, poll_interval=0.05)
+        await server.start()
+        try:
+            await asyncio.wait_for(script(server.port), 60)
+        finally:
+            await server.close()
+            player_manager.close()
+
+    asyncio.run(run())
+
+def records(path: str) -> dict:
+    """Wins and losses as saved in the players database"""
+    manager = PlayerManager(path, store=SqlitePlayerStore(path))
+    try:
+        return {name: (player.wins, player.losses) for name, player in manager.players.items()}
+    finally:
+        manager.close()
+
+def test_computer_and_pvp_battles():
+    print("Playing battles through the server...")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "players.db")
+        ends = {}
+
+        async def script(port: int) -> None:
+            ann, bob, cat = Client("ann"), Client("bob"), Client("cat")
+            for client in (ann, bob, cat):
+                await client.connect(port)
+            ends["ann"] = await ann.play("computer", "Storm Pegasus")
+            ends["bob"], ends["cat"] = await asyncio.gather(bob.play("pvp", "Driger"), cat.play("pvp", "Dranzer"))
+            for client in (ann, bob, cat):
+                await client.quit()
+
+        play(path, script)
+        assert ends["ann"]["winner"] in ("ann", "Computer") and not ends["ann"]["forfeit"]
+        assert ends["bob"]["winner"] == ends["cat"]["winner"] in ("bob", "cat")
+        assert ends["bob"]["you_won"] != ends["cat"]["you_won"] and ends["bob"]["turns"] == ends["cat"]["turns"]
+        saved = records(path)
+        for name in ("ann", "bob", "cat"):
+            assert saved[name] == ((1, 0) if ends[name]["you_won"] else (0, 1))
+
+def test_disconnecting_forfeits():
+    print("Leaving a battle halfway...")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "players.db")
+        ends = {}
+
+        async def script(port: int) -> None:
+            dan, eve = Client("dan"), Client("eve")
+            await dan.connect(port)
+            await eve.connect(port)
+            ends["dan"], ends["eve"] = await asyncio.gather(dan.play("pvp", "Driger", leave_at_turn=2),
+                                                            eve.play("pvp", "Dranzer"))
+            await eve.quit()
+
+        play(path, script)
+        assert ends["dan"] is None
+        assert ends["eve"]["forfeit"] and ends["eve"]["you_won"] and ends["eve"]["winner"] == "eve"
+        assert records(path) == {"dan": (0, 1), "eve": (1, 0)}
+
+if __name__ == "__main__":
+    test_computer_and_pvp_battles()
+    test_disconnecting_forfeits()
+    print("Test complete!")
@@ -0,0 +1,81 @@
+import os
+import random
+import tempfile
+from beyblade import create_starter_beyblade
+from checkpoints import Checkpoint, CheckpointStore, decode_checkpoint, encode_checkpoint, slot_file_name
+from checkpoints import slot_from_file_name
+from environment import EnvironmentManager
+
+SLOT_NAMES = ["al", "Al", "AL", "O'Neil", "Ali!", "-x", "a b", "_41", "..", "Çağrı", "ドランザー", "🌀" * 20]
+
+def test_slot_file_names():
+    print("Encoding slot names as file names...")
+    file_names = [slot_file_name(slot) for slot in SLOT_NAMES]
+    for slot, name in zip(SLOT_NAMES, file_names):
+        assert slot_from_file_name(name) == slot
+        assert name == name.lower() and "/" not in name and not name.startswith(".")
+    # Distinct even where the file system ignores case
+    assert len({name.lower() for name in file_names}) == len(SLOT_NAMES)
+    for bad in ["", "x" * 300]:
+        try:
+            slot_file_name(bad)
+        except ValueError:
+            continue
+        raise AssertionError(f"{bad!r} was accepted")
+    for bad in ["index.json", "AB.ckpt", "_4.ckpt", "_zz.ckpt"]:
+        try:
+            slot_from_file_name(bad)
+        except ValueError:
+            continue
+        raise AssertionError(f"{bad!r} was accepted")
+
+def play_turn_start(beyblades, environment, rng) -> tuple:
+    """What a turn does before the moves: the event roll, start_turn and commentary draws"""
+    event = environment.check_for_event()
+    for beyblade in beyblades:
+        beyblade.start_turn()
+    return (event, environment.event_duration, tuple(beyblade.get_state() for beyblade in beyblades), rng.random())
+
+def test_store_round_trip_and_resume():
+    print("Saving and resuming checkpoint slots...")
+    with tempfile.TemporaryDirectory() as directory:
+        rng = random.Random(5)
+        environment = EnvironmentManager(rng=rng)
+        beyblades = (create_starter_beyblade("Storm Pegasus"), create_starter_beyblade("Driger"))
+        for _ in range(3):
+            play_turn_start(beyblades, environment, rng)
+        beyblades[0].health = 41
+
+        turn_start = Checkpoint.capture("O'Neil", "Computer", 4, beyblades, environment, rng)
+        data = encode_checkpoint(turn_start)
+        assert encode_checkpoint(decode_checkpoint(data)) == data
+        played = play_turn_start(beyblades, environment, rng)
+        store = CheckpointStore(directory)
+        for slot in SLOT_NAMES:
+            store.save(slot, turn_start)
+        # Saving rewinds the running game, which then plays the turn exactly as a loaded game will
+        turn_start.rewind(beyblades, environment, rng)
+        assert play_turn_start(beyblades, environment, rng) == played
+
+        loaded = store.load("O'Neil")
+        resumed_rng = random.Random()
+        resumed_environment = EnvironmentManager(rng=resumed_rng)
+        loaded.restore_environment(resumed_environment)
+        loaded.restore_rng(resumed_rng)
+        assert loaded.player_name == "O'Neil" and loaded.current_turn == 4
+        assert play_turn_start(loaded.beyblades, resumed_environment, resumed_rng) == played
+        assert store.load("missing") is None
+        store.close()
+
+        # Without index.json the slots are found again from their files
+        os.remove(os.path.join(directory, "index.json"))
+        reopened = CheckpointStore(directory)
+        assert sorted(reopened.slots()) == sorted(SLOT_NAMES)
+        assert reopened.delete("Al") and not reopened.delete("Al")
+        assert reopened.load("al") is not None and reopened.load("Al") is None
+        reopened.close()
+
+if __name__ == "__main__":
+    test_slot_file_names()
+    test_store_round_trip_and_resume()
+    print("Test complete!")
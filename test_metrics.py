@@ -0,0 +1,47 @@
+from batch_engine import BatchBattleEngine
+from beyblade import create_starter_beyblades
+from matchmaking import MatchmakingQueue
+from metrics import BATTLES_FINISHED, BATTLES_STARTED, CRITICALS, MATCH_WAIT_SECONDS, REGISTRY, TURNS
+from simulation import BattleSimulator
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+def test_batch_engine_counts_like_scalar():
+    print("Counting vector engine battles...")
+    starters = create_starter_beyblades()
+    bull, dranzer = starters[3], starters[6]
+    REGISTRY.reset()
+    BattleSimulator(seed=1).run_many(bull, dranzer, 20000)
+    scalar = REGISTRY.collect()
+    REGISTRY.reset()
+    summary = BatchBattleEngine(bull, dranzer, seed=1).run_many(100000)
+    assert BATTLES_STARTED.value == BATTLES_FINISHED.value == 100000
+    assert TURNS.value == summary.total_turns
+    scalar_rate = scalar[CRITICALS.name][0] / 20000
+    assert abs(CRITICALS.value / 100000 - scalar_rate) < 0.05 * scalar_rate
+    REGISTRY.reset()
+
+def test_match_wait_is_observed():
+    print("Observing matchmaking waits...")
+    REGISTRY.reset()
+    clock = Clock()
+    queue = MatchmakingQueue(clock=clock)
+    queue.add("a", 1000)
+    clock.now = 12.0
+    assert queue.add("b", 1000) is not None
+    counts = MATCH_WAIT_SECONDS.values()
+    # One wait of 12 s and one of 0 s
+    assert sum(counts[:-1]) == 2 and counts[-1] == 12.0
+    assert counts[MATCH_WAIT_SECONDS.buckets.index(15.0)] == 1
+    assert "beyblade_match_wait_seconds_count 2" in REGISTRY.exposition()
+    REGISTRY.reset()
+
+if __name__ == "__main__":
+    test_batch_engine_counts_like_scalar()
+    test_match_wait_is_observed()
+    print("Test complete!")
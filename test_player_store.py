@@ -0,0 +1,341 @@
+import contextlib
+import io
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import tempfile
+from metrics import PLAYER_STORE_READS
+from player import Player, PlayerManager
+from player_store import INDEX_HEADER, INDEX_MAGIC, JsonPlayerIndex, JsonPlayerStore, SqlitePlayerStore
+from player_store import migrate_json_to_sqlite
+import player_store
+
+def build(name: str, owner: str) -> dict:
+    return {"name": name, "owner": owner}
+
+def stores(directory: str):
+    """A fresh store of each kind, and a way to reopen it"""
+    yield lambda: JsonPlayerStore(os.path.join(directory, "players.json"))
+    yield lambda: SqlitePlayerStore(os.path.join(directory, "players.db"))
+
+def test_custom_beyblade_index():
+    print("Finding custom Beyblades by name...")
+    with tempfile.TemporaryDirectory() as directory:
+        for open_store in stores(directory):
+            manager = PlayerManager(store=open_store())
+            for name in ["ann", "bob", "cem", "dan"]:
+                manager.create_player(name)
+            manager.add_custom_beyblade("cem", build("Storm", "cem"))
+            manager.add_custom_beyblade("bob", build("Storm", "bob"))
+            manager.add_custom_beyblade("dan", build("Rock", "dan"))
+            # The first owner in player order wins, as when every player was scanned
+            assert manager.find_custom_beyblade("Storm") == ("bob", build("Storm", "bob"))
+            bob = manager.get_player("bob")
+            bob.custom_beyblades = []
+            manager.update_player(bob)
+            assert manager.find_custom_beyblade("Storm")[0] == "cem"
+            assert manager.find_custom_beyblade("Missing") is None
+            manager.close()
+
+            # A new process finds builds without reading every player
+            manager = PlayerManager(store=open_store())
+            reads = PLAYER_STORE_READS.value
+            assert manager.find_custom_beyblade("Rock") == ("dan", build("Rock", "dan"))
+            assert PLAYER_STORE_READS.value - reads == 1
+            del manager.players["cem"]
+            manager.save_players()
+            assert manager.find_custom_beyblade("Storm") is None
+            manager.close()
+
+def test_sqlite_build_index_is_filled_in():
+    print("Indexing builds of an existing SQLite database...")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "players.db")
+        connection = sqlite3.connect(path)
+        connection.execute("CREATE TABLE players (name TEXT PRIMARY KEY, wins INTEGER NOT NULL DEFAULT 0, "
+                           "losses INTEGER NOT NULL DEFAULT 0, custom_beyblades TEXT NOT NULL DEFAULT '[]')")
+        connection.execute("INSERT INTO players VALUES ('eve', 1, 2, '[{\"name\": \"Flame\"}]')")
+        connection.commit()
+        connection.close()
+        manager = PlayerManager(store=SqlitePlayerStore(path))
+        assert manager.find_custom_beyblade("Flame") == ("eve", {"name": "Flame"})
+        manager.close()
+
+class FlakyStore(JsonPlayerStore):
+    """Fails its first write, like a full disk would"""
+
+    failures = 1
+
+    def save_players(self, players):
+        if self.failures:
+            self.failures -= 1
+            raise OSError("No space left on device")
+        super().save_players(players)
+
+def test_write_behind_retries_failed_flushes():
+    print("Retrying a failed background flush...")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "players.json")
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            manager = PlayerManager(store=FlakyStore(path), write_behind=True, flush_interval=0.01)
+            manager.create_player("ann").wins = 3
+            manager.update_player(manager.get_player("ann"))
+            deadline = time.monotonic() + 10
+            while not manager.store.writes and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert manager.store._timer.is_alive()
+            manager.close()
+        assert "Error flushing players: No space left on device" in output.getvalue()
+        manager = PlayerManager(path)
+        assert manager.get_player("ann").wins == 3
+        manager.close()
+
+def test_write_behind_keeps_updates_made_during_a_flush():
+    print("Updating a player while a flush writes...")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "players.json")
+        manager = PlayerManager(path, write_behind=True, flush_interval=3600)
+        manager.create_player("a")
+        manager.create_player("b")
+        manager.flush()
+        atomic_write = player_store._atomic_write
+
+        def write_and_update(target, data):
+            atomic_write(target, data)
+            if target == path:
+                player_store._atomic_write = atomic_write
+                manager.get_player("b").wins += 1
+                manager.update_player(manager.get_player("b"))
+
+        manager.get_player("a").wins += 1
+        manager.update_player(manager.get_player("a"))
+        player_store._atomic_write = write_and_update
+        try:
+            manager.flush()
+        finally:
+            player_store._atomic_write = atomic_write
+        manager.flush()
+        manager.close()
+        with open(path) as f:
+            data = json.load(f)
+        assert data["a"]["wins"] == 1 and data["b"]["wins"] == 1
+
+def test_write_behind_flushes_while_players_load():
+    print("Flushing in the background while players load...")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "players.json")
+        manager = PlayerManager(path)
+        with manager.transaction():
+            for i in range(2000):
+                manager.create_player(f"p{i}")
+        manager.close()
+
+        def play(first: int):
+            for i in range(first, 2000, 4):
+                player = manager.get_player(f"p{i}")
+                player.wins += 1
+                manager.update_player(player)
+
+        output = io.StringIO()
+        # Switch threads often, so flushes run in the middle of lookups
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-5)
+        try:
+            with contextlib.redirect_stdout(output):
+                manager = PlayerManager(path, write_behind=True, flush_interval=0.001)
+                threads = [threading.Thread(target=play, args=(first,)) for first in range(4)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                assert manager.store._timer.is_alive()
+                manager.close()
+        finally:
+            sys.setswitchinterval(interval)
+        assert "Error" not in output.getvalue(), output.getvalue()
+        manager = PlayerManager(path)
+        assert all(manager.get_player(f"p{i}").wins == 1 for i in range(2000))
+        manager.close()
+
+def test_sqlite_upserts_and_deletes():
+    print("Upserting SQLite player rows...")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "players.db")
+        store = SqlitePlayerStore(path)
+        ann, bob = Player("ann"), Player("bob", custom_beyblades=[{"name": "Storm"}])
+        store.save_players([ann, bob])
+        ann.wins = 4
+        store.save_player(ann)
+        assert not ann.is_dirty and store.player_count() == 2
+        store.close()
+
+        store = SqlitePlayerStore(path)
+        players = store.load_all()
+        assert players["ann"].wins == 4 and players["bob"].custom_beyblades == [{"name": "Storm"}]
+        assert "cem" not in players and sorted(players) == ["ann", "bob"]
+        # Only looked-up players are written back
+        players["ann"].losses = 2
+        del players["bob"]
+        players["cem"] = Player("cem")
+        store.save_all(players)
+        store.close()
+
+        store = SqlitePlayerStore(path)
+        assert sorted(store.player_names()) == ["ann", "cem"]
+        assert store.load_player("ann") == Player("ann", wins=4, losses=2)
+        assert store.find_custom_beyblade("Storm", store.load_all()) is None
+        store.close()
+
+def test_migrate_json_to_sqlite():
+    print("Migrating players.json to SQLite...")
+    with tempfile.TemporaryDirectory() as directory:
+        json_file = os.path.join(directory, "players.json")
+        players = {f"p{i}": Player(f"p{i}", wins=i, custom_beyblades=[{"name": f"Build {i % 3}"}] if i % 2 else [])
+                   for i in range(50)}
+        with open(json_file, "w") as f:
+            json.dump({name: player.to_dict() for name, player in players.items()}, f, indent=2)
+        sqlite_file = os.path.join(directory, "players.db")
+        assert migrate_json_to_sqlite(json_file, sqlite_file) == 50
+        # The JSON file is only read: no index sidecar appears next to it
+        assert sorted(os.listdir(directory)) == ["players.db", "players.json"]
+        store = SqlitePlayerStore(sqlite_file)
+        assert all(store.load_player(name) == player for name, player in players.items())
+        assert store.find_custom_beyblade("Build 0", store.load_all())[0] == "p3"
+        store.close()
+
+def sample_players() -> dict:
+    names = ["ann", "Bob Ross", "çağrı", "ドランザー", 'quote "q"', "back\\slash", "", "p" * 40]
+    return {name: Player(name, wins=i, losses=2 * i, custom_beyblades=[{"name": f"Build {i}", "power": 50}] if i % 2 else [])
+            for i, name in enumerate(names)}
+
+def read_bytes(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+def test_json_file_renders_like_json_dump():
+    print("Rendering players.json through the index...")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "players.json")
+        players = sample_players()
+        store = JsonPlayerStore(path)
+        store.load_all()
+        store.save_all(dict(players))
+        expected = {name: player.to_dict() for name, player in players.items()}
+        assert read_bytes(path) == json.dumps(expected, indent=2).encode("utf-8")
+        store.close()
+
+        # Change one player of a lazily loaded file: untouched entries are copied, the file stays identical
+        store = JsonPlayerStore(path)
+        lazy = store.load_all()
+        lazy["çağrı"].wins = 99
+        lazy["new"] = Player("new")
+        del lazy["ann"]
+        store.save_all(lazy)
+        expected["çağrı"]["wins"] = 99
+        expected["new"] = Player("new").to_dict()
+        del expected["ann"]
+        assert read_bytes(path) == json.dumps(expected, indent=2).encode("utf-8")
+        store.close()
+
+        store = JsonPlayerStore(path)
+        store.save_all(store.load_all())
+        store.close()
+        store = JsonPlayerStore(path)
+        store.load_all()
+        store.save_all({})
+        assert read_bytes(path) == b"{}"
+        store.close()
+
+def test_index_sidecar_and_lazy_loading():
+    print("Looking players up through the index sidecar...")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "players.json")
+        players = sample_players()
+        with open(path, "w") as f:
+            json.dump({name: player.to_dict() for name, player in players.items()}, f, indent=2)
+        store = JsonPlayerStore(path)
+        lazy = store.load_all()
+        index = read_bytes(path + ".idx")
+        count, build_count, size, _ = INDEX_HEADER.unpack_from(index, len(INDEX_MAGIC))
+        assert index.startswith(INDEX_MAGIC) and (count, build_count, size) == (8, 4, os.path.getsize(path))
+
+        reads = PLAYER_STORE_READS.value
+        assert lazy["ドランザー"] == players["ドランザー"] and lazy['quote "q"'] == players['quote "q"']
+        assert "missing" not in lazy and len(lazy) == 8 and list(lazy) == list(players)
+        assert PLAYER_STORE_READS.value - reads == 2 and sorted(lazy.loaded) == ['quote "q"', "ドランザー"]
+        store.close()
+
+def test_stale_and_broken_indexes_are_rebuilt():
+    print("Rebuilding stale index sidecars...")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "players.json")
+        store = JsonPlayerStore(path)
+        store.load_all()
+        store.save_all({"ann": Player("ann")})
+        store.close()
+        # Rewritten by something other than the store: the index no longer matches the file
+        with open(path, "w") as f:
+            json.dump({"bob": Player("bob", wins=1).to_dict(), "ann": Player("ann", wins=2).to_dict()}, f, indent=2)
+        store = JsonPlayerStore(path)
+        players = store.load_all()
+        assert players["ann"].wins == 2 and players["bob"].wins == 1 and len(players) == 2
+        store.close()
+        index = read_bytes(path + ".idx")
+        assert index.startswith(INDEX_MAGIC)
+        assert INDEX_HEADER.unpack_from(index, len(INDEX_MAGIC))[2] == os.path.getsize(path)
+
+        with open(path + ".idx", "r+b") as f:
+            f.truncate(20)
+        store = JsonPlayerStore(path)
+        assert store.load_all()["bob"].wins == 1
+        store.close()
+        assert read_bytes(path + ".idx").startswith(INDEX_MAGIC)
+
+def test_empty_players_file():
+    print("Saving over an empty players file...")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "players.json")
+        open(path, "w").close()
+        manager = PlayerManager(path)
+        assert len(manager.players) == 0
+        manager.create_player("a")
+        manager.store.close()
+        store = JsonPlayerStore(path)
+        assert list(store.load_all()) == ["a"]
+        store.close()
+
+def test_index_lookups_survive_hash_collisions():
+    print("Looking players up with colliding name hashes...")
+    name_hash = player_store._name_hash
+    player_store._name_hash = lambda name: 7
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "players.json")
+            players = sample_players()
+            with open(path, "w") as f:
+                json.dump({name: player.to_dict() for name, player in players.items()}, f, indent=2)
+            index = JsonPlayerIndex(path, path + ".idx")
+            assert [index.find(name) for name in players] == list(range(8)) and index.find("zed") == -1
+            assert index.load(index.find("Bob Ross")) == players["Bob Ross"]
+            index.close()
+    finally:
+        player_store._name_hash = name_hash
+
+if __name__ == "__main__":
+    test_custom_beyblade_index()
+    test_sqlite_build_index_is_filled_in()
+    test_write_behind_retries_failed_flushes()
+    test_write_behind_keeps_updates_made_during_a_flush()
+    test_write_behind_flushes_while_players_load()
+    test_sqlite_upserts_and_deletes()
+    test_migrate_json_to_sqlite()
+    test_json_file_renders_like_json_dump()
+    test_index_sidecar_and_lazy_loading()
+    test_stale_and_broken_indexes_are_rebuilt()
+    test_empty_players_file()
+    test_index_lookups_survive_hash_collisions()
+    print("Test complete!")
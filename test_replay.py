@@ -0,0 +1,83 @@
+import io
+import random
+from beyblade import SpecialMove, create_starter_beyblade
+from checkpoints import pack_beyblade, unpack_beyblade
+from metrics import REGISTRY
+from replay import Replay, ReplayPlayer, ReplayRecorder, read_archive, write_archive
+from simulation import random_policy
+
+class KeepLog:
+    def write(self, record: dict) -> None:
+        self.record = record
+
+def record(seed: int):
+    """A recorded battle, its battle log record and both Beyblades' state after every turn"""
+    rng = random.Random(seed)
+    log = KeepLog()
+    recorder = ReplayRecorder(create_starter_beyblade("Storm Pegasus"), create_starter_beyblade("Dragoon"),
+                              rng.getrandbits(64), log)
+    battle = recorder.battle
+    states = [(battle.beyblade1.get_state(), battle.beyblade2.get_state())]
+    while not battle.is_battle_over():
+        recorder.execute_turn(random_policy(battle.beyblade1, battle.beyblade2, rng),
+                              random_policy(battle.beyblade2, battle.beyblade1, rng))
+        states.append((battle.beyblade1.get_state(), battle.beyblade2.get_state()))
+    return recorder.replay(), log.record, states
+
+def without_timestamps(battle_log: list) -> list:
+    return [dict(entry, timestamp=None) for entry in battle_log]
+
+def test_pack_beyblade_round_trip():
+    print("Packing Beyblades...")
+    beyblade = create_starter_beyblade("Driger")
+    # A move outside the registry is stored inline
+    beyblade.special_moves = list(beyblade.special_moves) + [SpecialMove("Test Spin", 51, "attack")]
+    beyblade.set_state((37, 80, 64, 1, True, True, False))
+    parts = [b"xx"]
+    pack_beyblade(parts, beyblade)
+    pack_beyblade(parts, create_starter_beyblade("Dranzer"))
+    data = b"".join(parts)
+    unpacked, offset = unpack_beyblade(data, 2)
+    assert unpacked.definition == beyblade.definition and unpacked.get_state() == beyblade.get_state()
+    second, offset = unpack_beyblade(data, offset)
+    assert second.name == "Dranzer" and offset == len(data)
+
+def test_replay_seeking_matches_the_battle():
+    print("Re-simulating replays...")
+    rng = random.Random(1)
+    for seed in range(200):
+        replay, log_record, states = record(seed)
+        replay = Replay.decode(replay.encode())
+        player = ReplayPlayer(replay, rng.choice([1, 2, 3, 16]))
+        for _ in range(3 * replay.turns):
+            turn = rng.randint(0, replay.turns)
+            battle = player.seek(turn)
+            assert (battle.beyblade1.get_state(), battle.beyblade2.get_state()) == states[turn]
+            assert battle.current_turn == turn + 1 and len(battle.battle_log) == turn
+        assert without_timestamps(player.battle_log()) == without_timestamps(log_record['log'])
+        assert player.battle.winner.name == log_record['winner']
+
+def test_replays_leave_metrics_alone():
+    print("Checking replays are not counted as battles...")
+    replay = record(3)[0]
+    before = REGISTRY.collect()
+    player = ReplayPlayer(replay, 1)
+    for turn in (replay.turns, 0, replay.turns, 1):
+        player.seek(turn)
+    assert REGISTRY.collect() == before
+
+def test_archive_round_trip():
+    print("Writing replay archives...")
+    replays = [record(seed)[0] for seed in range(50)]
+    f = io.BytesIO()
+    write_archive(f, replays[:20])
+    write_archive(f, replays[20:])
+    f.seek(0)
+    assert [replay.encode() for replay in read_archive(f)] == [replay.encode() for replay in replays]
+
+if __name__ == "__main__":
+    test_pack_beyblade_round_trip()
+    test_replay_seeking_matches_the_battle()
+    test_replays_leave_metrics_alone()
+    test_archive_round_trip()
+    print("Test complete!")
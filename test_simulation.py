@@ -0,0 +1,50 @@
+import random
+import numpy as np
+from beyblade import create_starter_beyblades
+from environment import EnvironmentManager
+from simulation import BattleSimulator, POLICIES
+from batch_engine import BatchBattleEngine, event_timelines
+
+def test_simulation():
+    print("Running scalar battles...")
+    starters = create_starter_beyblades()
+    pegasus, driger = starters[1], starters[7]
+    simulator = BattleSimulator(seed=1)
+    scalar = simulator.run_many(pegasus, driger, 5000)
+    print(scalar)
+    assert scalar.wins1 + scalar.wins2 == 5000
+
+    # Same seed, same results
+    assert BattleSimulator(seed=1).run_many(pegasus, driger, 5000).wins1 == scalar.wins1
+
+def test_batch_engine_matches_scalar():
+    print("Comparing batch engine with scalar battles...")
+    starters = create_starter_beyblades()
+    for policy in POLICIES:
+        bull, dranzer = starters[3], starters[6]
+        scalar = BattleSimulator(POLICIES[policy], POLICIES[policy], seed=2).run_many(bull, dranzer, 5000)
+        batch = BatchBattleEngine(bull, dranzer, policy, policy, seed=2).run_many(200000)
+        print(f"{policy}: scalar {scalar.win_rate1:.3f}, batch {batch.win_rate1:.3f}")
+        assert abs(scalar.win_rate1 - batch.win_rate1) < 0.03
+        assert abs(scalar.average_turns - batch.average_turns) < 0.1
+
+def test_event_timelines_match_environment_manager():
+    print("Comparing event timelines with EnvironmentManager...")
+    battles, turns = 5000, 12
+    scalar = np.zeros((battles, turns), dtype=np.int8)
+    for battle in range(battles):
+        environment = EnvironmentManager(rng=random.Random(battle))
+        for turn in range(turns):
+            event = environment.check_for_event()
+            scalar[battle, turn] = environment.events.index(event) if event else -1
+    timeline = event_timelines(100000, turns, np.random.default_rng(3))
+    for event in range(-1, len(environment.events)):
+        scalar_rate = (scalar == event).mean(axis=0)
+        batch_rate = (timeline.events == event).mean(axis=0)
+        assert np.abs(scalar_rate - batch_rate).max() < 0.03
+
+if __name__ == "__main__":
+    test_simulation()
+    test_batch_engine_matches_scalar()
+    test_event_timelines_match_environment_manager()
+    print("Test complete!")
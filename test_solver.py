@@ -0,0 +1,36 @@
+import math
+from beyblade import create_starter_beyblade
+from simulation import BattleSimulator, POLICIES
+from solver import BattleSolver
+
+def check_against_simulation(name1: str, name2: str, policy: str, battles: int) -> None:
+    beyblade1, beyblade2 = create_starter_beyblade(name1), create_starter_beyblade(name2)
+    probability = BattleSolver(beyblade1, beyblade2, policy, policy).win_probability()
+    # The solver does not model environmental events
+    simulator = BattleSimulator(POLICIES[policy], POLICIES[policy], seed=1, use_environment=False)
+    summary = simulator.run_many(beyblade1, beyblade2, battles)
+    rate = summary.wins1 / battles
+    tolerance = 4 * math.sqrt(probability * (1 - probability) / battles)
+    print(f"{name1} vs {name2} ({policy}): solver {probability:.4f}, simulation {rate:.4f}")
+    assert abs(rate - probability) < tolerance
+
+def test_solver_matches_simulation():
+    print("Comparing exact win probabilities with simulated battles...")
+    check_against_simulation("Dranzer", "Dark Bull", "computer", 20000)
+    check_against_simulation("Storm Pegasus", "Driger", "random", 20000)
+
+def test_state_values():
+    print("Looking up solved states...")
+    solver = BattleSolver(create_starter_beyblade("Dranzer"), create_starter_beyblade("Dark Bull"))
+    probability = solver.win_probability()
+    start = solver.initial_state()
+    assert solver.values[start] == probability
+    successors = solver.successors(start)
+    assert abs(sum(p for _, p in successors) - 1) < 1e-12
+    assert abs(sum(p * solver.value(state) for state, p in successors) - solver.values[start]) < 1e-12
+    assert all(state.is_terminal() or state in solver.values for state, _ in successors)
+
+if __name__ == "__main__":
+    test_solver_matches_simulation()
+    test_state_values()
+    print("Test complete!")
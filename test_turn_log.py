@@ -0,0 +1,64 @@
+import os
+import random
+import tempfile
+from turn_log import MAX_MOVES, ColumnarLogReader, ColumnarLogWriter, average_damage
+
+MOVES = ["Storm Spin", "Tiger Claw", "Blazing Gig", None]
+
+def write_segment(path: str, records: int, rng: random.Random) -> list:
+    """Write random turn records and return them as tuples"""
+    rows = []
+    with ColumnarLogWriter(path, block_records=16) as writer:
+        for i in range(records):
+            row = (i // 10, i % 10 + 1, i % 2, rng.choice(MOVES), rng.randint(-50, 300), rng.random() < 0.2,
+                   rng.randint(0, 100), rng.randint(0, 100), rng.randint(0, 255))
+            writer.append(*row)
+            rows.append(row)
+    return rows
+
+def test_segments_round_trip():
+    print("Reading turn log segments back...")
+    rng = random.Random(3)
+    with tempfile.TemporaryDirectory() as directory:
+        # 16 full blocks, a partial last block, a single block and an empty segment
+        sizes = [16 * 16 + 5, 7, 0]
+        rows = []
+        for i, size in enumerate(sizes):
+            path = os.path.join(directory, f"turns-{i}.bin")
+            segment = write_segment(path, size, rng)
+            rows.extend(segment)
+            with ColumnarLogReader(path) as reader:
+                assert reader.records == size and reader.block_count == -(-size // 16)
+                columns = [reader.column(name).tolist() for name in
+                           ("battle", "turn", "actor", "move", "damage", "critical", "health", "stamina",
+                            "spin_speed")]
+                read = [(battle, turn, actor, reader.moves[move] or None, damage, bool(critical), health, stamina,
+                         spin_speed)
+                        for battle, turn, actor, move, damage, critical, health, stamina, spin_speed in zip(*columns)]
+                assert read == segment
+
+        pattern = os.path.join(directory, "turns-*.bin")
+        for move in MOVES[:3]:
+            damage = [row[4] for row in rows if row[3] == move]
+            assert average_damage(pattern, move) == sum(damage) / len(damage)
+        assert average_damage(pattern, "Unknown Spin") == 0.0
+        with ColumnarLogReader(os.path.join(directory, "turns-0.bin")) as reader:
+            assert reader.move_id("Unknown Spin") is None and reader.damage_stats("Unknown Spin") == (0, 0)
+
+def test_move_table_is_bounded():
+    print("Filling a segment's move table...")
+    with tempfile.TemporaryDirectory() as directory:
+        with ColumnarLogWriter(os.path.join(directory, "turns.bin"), block_records=8) as writer:
+            for i in range(MAX_MOVES):
+                writer.move_id(f"move {i}")
+            assert writer.move_id("move 7") == 7
+            try:
+                writer.move_id("one too many")
+            except ValueError:
+                return
+        raise AssertionError("the move table overflowed")
+
+if __name__ == "__main__":
+    test_segments_round_trip()
+    test_move_table_is_bounded()
+    print("Test complete!")
@@ -0,0 +1,152 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import sys
+import time
+from beyblade import Beyblade, create_starter_beyblades, create_beyblade_from_data
+from beyblade_parts import BeybladePartsManager
+from metrics import DEFAULT_PORT, REGISTRY, serve_metrics
+from simulation import BattleSimulator, POLICIES
+
+# Pairs per work unit; shards (not workers) own the RNG streams so results do not
+# depend on how many processes run them
+SHARD_SIZE = 256
+
+_competitors: List[Beyblade] = []
+
+def create_competitors(include_custom: bool = True) -> List[Beyblade]:
+    """Create the starters followed by every custom part build"""
+    competitors = create_starter_beyblades()
+    if include_custom:
+        parts_manager = BeybladePartsManager()
+        competitors.extend(create_beyblade_from_data(data) for data in parts_manager.create_all_custom_beyblades())
+    return competitors
+
+def shard_seed(seed: int, shard: int) -> int:
+    """Derive an independent, reproducible seed for a shard"""
+    digest = hashlib.sha256(f"{seed}:{shard}".encode()).digest()
+    return int.from_bytes(digest[:8], "big")
+
+def _init_worker(include_custom: bool) -> None:
+    global _competitors
+    _competitors = create_competitors(include_custom)
+    # A forked worker starts with a copy of the parent's counts
+    REGISTRY.reset()
+
+def _run_shard(args: Tuple[int, List[Tuple[int, int]], int, str, str, int]
+               ) -> Tuple[List[Tuple[int, int, int, int, int]], Dict[str, list]]:
+    """Play every pair of a shard and return (i, j, wins_i, wins_j, turns) rows and the shard's metrics"""
+    shard, pairs, battles, policy, engine, seed = args
+    rows = []
+    if engine == "vector":
+        import numpy as np
+        from batch_engine import BatchBattleEngine
+        rng = np.random.default_rng(shard_seed(seed, shard))
+        for i, j in pairs:
+            summary = BatchBattleEngine(_competitors[i], _competitors[j], policy, policy, seed=rng).run_many(battles)
+            rows.append((i, j, summary.wins1, summary.wins2, summary.total_turns))
+    else:
+        simulator = BattleSimulator(POLICIES[policy], POLICIES[policy], seed=shard_seed(seed, shard))
+        for i, j in pairs:
+            summary = simulator.run_many(_competitors[i], _competitors[j], battles)
+            rows.append((i, j, summary.wins1, summary.wins2, summary.total_turns))
+    # Workers run one shard at a time, so taking the counts and zeroing them cannot race
+    snapshot = REGISTRY.collect()
+    REGISTRY.reset()
+    return rows, snapshot
+
+@dataclass
+class TournamentResult:
+    names: List[str]
+    battles_per_pair: int
+    seed: int
+    pair_results: List[Tuple[int, int, int, int, int]] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    def standings(self) -> List[dict]:
+        """Merge pair results into one win-rate table, best first"""
+        wins = [0] * len(self.names)
+        losses = [0] * len(self.names)
+        for i, j, wins_i, wins_j, _ in self.pair_results:
+            wins[i] += wins_i
+            losses[i] += wins_j
+            wins[j] += wins_j
+            losses[j] += wins_i
+        table = []
+        for index, name in enumerate(self.names):
+            total = wins[index] + losses[index]
+            table.append({
+                "name": name,
+                "wins": wins[index],
+                "losses": losses[index],
+                "win_rate": round(wins[index] / total, 6) if total else 0.0
+            })
+        table.sort(key=lambda row: (-row["win_rate"], row["name"]))
+        return table
+
+    def to_dict(self) -> dict:
+        return {
+            "seed": self.seed,
+            "battles_per_pair": self.battles_per_pair,
+            "competitors": len(self.names),
+            "pairs": len(self.pair_results),
+            "standings": self.standings()
+        }
+
+def run_tournament(battles: int = 100, seed: int = 0, workers: Optional[int] = None, policy: str = "computer",
+                   engine: str = "scalar", include_custom: bool = True) -> TournamentResult:
+    """Play a round robin between all competitors, sharded across a process pool"""
+    names = [beyblade.name for beyblade in create_competitors(include_custom)]
+    pairs = list(itertools.combinations(range(len(names)), 2))
+    shards = [
+        (shard, pairs[start:start + SHARD_SIZE], battles, policy, engine, seed)
+        for shard, start in enumerate(range(0, len(pairs), SHARD_SIZE))
+    ]
+
+    result = TournamentResult(names=names, battles_per_pair=battles, seed=seed)
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(include_custom,)) as executor:
+        # map() yields shards in submission order, which keeps the merge deterministic
+        for rows, snapshot in executor.map(_run_shard, shards):
+            result.pair_results.extend(rows)
+            REGISTRY.merge(snapshot)
+    result.elapsed = time.perf_counter() - start
+    return result
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Round-robin tournament over starters and custom part builds")
+    parser.add_argument("--battles", type=int, default=100, help="Battles per pair")
+    parser.add_argument("--seed", type=int, default=0, help="Tournament seed")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="computer")
+    parser.add_argument("--engine", choices=["scalar", "vector"], default="scalar")
+    parser.add_argument("--starters-only", action="store_true", help="Skip the custom part builds")
+    parser.add_argument("--output", default="tournament.json", help="Where to write the win-rate table")
+    parser.add_argument("--top", type=int, default=10, help="Number of standings to print")
+    parser.add_argument("--metrics-port", type=int, nargs="?", const=DEFAULT_PORT, default=None,
+                        help=f"Serve Prometheus metrics while the tournament runs (default port {DEFAULT_PORT})")
+    args = parser.parse_args(argv)
+
+    if args.metrics_port is not None:
+        serve_metrics(port=args.metrics_port)
+        print(f"Metrics at http://127.0.0.1:{args.metrics_port}/metrics")
+
+    result = run_tournament(args.battles, args.seed, args.workers, args.policy, args.engine, not args.starters_only)
+    with open(args.output, "w") as f:
+        json.dump(result.to_dict(), f, indent=2)
+
+    total_battles = len(result.pair_results) * args.battles
+    print(f"{len(result.names)} competitors, {len(result.pair_results)} pairs, {total_battles} battles "
+          f"in {result.elapsed:.2f}s ({total_battles / result.elapsed:.0f} battles/sec)")
+    for rank, row in enumerate(result.standings()[:args.top], 1):
+        print(f"{rank}. {row['name']} - {row['win_rate']:.2%} ({row['wins']}W/{row['losses']}L)")
+    print(f"Win-rate table saved to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
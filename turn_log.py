@@ -0,0 +1,195 @@
+from typing import Dict, Iterator, List, Optional
+import glob
+import json
+import mmap
+import struct
+import numpy as np
+
+MAGIC = b"BBTURN01"
+FOOTER = struct.Struct("<Q8s")  # footer JSON length, magic
+BLOCK_HEADER = struct.Struct("<II")  # records in block, reserved
+
+# Column layout of a block, widest first so every column stays naturally aligned.
+# health/stamina/spin_speed are the actor's own values after the turn.
+COLUMNS = [
+    ("battle", np.dtype("<u4")),
+    ("turn", np.dtype("<u2")),
+    ("move", np.dtype("<u2")),
+    ("damage", np.dtype("<i2")),
+    ("health", np.dtype("<i2")),
+    ("actor", np.dtype("u1")),
+    ("critical", np.dtype("u1")),
+    ("stamina", np.dtype("u1")),
+    ("spin_speed", np.dtype("u1"))
+]
+RECORD_BYTES = sum(dtype.itemsize for _, dtype in COLUMNS)
+MAX_MOVES = np.iinfo(dict(COLUMNS)["move"]).max + 1
+
+class ColumnarLogWriter:
+    """Writes turn records as fixed-width column blocks
+
+    File layout: MAGIC, then blocks of `block_records` rows (a block header
+    followed by one array per column), then a JSON footer holding the move
+    name table and block count, its length and MAGIC again.
+    """
+
+    def __init__(self, path: str, block_records: int = 65536):
+        if block_records % 8:
+            raise ValueError("block_records must be a multiple of 8")
+        self.path = path
+        self.block_records = block_records
+        self.moves: List[str] = []
+        self._move_ids: Dict[str, int] = {}
+        self._columns = {name: np.zeros(block_records, dtype=dtype) for name, dtype in COLUMNS}
+        self._count = 0
+        self._blocks = 0
+        self._records = 0
+        self._file = open(path, "wb")
+        self._file.write(MAGIC)
+
+    def move_id(self, name: Optional[str]) -> int:
+        """Intern a move name into this segment's move table"""
+        name = name or ""
+        move_id = self._move_ids.get(name)
+        if move_id is None:
+            if len(self.moves) == MAX_MOVES:
+                raise ValueError(f"A turn log segment holds at most {MAX_MOVES} move names")
+            move_id = self._move_ids[name] = len(self.moves)
+            self.moves.append(name)
+        return move_id
+
+    def append(self, battle: int, turn: int, actor: int, move: Optional[str], damage: int, critical: bool,
+               health: int, stamina: int, spin_speed: int) -> None:
+        """Add one turn record"""
+        i = self._count
+        columns = self._columns
+        columns["battle"][i] = battle
+        columns["turn"][i] = turn
+        columns["actor"][i] = actor
+        columns["move"][i] = self.move_id(move)
+        columns["damage"][i] = damage
+        columns["critical"][i] = critical
+        columns["health"][i] = health
+        columns["stamina"][i] = stamina
+        columns["spin_speed"][i] = spin_speed
+        self._count = i + 1
+        if self._count == self.block_records:
+            self._write_block()
+
+    def append_actions(self, battle: int, turn: int, actions: List[dict], beyblades: list) -> None:
+        """Add the actions returned by simulation.play_turn; beyblades are (first, second)"""
+        # play_turn returns the first Beyblade's action first
+        for actor, action in enumerate(actions):
+            beyblade = beyblades[actor]
+            self.append(battle, turn, actor, action.get('move'), action.get('damage', 0),
+                        action.get('critical', False), beyblade.health, beyblade.stamina, beyblade.spin_speed)
+
+    def _write_block(self) -> None:
+        if not self._count:
+            return
+        self._file.write(BLOCK_HEADER.pack(self._count, 0))
+        for name, _ in COLUMNS:
+            # Blocks are always full width so column offsets stay fixed
+            self._file.write(self._columns[name].tobytes())
+        self._blocks += 1
+        self._records += self._count
+        self._count = 0
+
+    def close(self) -> None:
+        """Write the last partial block and the footer"""
+        if self._file is None:
+            return
+        self._write_block()
+        footer = json.dumps({
+            "version": 1,
+            "block_records": self.block_records,
+            "blocks": self._blocks,
+            "records": self._records,
+            "moves": self.moves
+        }).encode("utf-8")
+        self._file.write(footer)
+        self._file.write(FOOTER.pack(len(footer), MAGIC))
+        self._file.close()
+        self._file = None
+
+    def __enter__(self) -> 'ColumnarLogWriter':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+class ColumnarLogReader:
+    """Memory-maps a turn log segment and exposes its columns as NumPy views without copying"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"Not a turn log segment: {path}")
+        footer_length, magic = FOOTER.unpack_from(self._map, len(self._map) - FOOTER.size)
+        if magic != MAGIC:
+            raise ValueError(f"Incomplete turn log segment: {path}")
+        footer_start = len(self._map) - FOOTER.size - footer_length
+        footer = json.loads(self._map[footer_start:footer_start + footer_length].decode("utf-8"))
+        self.block_records = footer["block_records"]
+        self.block_count = footer["blocks"]
+        self.records = footer["records"]
+        self.moves: List[str] = footer["moves"]
+        self._move_ids = {name: i for i, name in enumerate(self.moves)}
+        self._block_bytes = BLOCK_HEADER.size + RECORD_BYTES * self.block_records
+
+    def move_id(self, name: str) -> Optional[int]:
+        return self._move_ids.get(name)
+
+    def blocks(self) -> Iterator[Dict[str, np.ndarray]]:
+        """Yield each block as a dict of column views into the mapped file"""
+        for block in range(self.block_count):
+            offset = len(MAGIC) + block * self._block_bytes
+            count, _ = BLOCK_HEADER.unpack_from(self._map, offset)
+            offset += BLOCK_HEADER.size
+            columns = {}
+            for name, dtype in COLUMNS:
+                columns[name] = np.frombuffer(self._map, dtype=dtype, count=count, offset=offset)
+                offset += dtype.itemsize * self.block_records
+            yield columns
+
+    def column(self, name: str) -> np.ndarray:
+        """One column for the whole segment (this concatenates, so it copies)"""
+        return np.concatenate([block[name] for block in self.blocks()]) if self.block_count else np.array([])
+
+    def damage_stats(self, move_name: str) -> tuple:
+        """Total damage and number of uses of a move"""
+        move_id = self.move_id(move_name)
+        if move_id is None:
+            return 0, 0
+        total, uses = 0, 0
+        for block in self.blocks():
+            mask = block["move"] == move_id
+            uses += int(np.count_nonzero(mask))
+            total += int(block["damage"].sum(where=mask, dtype=np.int64))
+        return total, uses
+
+    def close(self) -> None:
+        try:
+            self._map.close()
+        except BufferError:
+            # Views handed out by blocks() are still alive; the map closes with them
+            pass
+        self._file.close()
+
+    def __enter__(self) -> 'ColumnarLogReader':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+def average_damage(pattern: str, move_name: str) -> float:
+    """Average damage of a move over every segment matching a glob pattern"""
+    total, uses = 0, 0
+    for path in sorted(glob.glob(pattern)):
+        with ColumnarLogReader(path) as reader:
+            segment_total, segment_uses = reader.damage_stats(move_name)
+        total += segment_total
+        uses += segment_uses
+    return total / uses if uses else 0.0
@@ -1,4 +1,4 @@
-from typing import Dict, Any
+from typing import Dict, Any, Iterable
 import json
 from datetime import datetime
 import os
@@ -16,6 +16,29 @@ class SpecialMoveError(Exception):
     """Exception raised for errors in the SpecialMove class."""
     pass
 
+def is_headless() -> bool:
+    """Headless mode (BEYBLADE_HEADLESS=1): no audio and no terminal colours"""
+    return os.environ.get("BEYBLADE_HEADLESS", "").lower() in ("1", "true", "yes")
+
+class _NoColor:
+    """Stands in for colorama's Fore and Style when colours are off"""
+    
+    def __getattr__(self, name: str) -> str:
+        return ""
+
+NO_COLOR = _NoColor()
+
+def latency_summary(latencies: Iterable[float]) -> Dict[str, float]:
+    """p50/p99/max of latencies given in seconds, reported in ms"""
+    latencies = sorted(latencies)
+    if not latencies:
+        return {"p50_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+    return {
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)] * 1000,
+        "max_ms": latencies[-1] * 1000
+    }
+
 def calculate_damage(attacker_power, move_power, defender_defense, type_advantage=1.0, critical=False, defending=False):
     """Calculate damage from an attack"""
     base_damage = (attacker_power * move_power) / (defender_defense * 10)
@@ -47,10 +70,14 @@ def load_json_data(file_path):
     try:
         if not os.path.exists(file_path):
             # Check in data directory
-            data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
-            alt_path = os.path.join(data_dir, os.path.basename(file_path))
+            base_dir = os.path.dirname(os.path.abspath(__file__))
+            alt_path = os.path.join(base_dir, 'data', os.path.basename(file_path))
+            # Fall back to the project root where the bundled JSON files live
+            root_path = os.path.join(base_dir, os.path.basename(file_path))
             if os.path.exists(alt_path):
                 file_path = alt_path
+            elif os.path.exists(root_path):
+                file_path = root_path
             else:
                 raise FileNotFoundError(f"File not found: {file_path}")
         
@@ -61,8 +88,14 @@ def load_json_data(file_path):
     except Exception as e:
         raise Exception(f"Error loading JSON data: {str(e)}")
 
-def save_battle_log(battle_id: str, log_data: Dict[str, Any]) -> None:
-    """Save battle log to a JSON file"""
+def save_battle_log(battle_id: str, log_data: Dict[str, Any], log_writer=None) -> None:
+    """Save battle log to a JSON file, or append it to a log writer if one is given"""
+    if log_writer is not None:
+        record = dict(log_data)
+        record.setdefault('battle_id', battle_id)
+        log_writer.write(record)
+        return
+    
     os.makedirs('logs', exist_ok=True)
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     filename = f"logs/battle_{battle_id}_{timestamp}.json"